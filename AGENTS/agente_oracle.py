@@ -17,11 +17,8 @@ if sys.platform == 'win32':
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, PROJECT_ROOT)
 
-from langchain_community.llms import Ollama
-from langchain_core.tools import Tool
-from langchain_core.prompts import PromptTemplate
-from langchain_classic.agents import AgentExecutor, create_react_agent
-from langchain_classic.memory import ConversationBufferMemory
+# LangChain solo se importa en crear_agente(): las herramientas y los scripts
+# directos (oracle_directo, oracle_functions, demonio) solo necesitan oracledb
 
 try:
     import oracledb
@@ -30,20 +27,172 @@ except ImportError:
     print("   pip install oracledb")
     sys.exit(1)
 
+import base64
+import csv
+import io
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache, partial, wraps
+import heapq
+from itertools import accumulate, chain
 from datetime import datetime
 import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
 
 
 # ============================================================================
 # CONFIGURACIÓN DE CONEXIÓN ORACLE
 # ============================================================================
 
+# Errores que indican una sesión o una red caídas, no un fallo de la query
+CODIGOS_DESCONEXION = frozenset({
+    'DPY-1001',   # no conectado
+    'DPY-4011',   # la base de datos o la red cerraron la conexión
+    'DPY-6005',   # no se pudo conectar
+    'DPI-1010',   # no conectado (modo Thick)
+    'DPI-1080',   # conexión cerrada por ORA-3113
+    'ORA-00028',  # sesión terminada
+    'ORA-01012',  # no conectado
+    'ORA-02396',  # superado el tiempo máximo de inactividad
+    'ORA-03113',  # fin de fichero en el canal de comunicación
+    'ORA-03114',  # no conectado a Oracle
+    'ORA-03135',  # conexión perdida
+    'ORA-12170',  # timeout de conexión
+    'ORA-12537',  # conexión cerrada
+    'ORA-12541',  # sin listener
+    'ORA-12547',  # contacto perdido
+})
+
+
+def es_desconexion(error: Exception) -> bool:
+    """Indica si una excepción de oracledb se debe a una sesión o red caídas."""
+    if not isinstance(error, oracledb.Error):
+        return False
+    detalle = error.args[0] if error.args else None
+    codigo = getattr(detalle, 'full_code', None) or str(error).partition(':')[0]
+    return codigo in CODIGOS_DESCONEXION or bool(getattr(detalle, 'isrecoverable', False))
+
+
+# LOB -> tipo LONG equivalente: el valor llega entero con la fila, sin un
+# round trip por locator al leerlo (hasta 1 GB por valor)
+LOB_EN_LINEA = {
+    oracledb.DB_TYPE_CLOB: oracledb.DB_TYPE_LONG,
+    oracledb.DB_TYPE_NCLOB: oracledb.DB_TYPE_LONG_NVARCHAR,
+    oracledb.DB_TYPE_BLOB: oracledb.DB_TYPE_LONG_RAW,
+}
+
+
+def texto_en_linea(cursor, metadata):
+    """
+    outputtypehandler de los cursores de lectura: trae CLOB/NCLOB como str
+    y BLOB como bytes en el mismo fetch. Las columnas LONG (user_views.text,
+    data_default) ya llegan en línea y no necesitan variable propia.
+    """
+    tipo = LOB_EN_LINEA.get(metadata.type_code)
+    if tipo is not None:
+        return cursor.var(tipo, arraysize=cursor.arraysize)
+
+
+class LotesConsulta:
+    """
+    Lotes de filas de iterar_query. Es un iterador normal (next, for,
+    chain), pero la sesión, el cursor y la medición quedan en `pila` desde
+    que se crea, no desde el primer next(): close() (o el recolector, o
+    un bloque with) los libera aunque nunca se haya pedido un lote. Se
+    cierra solo al agotarse. Con `timeout`, el call_timeout se pone solo
+    durante cada fetchmany: entre lotes la conexión única lo recupera y
+    las demás consultas que la compartan no lo heredan.
+    """
+
+    def __init__(self, pila: ExitStack, connection, cursor, medicion: dict = None,
+                 timeout: float = None):
+        self._pila = pila
+        self._connection = connection
+        self._cursor = cursor
+        self._medicion = medicion
+        self._timeout = timeout
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._pila is None:
+            raise StopIteration
+        try:
+            antes = time.perf_counter()
+            with OracleConnection._limite_tiempo(self._connection, self._timeout):
+                filas = self._cursor.fetchmany()
+            if self._medicion is not None:
+                self._medicion['segundos_bd'] += time.perf_counter() - antes
+                self._medicion['filas'] += len(filas)
+                self._medicion['bytes'] += tamano_filas(filas)
+        except BaseException as e:
+            if self._medicion is not None:
+                self._medicion['error'] = True
+            # La excepción llega a sesion(): un Ctrl+C cancela y descarta la sesión
+            pila, self._pila = self._pila, None
+            pila.__exit__(type(e), e, e.__traceback__)
+            raise
+        if not filas:
+            self.close()
+            raise StopIteration
+        return filas
+
+    def close(self):
+        """Libera cursor y sesión y registra la medición (idempotente)."""
+        pila, self._pila = self._pila, None
+        if pila is not None:
+            pila.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
 class OracleConnection:
-    """Gestiona la conexión a Oracle con modo de solo lectura."""
+    """
+    Gestiona la conexión a Oracle con modo de solo lectura.
+
+    Soporta dos modos:
+      - Conexión única (por defecto): un solo handle de oracledb.connect().
+      - Pool de sesiones: activado con 'usar_pool': True en ORACLE_CONFIG.
+        Usa oracledb.create_pool (opcionalmente DRCP con 'drcp': True) y cada
+        query adquiere y libera su propia sesión, de modo que varias
+        herramientas pueden ejecutarse en paralelo sin reconectar.
+
+    En ambos modos la conexión se mantiene viva sola: 'expire_time' activa
+    el keepalive de red, una sesión inactiva más de 'ping_interval' segundos
+    se comprueba con un ping antes de usarla, y si una query falla porque la
+    sesión o la red se cayeron (es_desconexion) se reconecta con espera
+    exponencial y la query se repite una vez. salud() es la sonda barata.
+
+    Las sesiones con una llamada en curso se pueden cancelar con
+    cancelar() (connection.cancel()); un Ctrl+C en mitad de una llamada la
+    cancela y descarta la sesión, para que no quede ocupada en el servidor.
+    """
 
     def __init__(self):
         self.connection = None
+        self.pool = None
         self.config = None
+        self.reconexiones = 0
+        self.ultimo_error = None
+        self._ultimo_uso = 0.0
+        self._bloqueo_reconexion = threading.Lock()
+        self._en_curso = set()
+        self._bloqueo_en_curso = threading.Lock()
+        self._interrumpida = False
 
     def cargar_configuracion(self):
         """Carga configuración desde archivo config_oracle.py"""
@@ -67,8 +216,86 @@ class OracleConnection:
             print(f"❌ Error al cargar configuración: {e}")
             return None
 
+    def usa_pool(self) -> bool:
+        """Indica si la configuración activa el modo pool."""
+        return bool(self.config and self.config.get('usar_pool'))
+
+    def esta_conectado(self) -> bool:
+        """Indica si hay una conexión o un pool abiertos."""
+        return self.pool is not None or self.connection is not None
+
+    def _stmtcachesize(self) -> int:
+        """
+        Tamaño del statement cache por sesión ('stmtcachesize' en ORACLE_CONFIG).
+        Por defecto deja sitio para todas las sentencias del registro y sus
+        variantes, de modo que las llamadas repetidas no vuelven a parsear.
+        """
+        return self.config.get('stmtcachesize', max(40, 2 * len(SENTENCIAS)))
+
+    def _keepalive(self) -> dict:
+        """
+        Parámetros de keepalive de oracledb: con 'expire_time' (minutos) el
+        cliente sondea la conexión, así los firewalls y NAT no la cortan por
+        inactividad y un servidor caído se detecta antes.
+        """
+        return {'expire_time': self.config.get('expire_time', 2)}
+
+    def _crear_pool(self):
+        """Crea el pool de sesiones (opcionalmente DRCP) según ORACLE_CONFIG."""
+        drcp = bool(self.config.get('drcp'))
+        opciones = {}
+        if drcp:
+            # DRCP: las sesiones viven en el pool del servidor y se
+            # reutilizan entre procesos con la misma connection class
+            opciones['server_type'] = 'pooled'
+            opciones['cclass'] = self.config.get('pool_cclass', 'AGENTE_ORACLE')
+            opciones['purity'] = oracledb.PURITY_SELF
+
+        return oracledb.create_pool(
+            user=self.config['user'],
+            password=self.config['password'],
+            host=self.config['host'],
+            port=self.config['port'],
+            service_name=self.config['service_name'],
+            min=self.config.get('pool_min', 1),
+            max=self.config.get('pool_max', 4),
+            increment=self.config.get('pool_increment', 1),
+            getmode=oracledb.POOL_GETMODE_WAIT,
+            stmtcachesize=self._stmtcachesize(),
+            # Las sesiones inactivas más de ping_interval se comprueban al
+            # adquirirlas y el pool sustituye las caídas
+            ping_interval=self.config.get('ping_interval', 60),
+            **self._keepalive(),
+            **opciones
+        )
+
+    def _abrir_conexion(self):
+        """Abre la conexión única en modo READ ONLY."""
+        # Crear DSN (Data Source Name)
+        dsn = oracledb.makedsn(
+            self.config['host'],
+            self.config['port'],
+            service_name=self.config['service_name']
+        )
+
+        # Conectar a Oracle
+        connection = oracledb.connect(
+            user=self.config['user'],
+            password=self.config['password'],
+            dsn=dsn,
+            stmtcachesize=self._stmtcachesize(),
+            **self._keepalive()
+        )
+
+        # Configurar conexión como READ ONLY
+        cursor = connection.cursor()
+        cursor.execute("SET TRANSACTION READ ONLY")
+        cursor.close()
+        self._ultimo_uso = time.monotonic()
+        return connection
+
     def conectar(self):
-        """Establece conexión con Oracle en modo de solo lectura."""
+        """Establece conexión (o pool) con Oracle en modo de solo lectura."""
         try:
             if not self.config:
                 self.cargar_configuracion()
@@ -76,48 +303,285 @@ class OracleConnection:
             if not self.config:
                 return "❌ No se encontró configuración. Ejecuta el script de configuración primero."
 
-            # Crear DSN (Data Source Name)
-            dsn = oracledb.makedsn(
-                self.config['host'],
-                self.config['port'],
-                service_name=self.config['service_name']
-            )
-
-            # Conectar a Oracle
-            self.connection = oracledb.connect(
-                user=self.config['user'],
-                password=self.config['password'],
-                dsn=dsn
-            )
-
-            # Configurar conexión como READ ONLY
-            cursor = self.connection.cursor()
-            cursor.execute("SET TRANSACTION READ ONLY")
-            cursor.close()
-
+            if self.esta_conectado():
+                return f"ℹ️  Ya conectado a Oracle: {self.config['host']}/{self.config['service_name']}"
+
+            cache_consultas.invalidar()
+
+            if self.usa_pool():
+                self.pool = self._crear_pool()
+                # El pool abre sesiones en segundo plano: adquirir una
+                # ahora para detectar errores de credenciales o red
+                try:
+                    self.pool.acquire().close()
+                except Exception:
+                    self.pool.close(force=True)
+                    self.pool = None
+                    raise
+                modo = "DRCP" if self.config.get('drcp') else "pool"
+                return (
+                    f"✅ Conectado a Oracle ({modo} {self.pool.min}-{self.pool.max} sesiones): "
+                    f"{self.config['host']}/{self.config['service_name']} (usuario: {self.config['user']})"
+                )
+
+            self.connection = self._abrir_conexion()
             return f"✅ Conectado a Oracle: {self.config['host']}/{self.config['service_name']} (usuario: {self.config['user']})"
 
         except Exception as e:
             return f"❌ Error de conexión: {str(e)}"
 
-    def ejecutar_query(self, query: str, params=None):
-        """Ejecuta una query de solo lectura y retorna resultados."""
+    @contextmanager
+    def sesion(self):
+        """
+        Entrega una sesión lista para consultar.
+
+        En modo pool adquiere una sesión y la devuelve al pool al salir. La
+        protección de solo lectura es validar_solo_lectura (y una cuenta de
+        BD sin privilegios de escritura): SET TRANSACTION READ ONLY no
+        sobrevive al rollback del release, así que habría que repetirlo en
+        cada adquisición y costaría dos round trips por consulta (el SET y
+        el rollback). Con 'pool_solo_lectura': True se repite igualmente.
+        En modo conexión única entrega el handle compartido, tras
+        comprobarlo si llevaba tiempo inactivo (_comprobar_inactiva). Con
+        las métricas activas instala el contador de round trips (solo modo
+        Thin) en la sesión entregada.
+        """
+        if self.pool is not None:
+            connection = self.pool.acquire()
+            interrumpida = False
+            try:
+                self._instrumentar(connection)
+                if self.config.get('pool_solo_lectura'):
+                    cursor = connection.cursor()
+                    cursor.execute("SET TRANSACTION READ ONLY")
+                    cursor.close()
+                with self._en_curso_de(connection):
+                    yield connection
+            except KeyboardInterrupt:
+                interrumpida = True
+                raise
+            finally:
+                if interrumpida:
+                    # La llamada cortada puede dejar la sesión a medias: no vuelve al pool
+                    self.pool.drop(connection)
+                else:
+                    self.pool.release(connection)
+        else:
+            self._comprobar_inactiva()
+            self._instrumentar(self.connection)
+            try:
+                with self._en_curso_de(self.connection):
+                    yield self.connection
+            except KeyboardInterrupt:
+                self._interrumpida = True
+                raise
+
+    @contextmanager
+    def _en_curso_de(self, connection):
+        """Registra la sesión para cancelar() y la cancela si llega un Ctrl+C."""
+        with self._bloqueo_en_curso:
+            self._en_curso.add(connection)
         try:
-            if not self.connection:
+            yield
+        except KeyboardInterrupt:
+            try:
+                connection.cancel()
+            except Exception:
+                pass
+            raise
+        finally:
+            with self._bloqueo_en_curso:
+                self._en_curso.discard(connection)
+
+    def cancelar(self) -> int:
+        """
+        Cancela las llamadas en curso de todas las sesiones (también las de
+        otros hilos, como los de rastrear_esquemas). Cada query cancelada
+        termina con ORA-01013 y su sesión sigue siendo válida.
+        Returns:
+            Número de sesiones canceladas
+        """
+        with self._bloqueo_en_curso:
+            sesiones = list(self._en_curso)
+        for connection in sesiones:
+            try:
+                connection.cancel()
+            except Exception:
+                pass
+        return len(sesiones)
+
+    def _comprobar_inactiva(self):
+        """
+        Conexión única: si lleva más de 'ping_interval' segundos sin usarse,
+        la comprueba con un ping (un round trip) y la reabre si se cayó. En
+        modo pool lo hace el propio pool al adquirir la sesión. Si la última
+        llamada se cortó con Ctrl+C la reabre directamente.
+        """
+        ahora = time.monotonic()
+        if self._interrumpida:
+            self._interrumpida = False
+            if self.reconectar():
+                self._ultimo_uso = ahora
+                return
+        if ahora - self._ultimo_uso > self.config.get('ping_interval', 60):
+            try:
+                self.connection.ping()
+            except Exception as e:
+                if not es_desconexion(e) or not self.reconectar(e):
+                    raise
+        self._ultimo_uso = ahora
+
+    def reconectar(self, error: Exception = None) -> bool:
+        """
+        Recupera la conexión tras una caída, reintentando con espera
+        exponencial: 'reintentos_conexion' intentos (3), empezando en
+        'espera_reconexion' segundos (0.5) y sin pasar de
+        'espera_reconexion_max' (8). En modo pool basta con obtener una
+        sesión que responda (el pool descarta las caídas); en conexión única
+        se cierra el handle y se abre otro.
+        Returns:
+            True si la conexión vuelve a responder
+        """
+        if error is not None:
+            self.ultimo_error = str(error)
+        if not self.esta_conectado():
+            return False
+
+        espera = self.config.get('espera_reconexion', 0.5)
+        with self._bloqueo_reconexion:
+            for intento in range(self.config.get('reintentos_conexion', 3)):
+                if intento:
+                    time.sleep(min(espera * 2 ** (intento - 1), self.config.get('espera_reconexion_max', 8)))
+                try:
+                    if self.pool is not None:
+                        with self.pool.acquire() as connection:
+                            connection.ping()
+                    else:
+                        try:
+                            self.connection.close()
+                        except Exception:
+                            pass
+                        self.connection = self._abrir_conexion()
+                except Exception as e:
+                    self.ultimo_error = str(e)
+                    continue
+                self.reconexiones += 1
+                return True
+        return False
+
+    def _reintentar(self, funcion, *args):
+        """
+        Ejecuta funcion(*args) y, si falla porque la sesión o la red se
+        cayeron, reconecta y la repite una vez. Solo hay lecturas, así que
+        repetirla es seguro.
+        """
+        try:
+            return funcion(*args)
+        except Exception as e:
+            if not es_desconexion(e) or not self.reconectar(e):
+                raise
+        return funcion(*args)
+
+    def salud(self) -> dict:
+        """
+        Sonda barata del estado de la conexión: un ping (un round trip, sin
+        SQL). Si la sesión se había caído intenta reconectar.
+        Returns:
+            {'conectado', 'modo', 'latencia_ms', 'reconexiones', 'ultimo_error'}
+        """
+        estado = {'conectado': False, 'modo': None, 'latencia_ms': None}
+        if self.esta_conectado():
+            estado['modo'] = 'pool' if self.pool is not None else 'conexión única'
+            inicio = time.perf_counter()
+            try:
+                self._reintentar(self._ping)
+                estado['conectado'] = True
+                estado['latencia_ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+            except Exception as e:
+                self.ultimo_error = str(e)
+        estado['reconexiones'] = self.reconexiones
+        estado['ultimo_error'] = self.ultimo_error
+        return estado
+
+    def _ping(self):
+        if self.pool is not None:
+            with self.pool.acquire() as connection:
+                connection.ping()
+        else:
+            self.connection.ping()
+            self._ultimo_uso = time.monotonic()
+
+    @staticmethod
+    def _instrumentar(connection):
+        """Instala (o quita) contar_ida_y_vuelta como round_trip_callback."""
+        if hasattr(connection, 'round_trip_callback'):
+            callback = contar_ida_y_vuelta if metricas.activas else None
+            if connection.round_trip_callback is not callback:
+                connection.round_trip_callback = callback
+
+    def ejecutar_query(self, query: str, params=None, arraysize=None, nombre: str = 'sql',
+                       cache: bool = False, timeout: float = None):
+        """
+        Ejecuta una query de solo lectura y retorna resultados.
+        Args:
+            arraysize: Pista opcional de filas por round trip; el prefetch se
+                ajusta a arraysize + 1 para que un resultado que quepa llegue
+                en el mismo round trip del execute
+            nombre: Serie de métricas de la consulta (la sentencia del registro)
+            cache: Servir y guardar el resultado en cache_consultas, con
+                'cache_consultas' entradas como máximo (0 la desactiva) y
+                'ttl_cache_consultas' segundos de vida de ORACLE_CONFIG
+            timeout: Segundos máximos por round trip (call_timeout de
+                oracledb); al superarlos se cancela la llamada
+        """
+        maximo = self.config.get('cache_consultas', 256) if cache and self.config else 0
+        clave = cache_consultas.clave(query, params) if maximo else None
+        if clave is not None:
+            resultado = cache_consultas.obtener(clave, self.config.get('ttl_cache_consultas', 300))
+            if resultado is not None:
+                return resultado
+
+        resultado = self._medir_query(query, params, arraysize, nombre, timeout)
+        if clave is not None and isinstance(resultado, dict):
+            cache_consultas.guardar(clave, nombre, resultado, maximo)
+        return resultado
+
+    def _medir_query(self, query: str, params, arraysize, nombre: str, timeout=None):
+        """_ejecutar_query con registro en metricas si están activas."""
+        if not metricas.activas:
+            return self._ejecutar_query(query, params, arraysize, timeout)
+        ida_y_vuelta = ida_y_vuelta_hilo()
+        inicio = time.perf_counter()
+        resultado = self._ejecutar_query(query, params, arraysize, timeout)
+        segundos = time.perf_counter() - inicio
+        filas = resultado['rows'] if isinstance(resultado, dict) else []
+        registrar_consulta(nombre, segundos, es_error(resultado), segundos_bd=segundos,
+                           filas=len(filas), bytes=tamano_filas(filas),
+                           ida_y_vuelta=ida_y_vuelta_hilo() - ida_y_vuelta)
+        return resultado
+
+    def _ejecutar_query(self, query: str, params=None, arraysize=None, timeout=None):
+        try:
+            if not self.esta_conectado():
                 return "❌ No hay conexión activa. Usa ConectarOracle primero."
 
             # SEGURIDAD: Verificar que la query es de solo lectura
-            query_upper = query.strip().upper()
-            comandos_prohibidos = [
-                'INSERT', 'UPDATE', 'DELETE', 'DROP', 'CREATE',
-                'ALTER', 'TRUNCATE', 'GRANT', 'REVOKE', 'COMMIT', 'ROLLBACK'
-            ]
+            error = validar_solo_lectura(query)
+            if error:
+                return error
+
+            return self._reintentar(self._consultar, query, params, arraysize, timeout)
 
-            for cmd in comandos_prohibidos:
-                if cmd in query_upper.split():
-                    return f"🚫 PROHIBIDO: Comando '{cmd}' no permitido. Solo lectura."
+        except Exception as e:
+            return f"❌ Error en query: {str(e)}"
 
-            cursor = self.connection.cursor()
+    def _consultar(self, query: str, params, arraysize, timeout=None):
+        with self.sesion() as connection, self._limite_tiempo(connection, timeout):
+            cursor = connection.cursor()
+            cursor.outputtypehandler = texto_en_linea
+            if arraysize:
+                cursor.arraysize = arraysize
+                cursor.prefetchrows = arraysize + 1
 
             if params:
                 cursor.execute(query, params)
@@ -139,26 +603,1504 @@ class OracleConnection:
                 cursor.close()
                 return {'columns': [], 'rows': [], 'count': 0}
 
+    @staticmethod
+    @contextmanager
+    def _limite_tiempo(connection, segundos):
+        """
+        Aplica call_timeout (en ms) a la sesión durante el bloque y después
+        restaura el anterior, que la conexión única comparte entre queries.
+        Debe envolver un solo round trip (execute o fetchmany), nunca la
+        vida de un cursor abierto.
+        """
+        if not segundos:
+            yield
+            return
+        anterior = getattr(connection, 'call_timeout', 0)
+        connection.call_timeout = int(segundos * 1000)
+        try:
+            yield
+        finally:
+            connection.call_timeout = anterior
+
+    def ejecutar_sentencia(self, nombre: str, params=None, **formato):
+        """Ejecuta una sentencia del registro SENTENCIAS con su pista de arraysize."""
+        sentencia = SENTENCIAS[nombre]
+        return self.ejecutar_query(sentencia.texto(**formato), params,
+                                   arraysize=sentencia.arraysize, nombre=nombre,
+                                   cache=sentencia.cache)
+
+    def iterar_sentencia(self, nombre: str, params=None, **formato):
+        """Versión por lotes de ejecutar_sentencia (ver iterar_query)."""
+        sentencia = SENTENCIAS[nombre]
+        return self.iterar_query(sentencia.texto(**formato), params,
+                                 arraysize=sentencia.arraysize, nombre=nombre)
+
+    def iterar_query(self, query: str, params=None, arraysize=None, prefetchrows=None,
+                     nombre: str = 'sql', timeout: float = None):
+        """
+        Ejecuta una query de solo lectura y entrega las filas por lotes.
+
+        A diferencia de ejecutar_query no materializa el resultado: lee con
+        fetchmany() usando arraysize/prefetchrows (por defecto 'arraysize' y
+        'prefetchrows' de ORACLE_CONFIG), así la memoria no depende del
+        tamaño del catálogo. La sesión queda reservada hasta que se agotan
+        o se cierran los lotes (LotesConsulta.close(), también si nunca se
+        llegó a pedir uno). Con `timeout`, el call_timeout se aplica al
+        execute y a cada fetchmany. En las métricas, el tiempo de BD cuenta
+        solo el execute y los fetchmany; el total va hasta agotar los lotes.
+        Returns:
+            {'columns': [...], 'lotes': LotesConsulta (iterador de listas de filas)}
+            o mensaje de error
+        """
+        if not self.esta_conectado():
+            return "❌ No hay conexión activa. Usa ConectarOracle primero."
+
+        error = validar_solo_lectura(query)
+        if error:
+            return error
+
+        arraysize = arraysize or self.config.get('arraysize', 1000)
+        if prefetchrows is None:
+            prefetchrows = self.config.get('prefetchrows', arraysize)
+
+        medicion = {'segundos_bd': 0.0, 'filas': 0, 'bytes': 0, 'ida_y_vuelta': ida_y_vuelta_hilo()}
+        inicio = time.perf_counter()
+
+        pila = ExitStack()
+        if metricas.activas:
+            pila.callback(self._cerrar_medicion, nombre, inicio, medicion)
+        else:
+            medicion = None
+        try:
+            abiertos, connection, cursor = self._reintentar(self._abrir_lectura, query, params, arraysize,
+                                                prefetchrows, timeout)
+            pila.enter_context(abiertos)
         except Exception as e:
+            if medicion is not None:
+                medicion['error'] = True
+            pila.close()
             return f"❌ Error en query: {str(e)}"
+        if medicion is not None:
+            medicion['segundos_bd'] = time.perf_counter() - inicio
+
+        lotes = LotesConsulta(pila, connection, cursor, medicion, timeout)
+        columns = [desc[0] for desc in cursor.description] if cursor.description else []
+        if not columns:
+            lotes.close()
+        return {'columns': columns, 'lotes': lotes}
+
+    def _abrir_lectura(self, query: str, params, arraysize, prefetchrows, timeout=None):
+        """
+        Reserva sesión y cursor y ejecuta la query de iterar_query.
+        Returns:
+            (ExitStack que los libera, sesión, cursor)
+        """
+        with ExitStack() as pila:
+            connection = pila.enter_context(self.sesion())
+            cursor = pila.enter_context(connection.cursor())
+            cursor.outputtypehandler = texto_en_linea
+            cursor.arraysize = arraysize
+            cursor.prefetchrows = prefetchrows
+            # El timeout cubre el execute; cada fetchmany lo pone de nuevo (LotesConsulta)
+            with self._limite_tiempo(connection, timeout):
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+            return pila.pop_all(), connection, cursor
+
+    @staticmethod
+    def _cerrar_medicion(nombre: str, inicio: float, medicion: dict):
+        """Registra una consulta de iterar_query al cerrar su sesión."""
+        error = medicion.pop('error', False)
+        medicion['ida_y_vuelta'] = ida_y_vuelta_hilo() - medicion['ida_y_vuelta']
+        registrar_consulta(nombre, time.perf_counter() - inicio, error, **medicion)
+
+    def ejecutar_df(self, query: str, params=None, arraysize=None, nombre: str = 'sql'):
+        """
+        Ejecuta una query de solo lectura por la ruta Arrow de oracledb
+        (fetch_df_all): las filas llegan en columnas Arrow sin crear una
+        tupla de Python por fila. Requiere python-oracledb 3.0 o superior.
+        En las métricas no se estiman bytes (las filas no pasan por Python).
+        Returns:
+            oracledb.DataFrame o mensaje de error
+        """
+        if not metricas.activas:
+            return self._ejecutar_df(query, params, arraysize)
+        ida_y_vuelta = ida_y_vuelta_hilo()
+        inicio = time.perf_counter()
+        resultado = self._ejecutar_df(query, params, arraysize)
+        segundos = time.perf_counter() - inicio
+        registrar_consulta(nombre, segundos, isinstance(resultado, str), segundos_bd=segundos,
+                           filas=0 if isinstance(resultado, str) else resultado.num_rows(),
+                           ida_y_vuelta=ida_y_vuelta_hilo() - ida_y_vuelta)
+        return resultado
+
+    def _ejecutar_df(self, query: str, params=None, arraysize=None):
+        try:
+            if not self.esta_conectado():
+                return "❌ No hay conexión activa. Usa ConectarOracle primero."
+
+            error = validar_solo_lectura(query)
+            if error:
+                return error
+
+            return self._reintentar(self._consultar_df, query, params, arraysize)
+
+        except Exception as e:
+            return f"❌ Error en query: {str(e)}"
+
+    def _consultar_df(self, query: str, params, arraysize):
+        with self.sesion() as connection:
+            if not hasattr(connection, 'fetch_df_all'):
+                return "❌ La exportación Arrow requiere python-oracledb >= 3.0 (pip install -U oracledb)"
+            return connection.fetch_df_all(
+                query, params, arraysize=arraysize or self.config.get('arraysize', 1000))
 
     def cerrar(self):
-        """Cierra la conexión a Oracle."""
+        """Cierra la conexión (o el pool) a Oracle y vacía la caché de resultados."""
+        cache_consultas.invalidar()
+        if self.pool is not None:
+            self.pool.close(force=True)
+            self.pool = None
+            return "✅ Pool de conexiones cerrado"
         if self.connection:
-            self.connection.close()
+            try:
+                self.connection.close()
+            except oracledb.Error:
+                pass  # ya la había cerrado una caída o una reconexión fallida
             self.connection = None
             return "✅ Conexión cerrada"
         return "ℹ️  No había conexión activa"
 
 
+COMANDOS_PROHIBIDOS = frozenset({
+    'INSERT', 'UPDATE', 'DELETE', 'MERGE', 'DROP', 'CREATE',
+    'ALTER', 'TRUNCATE', 'GRANT', 'REVOKE', 'COMMIT', 'ROLLBACK'
+})
+
+# Lexer de una sola pasada: comentarios, literales e identificadores entre
+# comillas se consumen enteros para que su contenido no cuente como palabra.
+TOKENS_SQL = re.compile(r"""
+      --[^\n]*
+    | /\*.*?(?:\*/|\Z)
+    | [nN]?[qQ]'(?:\[.*?\]|\{.*?\}|\(.*?\)|<.*?>|(?P<delim>\S).*?(?P=delim))'
+    | [nN]?'(?:[^']|'')*'?
+    | "[^"]*"?
+    | (?P<palabra>[A-Za-z][A-Za-z0-9_$#]*)
+    | (?P<fin>;)
+""", re.S | re.X)
+
+
+@lru_cache(maxsize=4096)
+def validar_solo_lectura(query: str):
+    """
+    Comprueba que la query es una única sentencia SELECT/WITH sin comandos
+    de modificación, ignorando comentarios y literales. El veredicto se
+    memoriza por texto de sentencia.
+    Returns:
+        Mensaje de error si la query está prohibida, None si es de solo lectura
+    """
+    primera = None
+    terminada = False
+
+    for token in TOKENS_SQL.finditer(query):
+        palabra = token.group('palabra')
+        if palabra is None:
+            terminada = terminada or token.group('fin') is not None
+            continue
+
+        if terminada:
+            return "🚫 PROHIBIDO: Solo se permite una sentencia por consulta."
+
+        palabra = palabra.upper()
+        if palabra in COMANDOS_PROHIBIDOS:
+            return f"🚫 PROHIBIDO: Comando '{palabra}' no permitido. Solo lectura."
+        if primera is None:
+            primera = palabra
+            if primera not in ('SELECT', 'WITH'):
+                break
+
+    if primera not in ('SELECT', 'WITH'):
+        return "🚫 PROHIBIDO: Solo se permiten consultas SELECT. Solo lectura."
+    return None
+
+
 # Instancia global de conexión
 oracle_conn = OracleConnection()
 
 
+# ============================================================================
+# MÉTRICAS DE HERRAMIENTAS Y CONSULTAS
+# ============================================================================
+
+class Metricas:
+    """
+    Registro de métricas por herramienta y por consulta, seguro entre hilos.
+
+    Cada serie acumula llamadas, errores, tiempo total, tiempo de base de
+    datos, filas, bytes aproximados y round trips, y un histograma de
+    latencias con cubetas fijas. Desactivado por defecto: con activas=False
+    las herramientas y consultas no miden nada.
+    """
+
+    CUBETAS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    CONTADORES = ('segundos_bd', 'filas', 'bytes', 'ida_y_vuelta')
+
+    def __init__(self):
+        self.activas = False
+        self._bloqueo = threading.Lock()
+        self._series = {}
+
+    def reiniciar(self):
+        """Descarta todas las series."""
+        with self._bloqueo:
+            self._series = {}
+
+    def registrar(self, tipo: str, nombre: str, segundos: float, error: bool = False, **contadores):
+        """
+        Añade una observación a la serie (tipo, nombre).
+        Args:
+            tipo: 'herramienta' o 'consulta'
+            contadores: segundos_bd, filas, bytes, ida_y_vuelta
+        """
+        with self._bloqueo:
+            serie = self._series.get((tipo, nombre))
+            if serie is None:
+                serie = self._series[(tipo, nombre)] = dict(
+                    llamadas=0, errores=0, segundos=0.0, cubetas=[0] * (len(self.CUBETAS) + 1),
+                    **{clave: 0 for clave in self.CONTADORES})
+            serie['llamadas'] += 1
+            serie['errores'] += bool(error)
+            serie['segundos'] += segundos
+            serie['cubetas'][bisect_left(self.CUBETAS, segundos)] += 1
+            for clave, valor in contadores.items():
+                serie[clave] += valor
+
+    def a_dict(self) -> dict:
+        """Series agrupadas por tipo, con el histograma acumulado por cubeta."""
+        with self._bloqueo:
+            series = {clave: dict(serie, cubetas=list(serie['cubetas']))
+                      for clave, serie in self._series.items()}
+        resultado = {'herramientas': {}, 'consultas': {}}
+        for (tipo, nombre), serie in sorted(series.items()):
+            acumuladas = list(accumulate(serie.pop('cubetas')))
+            serie['segundos'] = round(serie['segundos'], 6)
+            serie['segundos_bd'] = round(serie['segundos_bd'], 6)
+            serie['histograma'] = dict(zip([str(c) for c in self.CUBETAS] + ['+Inf'], acumuladas))
+            resultado[f"{tipo}s"][nombre] = serie
+        return resultado
+
+    def a_json(self) -> str:
+        """Métricas en JSON."""
+        return json.dumps(self.a_dict(), indent=2, ensure_ascii=False)
+
+    def a_prometheus(self) -> str:
+        """Métricas en el formato de texto de exposición de Prometheus."""
+        lineas = []
+        for tipo, series in self.a_dict().items():
+            etiqueta = tipo[:-1]
+            metrica = f"oracle_agente_{etiqueta}"
+            if not series:
+                continue
+            lineas.append(f"# HELP {metrica}_segundos Latencia por {etiqueta}")
+            lineas.append(f"# TYPE {metrica}_segundos histogram")
+            for nombre, serie in series.items():
+                valor = _etiqueta_prometheus(nombre)
+                for cubeta, cantidad in serie['histograma'].items():
+                    lineas.append(f'{metrica}_segundos_bucket{{{etiqueta}="{valor}",le="{cubeta}"}} {cantidad}')
+                lineas.append(f'{metrica}_segundos_sum{{{etiqueta}="{valor}"}} {serie["segundos"]}')
+                lineas.append(f'{metrica}_segundos_count{{{etiqueta}="{valor}"}} {serie["llamadas"]}')
+            for clave in ('errores',) + self.CONTADORES:
+                lineas.append(f"# TYPE {metrica}_{clave}_total counter")
+                for nombre, serie in series.items():
+                    lineas.append(f'{metrica}_{clave}_total{{{etiqueta}="{_etiqueta_prometheus(nombre)}"}} '
+                                  f'{serie[clave]}')
+        return "\n".join(lineas) + "\n"
+
+    def exportar(self, formato: str) -> str:
+        """Métricas en 'json' o 'prometheus'."""
+        return self.a_prometheus() if formato == 'prometheus' else self.a_json()
+
+
+FORMATOS_METRICAS = ('json', 'prometheus')
+
+metricas = Metricas()
+
+# Estado por hilo: round trips contados por el callback de oracledb y pila
+# de herramientas en curso, que reciben el coste de sus consultas.
+_hilo = threading.local()
+
+
+def _etiqueta_prometheus(valor: str) -> str:
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def contar_ida_y_vuelta(nombre):
+    """round_trip_callback de oracledb (modo Thin): cuenta los round trips del hilo."""
+    _hilo.ida_y_vuelta = getattr(_hilo, 'ida_y_vuelta', 0) + 1
+
+
+def ida_y_vuelta_hilo() -> int:
+    """Round trips contados en el hilo actual desde que se activaron las métricas."""
+    return getattr(_hilo, 'ida_y_vuelta', 0)
+
+
+def tamano_filas(filas) -> int:
+    """Bytes aproximados de un lote de filas (texto y binarios por longitud, resto 8)."""
+    return sum(
+        len(valor) if isinstance(valor, (str, bytes)) else 0 if valor is None else 8
+        for fila in filas for valor in fila
+    )
+
+
+def es_error(resultado) -> bool:
+    """Un resultado de texto que empieza por ❌ o 🚫 es un error."""
+    return isinstance(resultado, str) and resultado.lstrip().startswith(('❌', '🚫'))
+
+
+def registrar_consulta(nombre: str, segundos: float, error: bool = False, **contadores):
+    """Registra una consulta y suma su coste a las herramientas en curso del hilo."""
+    metricas.registrar('consulta', nombre, segundos, error, **contadores)
+    for medicion in getattr(_hilo, 'herramientas', ()):
+        for clave, valor in contadores.items():
+            medicion[clave] += valor
+
+
+def instrumentar(funcion):
+    """
+    Decorador de herramientas: con las métricas activas registra el tiempo
+    de cada llamada junto con el tiempo de BD, filas, bytes y round trips
+    de las consultas que hizo (en su mismo hilo).
+    """
+    @wraps(funcion)
+    def herramienta(*args, **kwargs):
+        if not metricas.activas:
+            return funcion(*args, **kwargs)
+        pila = _hilo.__dict__.setdefault('herramientas', [])
+        medicion = {clave: 0 for clave in Metricas.CONTADORES}
+        pila.append(medicion)
+        inicio = time.perf_counter()
+        resultado = None
+        try:
+            resultado = funcion(*args, **kwargs)
+            return resultado
+        finally:
+            pila.pop()
+            metricas.registrar('herramienta', funcion.__name__, time.perf_counter() - inicio,
+                               resultado is None or es_error(resultado), **medicion)
+    return herramienta
+
+
+@contextmanager
+def medir_en_hilo():
+    """
+    La pila de herramientas en curso es por hilo, así que las consultas de
+    un hilo de trabajo no llegan a la herramienta que lo lanzó. Este bloque
+    acumula su coste en un dict que el hilo de la herramienta suma después
+    con sumar_a_herramientas().
+    """
+    medicion = {clave: 0 for clave in Metricas.CONTADORES}
+    pila = _hilo.__dict__.setdefault('herramientas', [])
+    pila.append(medicion)
+    try:
+        yield medicion
+    finally:
+        pila.pop()
+
+
+def sumar_a_herramientas(medicion: dict):
+    """Suma el coste medido en otro hilo (medir_en_hilo) a las herramientas en curso de este."""
+    for destino in getattr(_hilo, 'herramientas', ()):
+        for clave, valor in medicion.items():
+            destino[clave] += valor
+
+
+# ============================================================================
+# CACHÉ DE RESULTADOS DE CONSULTAS (LRU + TTL)
+# ============================================================================
+
+class CacheConsultas:
+    """
+    Caché en memoria de resultados de consultas del diccionario, acotada en
+    entradas (se descarta la usada hace más tiempo) y con caducidad por TTL.
+
+    La clave es el SQL normalizado más los valores de bind. Solo guarda las
+    sentencias del registro marcadas con cache=True: la metadata que pide
+    el agente cambia poco y el bucle ReAct repite a menudo la misma
+    llamada en un turno.
+    """
+
+    def __init__(self):
+        self._bloqueo = threading.Lock()
+        self._entradas = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.caducadas = 0
+        self.desalojadas = 0
+        self.generacion = 0   # aumenta en cada invalidación
+
+    @staticmethod
+    def clave(query: str, params=None):
+        """
+        Clave de caché de una consulta, o None si los binds no son hashables.
+        Los espacios se normalizan solo si la query no tiene literales ni
+        identificadores entre comillas.
+        """
+        if "'" not in query and '"' not in query:
+            query = " ".join(query.split())
+        if isinstance(params, dict):
+            binds = tuple(sorted(params.items()))
+        else:
+            binds = tuple(params or ())
+        try:
+            hash(binds)
+        except TypeError:
+            return None
+        return query.strip(), binds
+
+    def obtener(self, clave, ttl: float):
+        """Resultado guardado (una copia) o None si no está o ha caducado."""
+        with self._bloqueo:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and time.monotonic() - entrada[0] >= ttl:
+                del self._entradas[clave]
+                self.caducadas += 1
+                entrada = None
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            resultado = entrada[2]
+        return dict(resultado, rows=list(resultado['rows']))
+
+    def guardar(self, clave, nombre: str, resultado: dict, maximo: int):
+        """Guarda una copia del resultado y desaloja las entradas que sobran."""
+        with self._bloqueo:
+            self._entradas[clave] = (time.monotonic(), nombre, dict(resultado, rows=list(resultado['rows'])))
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > maximo:
+                self._entradas.popitem(last=False)
+                self.desalojadas += 1
+
+    def invalidar(self, nombre: str = None) -> int:
+        """
+        Descarta las entradas de una sentencia del registro (o todas).
+        Returns:
+            Número de entradas descartadas
+        """
+        with self._bloqueo:
+            self.generacion += 1
+            if nombre is None:
+                descartadas = len(self._entradas)
+                self._entradas.clear()
+                return descartadas
+            claves = [clave for clave, entrada in self._entradas.items() if entrada[1] == nombre]
+            for clave in claves:
+                del self._entradas[clave]
+            return len(claves)
+
+    def estadisticas(self) -> dict:
+        """Contadores de aciertos, fallos, caducadas, desalojadas y entradas."""
+        with self._bloqueo:
+            return {'aciertos': self.aciertos, 'fallos': self.fallos, 'caducadas': self.caducadas,
+                    'desalojadas': self.desalojadas, 'entradas': len(self._entradas)}
+
+
+cache_consultas = CacheConsultas()
+
+
+# ============================================================================
+# REGISTRO DE SENTENCIAS DEL DICCIONARIO
+# ============================================================================
+
+class Sentencia:
+    """
+    Sentencia del diccionario registrada una sola vez a nivel de módulo.
+
+    El texto SQL es fijo (o una plantilla con un número acotado de variantes),
+    así que cada sesión lo encuentra en su statement cache y no lo vuelve a
+    parsear. Guarda la pista de arraysize, si su resultado puede servirse
+    desde cache_consultas y contadores de uso: un acierto es una ejecución
+    cuyo texto exacto ya se había preparado en este proceso.
+    """
+
+    def __init__(self, nombre: str, sql: str, arraysize: int = 100, cache: bool = False):
+        self.nombre = nombre
+        self.sql = sql
+        self.arraysize = arraysize
+        self.cache = cache
+        self.ejecuciones = 0
+        self.aciertos = 0
+        self._textos = set()
+
+    def texto(self, **formato) -> str:
+        """Devuelve el SQL final (con las variantes aplicadas) y cuenta el uso."""
+        texto = self.sql.format(**formato) if formato else self.sql
+        self.ejecuciones += 1
+        if texto in self._textos:
+            self.aciertos += 1
+        else:
+            self._textos.add(texto)
+        return texto
+
+
+SENTENCIAS = {}
+
+
+def registrar_sentencia(nombre: str, sql: str, arraysize: int = 100, cache: bool = False) -> Sentencia:
+    """Añade una sentencia al registro y la devuelve."""
+    SENTENCIAS[nombre] = Sentencia(nombre, sql, arraysize, cache)
+    return SENTENCIAS[nombre]
+
+
+def resumen_sentencias() -> str:
+    """Tabla con ejecuciones y aciertos de statement cache por sentencia."""
+    output = f"{'Sentencia':<30} {'Ejecuciones':>12} {'Aciertos':>10} {'Variantes':>10}\n"
+    output += "=" * 65 + "\n"
+    for sentencia in SENTENCIAS.values():
+        if sentencia.ejecuciones:
+            output += (f"{sentencia.nombre:<30} {sentencia.ejecuciones:>12} "
+                       f"{sentencia.aciertos:>10} {len(sentencia._textos):>10}\n")
+    total = sum(s.ejecuciones for s in SENTENCIAS.values())
+    aciertos = sum(s.aciertos for s in SENTENCIAS.values())
+    output += f"\nTotal: {total} ejecuciones, {aciertos} aciertos de caché"
+    cache = cache_consultas.estadisticas()
+    output += (f"\nCaché de resultados: {cache['aciertos']} aciertos, {cache['fallos']} fallos, "
+               f"{cache['caducadas']} caducadas, {cache['desalojadas']} desalojadas, "
+               f"{cache['entradas']} entradas")
+    return output
+
+
+# ============================================================================
+# CACHÉ LOCAL DEL ESQUEMA (SNAPSHOT EN DISCO)
+# ============================================================================
+
+# Firma por tabla: LAST_DDL_TIME de la tabla y de sus índices. Si cambia la
+# firma, la metadata de esa tabla se vuelve a leer del diccionario.
+registrar_sentencia('snapshot_firmas', """
+    SELECT
+        t.object_name,
+        TO_CHAR(GREATEST(t.last_ddl_time, NVL(MAX(i.last_ddl_time), t.last_ddl_time)),
+                'YYYYMMDDHH24MISS') as firma
+    FROM user_objects t
+    LEFT JOIN user_indexes ui ON ui.table_name = t.object_name
+    LEFT JOIN user_objects i ON i.object_name = ui.index_name AND i.object_type = 'INDEX'
+    WHERE t.object_type = 'TABLE'
+    GROUP BY t.object_name, t.last_ddl_time
+""", arraysize=1000)
+
+# Sentencias de carga masiva. {filtro} se sustituye por la condición sobre
+# table_name de cada lote de tablas modificadas (ver _filtro_tablas).
+TABLAS_SNAPSHOT = ('tablas', 'columnas', 'relaciones', 'claves', 'indices', 'comentarios')
+
+registrar_sentencia('snapshot_tablas', """
+    SELECT
+        table_name,
+        tablespace_name,
+        num_rows,
+        CASE
+            WHEN temporary = 'Y' THEN 'TEMPORAL'
+            ELSE 'PERMANENTE'
+        END as tipo
+    FROM user_tables
+    WHERE {filtro}
+""", arraysize=1000)
+
+registrar_sentencia('snapshot_columnas', """
+    SELECT
+        table_name,
+        column_id,
+        column_name,
+        data_type,
+        data_length,
+        data_precision,
+        data_scale,
+        nullable,
+        data_default
+    FROM user_tab_columns
+    WHERE {filtro}
+""", arraysize=1000)
+
+registrar_sentencia('snapshot_relaciones', """
+    SELECT
+        a.constraint_name,
+        a.table_name,
+        a.column_name,
+        c_pk.table_name as tabla_referenciada,
+        b.column_name as columna_referenciada
+    FROM user_cons_columns a
+    JOIN user_constraints c ON a.constraint_name = c.constraint_name
+    JOIN user_constraints c_pk ON c.r_constraint_name = c_pk.constraint_name
+    JOIN user_cons_columns b ON c_pk.constraint_name = b.constraint_name
+    WHERE c.constraint_type = 'R'
+    AND {filtro_a}
+""", arraysize=1000)
+
+registrar_sentencia('snapshot_indices', """
+    SELECT
+        i.table_name,
+        i.index_name,
+        i.index_type,
+        i.uniqueness,
+        LISTAGG(ic.column_name, ', ') WITHIN GROUP (ORDER BY ic.column_position) as columnas
+    FROM user_indexes i
+    LEFT JOIN user_ind_columns ic ON i.index_name = ic.index_name
+    WHERE {filtro_i}
+    GROUP BY i.table_name, i.index_name, i.index_type, i.uniqueness
+""", arraysize=1000)
+
+# Columnas de PKs y claves únicas (las FKs ya están en snapshot_relaciones)
+registrar_sentencia('snapshot_claves', """
+    SELECT cc.table_name, cc.column_name, c.constraint_type
+    FROM user_cons_columns cc
+    JOIN user_constraints c ON cc.constraint_name = c.constraint_name
+    WHERE c.constraint_type IN ('P', 'U')
+    AND {filtro_cc}
+""", arraysize=1000)
+
+registrar_sentencia('snapshot_comentarios', """
+    SELECT table_name, NULL as column_name, comments
+    FROM user_tab_comments
+    WHERE comments IS NOT NULL
+    AND {filtro}
+    UNION ALL
+    SELECT table_name, column_name, comments
+    FROM user_col_comments
+    WHERE comments IS NOT NULL
+    AND {filtro}
+""", arraysize=1000)
+
+ESQUEMA_SNAPSHOT = """
+    CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT);
+    CREATE TABLE IF NOT EXISTS firmas (table_name TEXT PRIMARY KEY, firma TEXT);
+    CREATE TABLE IF NOT EXISTS tablas (
+        table_name TEXT PRIMARY KEY, tablespace_name TEXT, num_rows INTEGER, tipo TEXT
+    );
+    CREATE TABLE IF NOT EXISTS columnas (
+        table_name TEXT, column_id INTEGER, column_name TEXT, data_type TEXT,
+        data_length INTEGER, data_precision INTEGER, data_scale INTEGER,
+        nullable TEXT, data_default TEXT
+    );
+    CREATE INDEX IF NOT EXISTS ix_columnas_tabla ON columnas (table_name, column_id);
+    CREATE TABLE IF NOT EXISTS relaciones (
+        constraint_name TEXT, table_name TEXT, column_name TEXT,
+        tabla_referenciada TEXT, columna_referenciada TEXT
+    );
+    CREATE INDEX IF NOT EXISTS ix_relaciones_tabla ON relaciones (table_name);
+    CREATE TABLE IF NOT EXISTS claves (table_name TEXT, column_name TEXT, constraint_type TEXT);
+    CREATE INDEX IF NOT EXISTS ix_claves_tabla ON claves (table_name, column_name);
+    CREATE TABLE IF NOT EXISTS indices (
+        table_name TEXT, index_name TEXT, index_type TEXT, uniqueness TEXT, columnas TEXT
+    );
+    CREATE INDEX IF NOT EXISTS ix_indices_tabla ON indices (table_name);
+    CREATE TABLE IF NOT EXISTS comentarios (table_name TEXT, column_name TEXT, comments TEXT);
+    CREATE INDEX IF NOT EXISTS ix_comentarios_tabla ON comentarios (table_name);
+    CREATE TABLE IF NOT EXISTS objetos (
+        id INTEGER PRIMARY KEY, table_name TEXT, column_name TEXT,
+        comentario TEXT, num_trigramas INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS ix_objetos_tabla ON objetos (table_name);
+    CREATE TABLE IF NOT EXISTS trigramas (
+        trigrama TEXT, objeto INTEGER, en_nombre INTEGER,
+        PRIMARY KEY (trigrama, objeto, en_nombre)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS ix_trigramas_objeto ON trigramas (objeto);
+"""
+
+# Versión del formato del snapshot. Si el fichero es de otra versión se
+# descartan las firmas para que el siguiente refresco lo relea entero.
+VERSION_SNAPSHOT = '3'
+
+# Máximo de binds por lista IN (Oracle admite 1000 expresiones). Potencia
+# de 2 para que coincida con el relleno de _filtro_tablas.
+TAMANO_LOTE_SNAPSHOT = 512
+
+
+def normalizar_texto(texto: str) -> str:
+    """Mayúsculas sin acentos y con cualquier símbolo convertido en espacio."""
+    texto = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode()
+    return re.sub(r'[^A-Z0-9]+', ' ', texto.upper()).strip()
+
+
+def trigramas(texto: str) -> set:
+    """
+    Trigramas de un texto al estilo pg_trgm: cada palabra (separada por
+    espacios o '_') se rellena con dos espacios delante y uno detrás.
+    """
+    resultado = set()
+    for palabra in normalizar_texto(texto.replace('_', ' ')).split():
+        palabra = f"  {palabra} "
+        resultado.update(palabra[i:i + 3] for i in range(len(palabra) - 2))
+    return resultado
+
+
+def _resultado(columns, rows):
+    """Empaqueta filas con la misma forma que OracleConnection.ejecutar_query."""
+    return {'columns': columns, 'rows': rows, 'count': len(rows)}
+
+
+class SnapshotEsquema:
+    """
+    Copia local (SQLite) de tablas, columnas, constraints e índices del esquema.
+
+    Se refresca de forma incremental comparando LAST_DDL_TIME en user_objects:
+    solo se releen las tablas cuya firma ha cambiado y se eliminan las que ya
+    no existen. Mientras el snapshot está fresco, las herramientas responden
+    desde aquí sin consultar Oracle.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with self._abrir() as db:
+            db.executescript(ESQUEMA_SNAPSHOT)
+            version = db.execute("SELECT valor FROM meta WHERE clave = 'version'").fetchone()
+            if not version or version[0] != VERSION_SNAPSHOT:
+                db.execute("DELETE FROM firmas")
+                db.execute("DELETE FROM meta WHERE clave = 'sincronizado'")
+                db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (VERSION_SNAPSHOT,))
+                db.commit()
+
+    def _abrir(self):
+        """Abre el fichero SQLite (una conexión por operación, segura entre hilos)."""
+        return closing_sqlite(self.ruta)
+
+    def sincronizado(self):
+        """Timestamp (epoch) del último refresco, o None si nunca se ha cargado."""
+        with self._abrir() as db:
+            fila = db.execute("SELECT valor FROM meta WHERE clave = 'sincronizado'").fetchone()
+        return float(fila[0]) if fila else None
+
+    def es_fresco(self, ttl: float) -> bool:
+        """Indica si el último refresco tiene menos de ttl segundos."""
+        sincronizado = self.sincronizado()
+        return sincronizado is not None and time.time() - sincronizado < ttl
+
+    def refrescar(self, conexion) -> str:
+        """
+        Sincroniza el snapshot con el diccionario de Oracle.
+        Args:
+            conexion: OracleConnection conectada
+        Returns:
+            Resumen del refresco o mensaje de error
+        """
+        resultado = conexion.ejecutar_sentencia('snapshot_firmas')
+        if isinstance(resultado, str):
+            return resultado
+
+        firmas_oracle = dict(resultado['rows'])
+        with self._abrir() as db:
+            firmas_locales = dict(db.execute("SELECT table_name, firma FROM firmas"))
+
+        cambiadas = [t for t, f in firmas_oracle.items() if firmas_locales.get(t) != f]
+        eliminadas = [t for t in firmas_locales if t not in firmas_oracle]
+        if firmas_locales and (cambiadas or eliminadas):
+            # Hubo DDL: los resultados guardados pueden estar obsoletos
+            cache_consultas.invalidar()
+
+        datos = {nombre: [] for nombre in TABLAS_SNAPSHOT}
+        for lote in _lotes(cambiadas, TAMANO_LOTE_SNAPSHOT):
+            filtro, binds = _filtro_tablas(lote, [])
+            filtros = {
+                'filtro': filtro,
+                'filtro_a': _filtro_tablas(lote, [], 'a.table_name')[0],
+                'filtro_cc': _filtro_tablas(lote, [], 'cc.table_name')[0],
+                'filtro_i': _filtro_tablas(lote, [], 'i.table_name')[0],
+            }
+            for nombre in TABLAS_SNAPSHOT:
+                resultado = conexion.ejecutar_sentencia(f'snapshot_{nombre}', binds, **filtros)
+                if isinstance(resultado, str):
+                    return resultado
+                datos[nombre].extend(resultado['rows'])
+
+        afectadas = [(t,) for t in cambiadas + eliminadas]
+        with self._abrir() as db:
+            db.executemany("DELETE FROM trigramas WHERE objeto IN "
+                           "(SELECT id FROM objetos WHERE table_name = ?)", afectadas)
+            for tabla in ('firmas', 'tablas', 'columnas', 'relaciones', 'claves', 'indices', 'comentarios',
+                          'objetos'):
+                db.executemany(f"DELETE FROM {tabla} WHERE table_name = ?", afectadas)
+            db.executemany("INSERT INTO firmas VALUES (?, ?)",
+                           [(t, firmas_oracle[t]) for t in cambiadas])
+            db.executemany("INSERT INTO tablas VALUES (?, ?, ?, ?)", datos['tablas'])
+            db.executemany("INSERT INTO columnas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", datos['columnas'])
+            db.executemany("INSERT INTO relaciones VALUES (?, ?, ?, ?, ?)", datos['relaciones'])
+            db.executemany("INSERT INTO claves VALUES (?, ?, ?)", datos['claves'])
+            db.executemany("INSERT INTO indices VALUES (?, ?, ?, ?, ?)", datos['indices'])
+            db.executemany("INSERT INTO comentarios VALUES (?, ?, ?)", datos['comentarios'])
+            self._indexar(db, datos)
+            db.execute("INSERT OR REPLACE INTO meta VALUES ('sincronizado', ?)", (str(time.time()),))
+            db.commit()
+
+        return (
+            f"✅ Snapshot actualizado: {len(cambiadas)} tablas releídas, "
+            f"{len(eliminadas)} eliminadas, {len(firmas_oracle) - len(cambiadas)} sin cambios"
+        )
+
+    def _indexar(self, db, datos):
+        """
+        Añade al índice de trigramas las tablas y columnas releídas. Los
+        trigramas del nombre y los del comentario se guardan por separado
+        para puntuar más una coincidencia en el nombre.
+        """
+        comentarios = {(tabla, columna): texto for tabla, columna, texto in datos['comentarios']}
+        siguiente = db.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM objetos").fetchone()[0]
+        objetos, filas_trigramas = [], []
+        nombres = chain(((fila[0], None) for fila in datos['tablas']),
+                        ((fila[0], fila[2]) for fila in datos['columnas']))
+        for id_objeto, (tabla, columna) in enumerate(nombres, siguiente):
+            comentario = comentarios.get((tabla, columna))
+            del_nombre = trigramas(columna or tabla)
+            del_comentario = trigramas(comentario or '')
+            objetos.append((id_objeto, tabla, columna, comentario, len(del_nombre)))
+            filas_trigramas.extend((t, id_objeto, 1) for t in del_nombre)
+            filas_trigramas.extend((t, id_objeto, 0) for t in del_comentario)
+        db.executemany("INSERT INTO objetos VALUES (?, ?, ?, ?, ?)", objetos)
+        db.executemany("INSERT INTO trigramas VALUES (?, ?, ?)", filas_trigramas)
+
+    def buscar(self, termino: str, limite: int = 20, umbral: float = 0.5):
+        """
+        Busca tablas y columnas cuyo nombre o comentario se parezca al término.
+
+        La similitud es la fracción de trigramas del término presentes en el
+        nombre (o, con peso 0.8, en el comentario), como word_similarity de
+        pg_trgm: "CLIENTE" encuentra CLIENTES, ID_CLIENTE o una tabla cuyo
+        comentario diga "clientes". Solo se leen las entradas del índice de
+        los trigramas del término.
+        Returns:
+            Lista de (table_name, column_name, comentario, similitud)
+        """
+        consulta = trigramas(termino)
+        if not consulta:
+            return []
+        with self._abrir() as db:
+            return db.execute("""
+                SELECT o.table_name, o.column_name, o.comentario,
+                       ROUND(MAX(SUM(t.en_nombre), 0.8 * SUM(1 - t.en_nombre)) * 1.0 / ?, 2) as similitud
+                FROM trigramas t
+                JOIN objetos o ON o.id = t.objeto
+                WHERE t.trigrama IN (SELECT value FROM json_each(?))
+                GROUP BY t.objeto
+                HAVING similitud >= ?
+                ORDER BY similitud DESC, o.column_name IS NOT NULL, o.num_trigramas, o.table_name
+                LIMIT ?
+            """, (len(consulta), json.dumps(sorted(consulta)), umbral, limite)).fetchall()
+
+    def tablas(self, patron: str = '%', inicio: int = 0, limite=None):
+        """
+        Filas equivalentes a la query de listar_tablas, filtradas por patrón
+        LIKE y paginadas. El total de coincidencias va en 'total'.
+        """
+        with self._abrir() as db:
+            rows = db.execute("""
+                SELECT table_name, tablespace_name, num_rows, tipo, COUNT(*) OVER ()
+                FROM tablas WHERE table_name LIKE ?
+                ORDER BY table_name LIMIT ? OFFSET ?
+            """, (patron, -1 if limite is None else limite, inicio)).fetchall()
+        resultado = _resultado(['TABLE_NAME', 'TABLESPACE_NAME', 'NUM_ROWS', 'TIPO'],
+                               [row[:4] for row in rows])
+        resultado['total'] = rows[0][4] if rows else 0
+        return resultado
+
+    def columnas(self, tablas, patrones=()):
+        """
+        Columnas (precedidas de table_name) de las tablas pedidas y de las que
+        cumplan los patrones LIKE, o None si alguna tabla pedida no está en
+        el snapshot (por ejemplo, una vista) y hay que consultar Oracle.
+        """
+        with self._abrir() as db:
+            for tabla in tablas:
+                if not db.execute("SELECT 1 FROM firmas WHERE table_name = ?", (tabla,)).fetchone():
+                    return None
+            condiciones = ["table_name IN (SELECT value FROM json_each(?))"]
+            condiciones += ["table_name LIKE ?"] * len(patrones)
+            rows = db.execute(f"""
+                SELECT table_name, column_name, data_type, data_length, data_precision,
+                       data_scale, nullable, data_default
+                FROM columnas WHERE {' OR '.join(condiciones)}
+                ORDER BY table_name, column_id
+            """, [json.dumps(tablas), *patrones]).fetchall()
+        return _resultado(['TABLE_NAME', 'COLUMN_NAME', 'DATA_TYPE', 'DATA_LENGTH',
+                           'DATA_PRECISION', 'DATA_SCALE', 'NULLABLE', 'DATA_DEFAULT'], rows)
+
+    def relaciones(self, tabla: str = ""):
+        """Filas equivalentes a la query de obtener_relaciones (todas o de una tabla)."""
+        query = """
+            SELECT constraint_name, table_name, column_name,
+                   tabla_referenciada, columna_referenciada
+            FROM relaciones {where} ORDER BY table_name, constraint_name
+        """
+        with self._abrir() as db:
+            if tabla:
+                rows = db.execute(query.format(where="WHERE table_name = ?"), (tabla,)).fetchall()
+            else:
+                rows = db.execute(query.format(where="")).fetchall()
+        return _resultado(['CONSTRAINT_NAME', 'TABLE_NAME', 'COLUMN_NAME',
+                           'TABLA_REFERENCIADA', 'COLUMNA_REFERENCIADA'], rows)
+
+    def columnas_diagrama(self, tablas=None):
+        """
+        Filas equivalentes a la sentencia diagrama_columnas (columna, tipo y
+        marcas PK/FK/UK) de las tablas dadas o, sin tablas, de todas.
+        """
+        condicion = "col.table_name IN (SELECT value FROM json_each(?))" if tablas else "1 = 1"
+        with self._abrir() as db:
+            rows = db.execute(f"""
+                SELECT col.table_name, col.column_name, col.data_type,
+                       EXISTS (SELECT 1 FROM claves k WHERE k.table_name = col.table_name
+                               AND k.column_name = col.column_name AND k.constraint_type = 'P'),
+                       EXISTS (SELECT 1 FROM relaciones r WHERE r.table_name = col.table_name
+                               AND r.column_name = col.column_name),
+                       EXISTS (SELECT 1 FROM claves k WHERE k.table_name = col.table_name
+                               AND k.column_name = col.column_name AND k.constraint_type = 'U')
+                FROM columnas col
+                WHERE {condicion}
+                ORDER BY col.table_name, col.column_id
+            """, [json.dumps(sorted(tablas))] if tablas else []).fetchall()
+        return _resultado(['TABLE_NAME', 'COLUMN_NAME', 'DATA_TYPE', 'ES_PK', 'ES_FK', 'ES_UK'], rows)
+
+    def pares_fk(self):
+        """Pares (tabla, tabla_referenciada) distintos de todas las FKs."""
+        with self._abrir() as db:
+            return db.execute(
+                "SELECT DISTINCT table_name, tabla_referenciada FROM relaciones"
+            ).fetchall()
+
+    def indices(self, tabla: str):
+        """Filas equivalentes a la query de obtener_indices, o None si la tabla no está."""
+        with self._abrir() as db:
+            if not db.execute("SELECT 1 FROM firmas WHERE table_name = ?", (tabla,)).fetchone():
+                return None
+            rows = db.execute("""
+                SELECT index_name, index_type, uniqueness, columnas
+                FROM indices WHERE table_name = ? ORDER BY index_name
+            """, (tabla,)).fetchall()
+        return _resultado(['INDEX_NAME', 'INDEX_TYPE', 'UNIQUENESS', 'COLUMNAS'], rows)
+
+
+@contextmanager
+def closing_sqlite(ruta: str):
+    """Conexión SQLite que se cierra siempre al salir del bloque."""
+    db = sqlite3.connect(ruta)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _lotes(elementos, tamano):
+    """Divide una lista en trozos de como máximo `tamano` elementos."""
+    for i in range(0, len(elementos), tamano):
+        yield elementos[i:i + tamano]
+
+
+# Snapshot activo (se crea bajo demanda con 'usar_snapshot': True). El
+# bloqueo impide que varios hilos (modo lote, demonio) lo creen o lo
+# refresquen a la vez sobre el mismo fichero
+_snapshot = None
+_bloqueo_snapshot = threading.Lock()
+
+
+def ruta_snapshot(config) -> str:
+    """Ruta del fichero de snapshot para la conexión configurada."""
+    directorio = config.get('snapshot_dir') or os.path.join(PROJECT_ROOT, '.cache', 'oracle')
+    nombre = f"{config['user']}@{config['host']}_{config['service_name']}".lower()
+    nombre = "".join(c if c.isalnum() or c in '@._-' else '_' for c in nombre)
+    return os.path.join(directorio, f"{nombre}.sqlite")
+
+
+def obtener_snapshot(forzar_refresco: bool = False):
+    """
+    Devuelve el snapshot listo para responder, o None si no debe usarse.
+
+    Si el snapshot está fresco (menos de 'snapshot_ttl' segundos, 900 por
+    defecto) se usa sin tocar Oracle. Si está caducado y hay conexión, se
+    refresca de forma incremental antes de devolverlo. Un solo hilo crea o
+    refresca el snapshot; los demás esperan y usan el resultado.
+    """
+    global _snapshot
+
+    config = oracle_conn.config or oracle_conn.cargar_configuracion()
+    if not config or not config.get('usar_snapshot'):
+        return None
+
+    ttl = config.get('snapshot_ttl', 900)
+    snapshot = _snapshot
+    if not forzar_refresco and snapshot is not None and snapshot.es_fresco(ttl):
+        return snapshot
+
+    with _bloqueo_snapshot:
+        if _snapshot is None:
+            _snapshot = SnapshotEsquema(ruta_snapshot(config))
+
+        # Otro hilo pudo refrescarlo mientras se esperaba el bloqueo
+        if not forzar_refresco and _snapshot.es_fresco(ttl):
+            return _snapshot
+
+        if not oracle_conn.esta_conectado():
+            return None
+
+        resultado = _snapshot.refrescar(oracle_conn)
+        if not resultado.startswith("✅"):
+            print(resultado)
+            return None
+        return _snapshot
+
+
+# ============================================================================
+# GRAFO DE FOREIGN KEYS
+# ============================================================================
+
+class GrafoFK:
+    """
+    Grafo de dependencias entre tablas con listas de adyacencia indexadas.
+
+    Se construye una vez por snapshot a partir de los pares
+    (tabla, tabla_referenciada) y permite extraer el vecindario de k saltos
+    alrededor de un conjunto de tablas sin volver a recorrer todas las FKs.
+    La importancia de las tablas se calcula la primera vez que se pide y
+    queda guardada con el grafo.
+    """
+
+    def __init__(self, pares):
+        self.salientes = {}   # tabla -> tablas a las que referencia
+        self.entrantes = {}   # tabla -> tablas que la referencian
+        for tabla, tabla_ref in pares:
+            self.salientes.setdefault(tabla, set()).add(tabla_ref)
+            self.entrantes.setdefault(tabla_ref, set()).add(tabla)
+        self.num_aristas = sum(len(destinos) for destinos in self.salientes.values())
+        self._importancia = None
+
+    def tablas(self):
+        """Todas las tablas que participan en alguna FK."""
+        return self.salientes.keys() | self.entrantes.keys()
+
+    def vecindario(self, tablas, saltos: int = 1):
+        """
+        Tablas a como máximo `saltos` FKs (en cualquier sentido) de las dadas.
+        Returns:
+            Conjunto de tablas, incluidas las de partida
+        """
+        visitadas = set(tablas)
+        frontera = set(tablas)
+        for _ in range(saltos):
+            siguiente = set()
+            for tabla in frontera:
+                siguiente |= self.salientes.get(tabla, set())
+                siguiente |= self.entrantes.get(tabla, set())
+            frontera = siguiente - visitadas
+            if not frontera:
+                break
+            visitadas |= frontera
+        return visitadas
+
+    def aristas(self, tablas=None):
+        """
+        Pares (tabla, tabla_referenciada) ordenados, todos o solo los que
+        tienen ambos extremos en `tablas`.
+        """
+        origenes = self.salientes if tablas is None else tablas
+        return sorted(
+            (tabla, tabla_ref)
+            for tabla in origenes
+            for tabla_ref in self.salientes.get(tabla, ())
+            if tablas is None or tabla_ref in tablas
+        )
+
+    def importancia(self):
+        """
+        PageRank, grado de entrada y grado de salida de cada tabla.
+
+        Cada FK es un "voto" de la tabla hija a la tabla que referencia, así
+        que las tablas maestras de las que dependen muchas otras (directa o
+        indirectamente) puntúan más. Las autorreferencias no votan.
+        Returns:
+            {tabla: (pagerank, referenciada_por, referencia_a)}, PageRank con suma 1
+        """
+        if self._importancia is None:
+            self._importancia = {
+                tabla: (rango, len(self.entrantes.get(tabla, ())), len(self.salientes.get(tabla, ())))
+                for tabla, rango in self._pagerank().items()
+            }
+        return self._importancia
+
+    def _pagerank(self, amortiguacion: float = 0.85, tolerancia: float = 1e-6, iteraciones: int = 100):
+        """
+        PageRank por iteración de potencias sobre listas indexadas; las
+        tablas sin FKs reparten su rango entre todas. Converge cuando la
+        variación total es menor que tolerancia por tabla (como networkx).
+        """
+        tablas = sorted(self.tablas())
+        n = len(tablas)
+        if not n:
+            return {}
+        posicion = {tabla: i for i, tabla in enumerate(tablas)}
+        aristas = [(posicion[tabla], posicion[tabla_ref])
+                   for tabla, destinos in self.salientes.items()
+                   for tabla_ref in destinos if tabla_ref != tabla]
+        salida = [0] * n
+        for origen, _ in aristas:
+            salida[origen] += 1
+        sin_salida = [i for i in range(n) if not salida[i]]
+        peso = [amortiguacion / grado if grado else 0.0 for grado in salida]
+
+        rango = [1.0 / n] * n
+        for _ in range(iteraciones):
+            base = (1 - amortiguacion + amortiguacion * sum(rango[i] for i in sin_salida)) / n
+            nuevo = [base] * n
+            for origen, destino in aristas:
+                nuevo[destino] += rango[origen] * peso[origen]
+            diferencia = sum(abs(x - y) for x, y in zip(nuevo, rango))
+            rango = nuevo
+            if diferencia < n * tolerancia:
+                break
+        return dict(zip(tablas, rango))
+
+
+# Grafo en memoria asociado a la versión del snapshot con la que se construyó
+_grafo_fk = None
+
+
+def obtener_grafo_fk():
+    """
+    Devuelve el GrafoFK del esquema, o un mensaje de error.
+
+    Con snapshot activo el grafo se construye una vez por versión del
+    snapshot; sin snapshot se construye desde una única query de FKs y se
+    reutiliza mientras lo haría la caché de resultados (mismo TTL, y hasta
+    que se invalida).
+    """
+    global _grafo_fk
+
+    snapshot = obtener_snapshot()
+    if snapshot:
+        version = snapshot.sincronizado()
+        if _grafo_fk is None or _grafo_fk[0] != version:
+            _grafo_fk = (version, GrafoFK(snapshot.pares_fk()))
+        return _grafo_fk[1]
+
+    config = oracle_conn.config or {}
+    version = ('diccionario', cache_consultas.generacion)
+    if (config.get('cache_consultas', 256) and _grafo_fk is not None and _grafo_fk[0][:2] == version
+            and time.monotonic() - _grafo_fk[0][2] < config.get('ttl_cache_consultas', 300)):
+        return _grafo_fk[1]
+
+    resultado = oracle_conn.ejecutar_sentencia('diagrama_fk')
+    if isinstance(resultado, str):
+        return resultado
+    _grafo_fk = (version + (time.monotonic(),),
+                 GrafoFK((tabla, tabla_ref) for tabla, _, tabla_ref, _ in resultado['rows']))
+    return _grafo_fk[1]
+
+
+# ============================================================================
+# RENDERIZADO DE RESULTADOS
+# ============================================================================
+
+FORMATOS_SALIDA = ('texto', 'markdown', 'json', 'csv')
+
+# Formatos para máquinas: solo datos, sin títulos ni mensajes
+FORMATOS_MAQUINA = ('json', 'csv')
+
+
+def lineas_tabla(columnas, filas, formato: str = 'texto', anchos=None,
+                 separador: str = ' ', relleno: str = '=', ancho_relleno=None):
+    """
+    Renderiza filas como tabla en una sola pasada, generando las líneas.
+
+    La plantilla de cada fila se construye una vez, así que el coste es
+    lineal en el número de filas y `filas` puede ser un generador (por
+    ejemplo, los lotes de iterar_query).
+    Args:
+        columnas: Cabeceras de la tabla
+        filas: Iterable de tuplas
+        formato: 'texto', 'markdown', 'json' o 'csv'
+        anchos: Solo texto. Ancho de cada columna (None = sin rellenar); si
+            se omite se calcula de los datos, lo que materializa las filas
+        separador: Solo texto. Separador entre columnas
+        relleno: Solo texto. Carácter de la línea bajo la cabecera
+        ancho_relleno: Solo texto. Longitud de esa línea (por defecto la de la cabecera)
+    """
+    if formato == 'json':
+        yield "["
+        primera = True
+        for fila in filas:
+            yield ("\n  " if primera else ",\n  ") + json.dumps(
+                dict(zip(columnas, fila)), ensure_ascii=False, default=str)
+            primera = False
+        yield "\n]\n"
+
+    elif formato == 'csv':
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer, lineterminator="\n")
+        for fila in chain([columnas], filas):
+            escritor.writerow(fila)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    elif formato == 'markdown':
+        yield "| " + " | ".join(map(str, columnas)) + " |\n"
+        yield "|" + "---|" * len(columnas) + "\n"
+        for fila in filas:
+            celdas = ("" if v is None else str(v).replace("|", "\\|").replace("\n", " ") for v in fila)
+            yield "| " + " | ".join(celdas) + " |\n"
+
+    elif formato == 'texto':
+        if anchos is None:
+            filas = [tuple(map(str, fila)) for fila in filas]
+            anchos = [max([len(str(c))] + [len(f[i]) for f in filas]) for i, c in enumerate(columnas)]
+            anchos[-1] = None
+        plantilla = separador.join("{:<%d}" % a if a else "{}" for a in anchos) + "\n"
+        cabecera = plantilla.format(*map(str, columnas))
+        yield cabecera
+        yield relleno * (ancho_relleno or len(cabecera) - 1) + "\n"
+        for fila in filas:
+            yield plantilla.format(*map(str, fila))
+
+    else:
+        raise ValueError(f"Formato '{formato}' no soportado. Opciones: {', '.join(FORMATOS_SALIDA)}")
+
+
+def renderizar_tabla(columnas, filas, formato: str = 'texto', **opciones) -> str:
+    """Versión en un único string de lineas_tabla."""
+    return "".join(lineas_tabla(columnas, filas, formato, **opciones))
+
+
+def formato_salida(formato=None) -> str:
+    """Formato pedido o, si no se indica, 'formato_salida' de ORACLE_CONFIG ('texto')."""
+    return formato or (oracle_conn.config or {}).get('formato_salida', 'texto')
+
+
+# ============================================================================
+# PRESUPUESTO DE TOKENS DE LAS OBSERVACIONES
+# ============================================================================
+
+# Aproximación de caracteres por token para texto de diccionario (nombres en
+# mayúsculas, números, espacios); evita cargar el tokenizador del modelo
+CARACTERES_POR_TOKEN = 4
+
+# Elementos que muestra cada ranking de un resumen
+TOP_RESUMEN = 10
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimación de los tokens que ocupa un texto en el prompt del modelo."""
+    return -(-len(texto) // CARACTERES_POR_TOKEN)
+
+
+def presupuesto_tokens() -> int:
+    """Tokens por observación del agente ('presupuesto_tokens' en ORACLE_CONFIG)."""
+    return (oracle_conn.config or {}).get('presupuesto_tokens', 1000)
+
+
+def excede_presupuesto(texto: str, presupuesto) -> bool:
+    """Indica si un texto no cabe en el presupuesto (None = sin límite)."""
+    return presupuesto is not None and estimar_tokens(texto) > presupuesto
+
+
+def recortar_observacion(texto: str, presupuesto, sugerencia: str = "") -> str:
+    """
+    Recorta un texto por líneas completas hasta que quepa en el presupuesto.
+    Args:
+        texto: Observación completa
+        presupuesto: Tokens disponibles (None = sin límite)
+        sugerencia: Cómo obtener el resto, se añade al final
+    Returns:
+        El texto original o su principio con una nota de las líneas omitidas
+    """
+    if not excede_presupuesto(texto, presupuesto):
+        return texto
+
+    lineas = texto.splitlines(keepends=True)
+    disponibles = presupuesto * CARACTERES_POR_TOKEN - 120 - len(sugerencia)
+    incluidas = []
+    for linea in lineas:
+        disponibles -= len(linea)
+        if disponibles < 0:
+            break
+        incluidas.append(linea)
+
+    omitidas = len(lineas) - len(incluidas)
+    incluidas.append(f"\n✂️  Salida recortada: {omitidas} líneas omitidas para no exceder "
+                     f"~{presupuesto} tokens.\n")
+    if sugerencia:
+        incluidas.append(f"➡️  {sugerencia}\n")
+    return "".join(incluidas)
+
+
+def prefijo_nombre(nombre: str, desde: int = 0) -> str:
+    """
+    Prefijo de agrupación de un nombre: hasta el primer '_' a partir de la
+    posición `desde` (ej: "CLI_PEDIDOS" -> "CLI_"), o el nombre completo.
+    """
+    separador = nombre.find('_', desde + 1)
+    return nombre[:separador + 1] if separador > 0 else nombre
+
+
+def agrupar_por_prefijo(nombres, literal: str = "") -> Counter:
+    """
+    Cuenta nombres por prefijo_nombre tras la parte fija `literal`. Si todos
+    caen en el mismo prefijo se agrupa en el nivel siguiente, para que el
+    resumen siempre ofrezca prefijos más específicos que el patrón pedido.
+    """
+    nombres = list(nombres)
+    desde = len(literal)
+    while True:
+        grupos = Counter(prefijo_nombre(nombre, desde) for nombre in nombres)
+        if len(grupos) != 1:
+            return grupos
+        unico = next(iter(grupos))
+        if not unico.endswith('_') or len(unico) <= desde:
+            return grupos
+        desde = len(unico)
+
+
+def lineas_ranking(titulo: str, contador, etiqueta: str, extra=None):
+    """
+    Genera un bloque "titulo + top TOP_RESUMEN" de un Counter para los resúmenes.
+    Args:
+        contador: Counter clave -> número de elementos
+        etiqueta: Texto tras el número (ej: "tablas")
+        extra: dict opcional clave -> valor adicional a mostrar
+    """
+    yield f"{titulo}:\n"
+    for clave, cantidad in contador.most_common(TOP_RESUMEN):
+        detalle = f"  {extra[clave]}" if extra and extra.get(clave) else ""
+        yield f"  {clave:<30} {cantidad:>6} {etiqueta}{detalle}\n"
+    if len(contador) > TOP_RESUMEN:
+        yield f"  (+{len(contador) - TOP_RESUMEN} más)\n"
+    yield "\n"
+
+
+def patron_literal(patron: str) -> str:
+    """Parte fija de un patrón LIKE, antes del primer '%'."""
+    return patron.split('%', 1)[0]
+
+
 # ============================================================================
 # HERRAMIENTAS DEL AGENTE (SOLO LECTURA)
 # ============================================================================
 
+# Listado de tablas con filtro y paginación en el servidor. En user_tables
+# {columna_tabla} es table_name; en all_tables se cualifica con el esquema.
+registrar_sentencia('listar_tablas', """
+    SELECT
+        {columna_tabla} as table_name,
+        tablespace_name,
+        num_rows,
+        CASE
+            WHEN temporary = 'Y' THEN 'TEMPORAL'
+            ELSE 'PERMANENTE'
+        END as tipo{total}
+    FROM {vista}
+    WHERE table_name LIKE :patron
+    {filtro_owner}
+    ORDER BY {orden}
+    {paginacion}
+""", arraysize=101, cache=True)
+
+ESQUEMAS_SISTEMA = ('SYS', 'SYSTEM', 'MDSYS', 'XDB', 'CTXSYS')
+
+PREFIJO_CONTINUACION = "continuar:"
+
+registrar_sentencia('relaciones', """
+    SELECT
+        a.constraint_name,
+        a.table_name,
+        a.column_name,
+        c_pk.table_name as tabla_referenciada,
+        b.column_name as columna_referenciada
+    FROM user_cons_columns a
+    JOIN user_constraints c ON a.constraint_name = c.constraint_name
+    JOIN user_constraints c_pk ON c.r_constraint_name = c_pk.constraint_name
+    JOIN user_cons_columns b ON c_pk.constraint_name = b.constraint_name
+    WHERE c.constraint_type = 'R'
+    {filtro}
+    ORDER BY a.table_name, a.constraint_name
+""", arraysize=1000, cache=True)
+
+registrar_sentencia('describir_tabla', """
+    SELECT
+        table_name,
+        column_name,
+        data_type,
+        data_length,
+        data_precision,
+        data_scale,
+        nullable,
+        data_default
+    FROM user_tab_columns
+    WHERE {filtro}
+    ORDER BY table_name, column_id
+""", arraysize=500, cache=True)
+
+registrar_sentencia('indices', """
+    SELECT
+        i.index_name,
+        i.index_type,
+        i.uniqueness,
+        LISTAGG(ic.column_name, ', ') WITHIN GROUP (ORDER BY ic.column_position) as columnas
+    FROM user_indexes i
+    LEFT JOIN user_ind_columns ic ON i.index_name = ic.index_name
+    WHERE i.table_name = :tabla
+    GROUP BY i.index_name, i.index_type, i.uniqueness
+    ORDER BY i.index_name
+""", arraysize=50, cache=True)
+
+registrar_sentencia('estadisticas_tabla', """
+    SELECT num_rows, blocks, last_analyzed
+    FROM user_tables
+    WHERE table_name = :tabla
+""", arraysize=1, cache=True)
+
+registrar_sentencia('diagrama_fk', """
+    SELECT
+        a.table_name,
+        a.column_name,
+        c_pk.table_name as tabla_referenciada,
+        b.column_name as columna_referenciada
+    FROM user_cons_columns a
+    JOIN user_constraints c ON a.constraint_name = c.constraint_name
+    JOIN user_constraints c_pk ON c.r_constraint_name = c_pk.constraint_name
+    JOIN user_cons_columns b ON c_pk.constraint_name = b.constraint_name
+    WHERE c.constraint_type = 'R'
+    ORDER BY a.table_name
+""", arraysize=1000, cache=True)
+
+# Columnas de las entidades del diagrama con sus marcas PK/FK/UK en una sola
+# pasada: las restricciones de comprobación (NOT NULL) no cuentan como marca
+registrar_sentencia('diagrama_columnas', """
+    SELECT
+        col.table_name,
+        col.column_name,
+        col.data_type,
+        MAX(CASE WHEN c.constraint_type = 'P' THEN 1 ELSE 0 END) as es_pk,
+        MAX(CASE WHEN c.constraint_type = 'R' THEN 1 ELSE 0 END) as es_fk,
+        MAX(CASE WHEN c.constraint_type = 'U' THEN 1 ELSE 0 END) as es_uk
+    FROM user_tab_columns col
+    LEFT JOIN user_cons_columns cc
+        ON cc.table_name = col.table_name AND cc.column_name = col.column_name
+    LEFT JOIN user_constraints c
+        ON c.constraint_name = cc.constraint_name AND c.constraint_type IN ('P', 'U', 'R')
+    WHERE {filtro}
+    GROUP BY col.table_name, col.column_id, col.column_name, col.data_type
+    ORDER BY col.table_name, col.column_id
+""", arraysize=1000, cache=True)
+
+QUERIES_METADATA = {
+    'vistas': "SELECT view_name, text_length FROM user_views ORDER BY view_name",
+    'secuencias': "SELECT sequence_name, min_value, max_value, increment_by, last_number FROM user_sequences ORDER BY sequence_name",
+    'triggers': "SELECT trigger_name, trigger_type, triggering_event, table_name, status FROM user_triggers ORDER BY trigger_name",
+    'procedimientos': "SELECT object_name, object_type, status FROM user_objects WHERE object_type IN ('PROCEDURE', 'FUNCTION', 'PACKAGE') ORDER BY object_name"
+}
+
+for _tipo, _query in QUERIES_METADATA.items():
+    registrar_sentencia(f'metadata_{_tipo}', _query, arraysize=500, cache=True)
+
+@instrumentar
 def conectar_oracle(entrada: str) -> str:
     """
     Establece conexión con la base de datos Oracle.
@@ -170,28 +2112,66 @@ def conectar_oracle(entrada: str) -> str:
     return oracle_conn.conectar()
 
 
-def listar_tablas(entrada: str) -> str:
+@instrumentar
+def estado_conexion(entrada: str = "", formato: str = None) -> str:
     """
-    Lista todas las tablas del usuario en Oracle.
+    Comprueba que la conexión responde (un ping, sin SQL) y la recupera si
+    se había caído.
     Args:
-        entrada: Filtro opcional (ej: "USER%" para tablas que empiecen con USER)
+        entrada: No se usa (requerido por interfaz)
+        formato: texto, markdown, json o csv (por defecto formato_salida())
     Returns:
-        Lista de tablas con información básica
-    """
-    query = """
-        SELECT
-            table_name,
-            tablespace_name,
-            num_rows,
-            CASE
-                WHEN temporary = 'Y' THEN 'TEMPORAL'
-                ELSE 'PERMANENTE'
-            END as tipo
-        FROM user_tables
-        ORDER BY table_name
+        Estado de la conexión, latencia del ping y reconexiones
     """
+    salud = oracle_conn.salud()
+    formato = formato_salida(formato)
+    if formato in FORMATOS_MAQUINA:
+        return renderizar_tabla([clave.upper() for clave in salud], [tuple(salud.values())], formato)
+
+    if salud['modo'] is None:
+        return "❌ No hay conexión activa. Usa ConectarOracle primero."
+    if not salud['conectado']:
+        return f"❌ La conexión no responde y no se pudo recuperar: {salud['ultimo_error']}"
+    output = (f"✅ Conexión activa ({salud['modo']}): ping {salud['latencia_ms']} ms, "
+              f"{salud['reconexiones']} reconexiones")
+    if salud['ultimo_error']:
+        output += f"\n   Última caída: {salud['ultimo_error']}"
+    return output
 
-    resultado = oracle_conn.ejecutar_query(query)
+
+@instrumentar
+def listar_tablas(entrada: str, formato: str = None, presupuesto: int = None) -> str:
+    """
+    Lista las tablas del usuario en Oracle, paginadas en el servidor.
+    Args:
+        entrada: Filtro opcional (ej: "USER%" para tablas que empiecen con USER,
+            "ESQUEMA.USER%" para tablas de otro esquema) o el token
+            "continuar:..." que devuelve la página anterior
+        formato: texto, markdown, json o csv (por defecto formato_salida()).
+            Los formatos para máquinas no se paginan: llevan todas las tablas
+            del filtro (desde el punto del token, si se da uno), porque un
+            array JSON o un CSV no tienen dónde indicar que hay más
+        presupuesto: Tokens máximos de la respuesta (None = sin límite). Si
+            la página no cabe, se devuelve un resumen por prefijo y tablespace
+    Returns:
+        Lista de tablas con información básica
+    """
+    filtro = parsear_filtro_tablas(entrada)
+    if isinstance(filtro, str):
+        return filtro
+
+    formato = formato_salida(formato)
+    if formato in FORMATOS_MAQUINA:
+        resultado = tablas_del_filtro(filtro)
+        if isinstance(resultado, str):
+            return resultado
+        output = "".join(lineas_tablas(filas_de(resultado), formato))
+        if excede_presupuesto(output, presupuesto):
+            pagina = paginar_tablas(filtro)
+            return pagina if isinstance(pagina, str) else resumir_tablas(filtro, pagina, presupuesto)
+        return output
+
+    resultado = paginar_tablas(filtro)
 
     if isinstance(resultado, str):
         return resultado
@@ -200,257 +2180,1084 @@ def listar_tablas(entrada: str) -> str:
         return "ℹ️  No se encontraron tablas"
 
     # Formatear salida
-    output = f"📊 Encontradas {resultado['count']} tablas:\n\n"
-    output += f"{'Tabla':<30} {'Tablespace':<20} {'Filas':<10} {'Tipo'}\n"
-    output += "=" * 80 + "\n"
+    output = [f"📊 Encontradas {resultado['total']} tablas"]
+    if resultado['total'] > resultado['count']:
+        output.append(f" (mostrando {filtro['n'] + 1}-{filtro['n'] + resultado['count']})")
+    output.append(":\n\n")
+    output.extend(lineas_tablas(resultado['rows'], formato))
+
+    if resultado['siguiente']:
+        output.append(f"\n➡️  Hay más tablas. Para la siguiente página usa la entrada: {resultado['siguiente']}\n")
+
+    output = "".join(output)
+    if excede_presupuesto(output, presupuesto):
+        return resumir_tablas(filtro, resultado, presupuesto)
+    return output
 
-    for row in resultado['rows']:
-        table_name, tablespace, num_rows, tipo = row
-        num_rows_str = str(num_rows) if num_rows else 'N/A'
-        output += f"{table_name:<30} {tablespace or 'N/A':<20} {num_rows_str:<10} {tipo}\n"
 
-    return output
+def resumir_tablas(filtro, pagina, presupuesto: int) -> str:
+    """
+    Resume todas las tablas de un filtro cuando su listado no cabe en el
+    presupuesto: número de tablas y filas por prefijo y por tablespace y las
+    mayores por num_rows, en una sola pasada sobre las filas. Los prefijos
+    se devuelven como patrones para profundizar con ListarTablas.
+
+    Si todas las tablas comparten prefijo, devuelve la parte de la página
+    que cabe con un token de continuación desde donde se cortó.
+    """
+    resultado = tablas_del_filtro(dict(filtro, n=0))
+    if isinstance(resultado, str):
+        return resultado
+
+    literal = patron_literal(filtro['p'])
+    tablas, filas_prefijo = Counter(), Counter()
+    por_tablespace = Counter()
+    mayores = []
+    for table_name, tablespace, num_rows, _ in filas_de(resultado):
+        esquema = table_name[:table_name.find('.') + 1]
+        prefijo = prefijo_nombre(table_name, len(esquema) + len(literal))
+        tablas[prefijo] += 1
+        filas_prefijo[prefijo] += num_rows or 0
+        por_tablespace[tablespace or 'N/A'] += 1
+        if num_rows:
+            if len(mayores) < TOP_RESUMEN:
+                heapq.heappush(mayores, (num_rows, table_name))
+            else:
+                heapq.heappushpop(mayores, (num_rows, table_name))
+
+    total = sum(tablas.values())
+    if tablas.most_common(1)[0][1] == 1 or len(tablas) == 1:
+        # Sin grupos que resumir: se corta la página y se sigue desde ahí
+        lineas = lineas_tablas(pagina['rows'])
+        incluidas = [next(lineas), next(lineas)]
+        disponibles = (presupuesto - 60) * CARACTERES_POR_TOKEN - sum(map(len, incluidas))
+        for linea in lineas:
+            disponibles -= len(linea)
+            if disponibles < 0 and len(incluidas) > 2:
+                break
+            incluidas.append(linea)
+        mostradas = len(incluidas) - 2
+        incluidas.insert(0, f"📊 Encontradas {total} tablas "
+                            f"(mostrando {filtro['n'] + 1}-{filtro['n'] + mostradas}):\n\n")
+        if filtro['n'] + mostradas < total:
+            siguiente = token_continuacion(dict(filtro, n=filtro['n'] + mostradas))
+            incluidas.append(f"\n➡️  Hay más tablas. Para la siguiente parte usa la entrada: {siguiente}\n")
+        return "".join(incluidas)
+
+    output = [f"📊 {total} tablas coinciden con '{filtro['p']}'. El listado completo excede "
+              f"~{presupuesto} tokens; resumen:\n\n"]
+    output.extend(lineas_ranking("Por prefijo (tablas, filas)", tablas, "tablas",
+                                 {p: f"{n:,} filas" for p, n in filas_prefijo.items()}))
+    output.extend(lineas_ranking("Por tablespace", por_tablespace, "tablas"))
+    if mayores:
+        output.append("Mayores por número de filas:\n")
+        output.extend(f"  {tabla:<30} {num_rows:>12,}\n" for num_rows, tabla in sorted(mayores, reverse=True))
+        output.append("\n")
+    ejemplo = tablas.most_common(1)[0][0]
+    output.append(f"➡️  Para ver el detalle usa ListarTablas con un prefijo (ej: {ejemplo}%)\n")
+    return recortar_observacion("".join(output), presupuesto)
+
+
+def tablas_del_filtro(filtro):
+    """
+    Todas las tablas de un filtro a partir de su desplazamiento 'n', sin
+    paginar: del snapshot si está al día o por lotes (iterar_sentencia).
+    Returns:
+        Resultado para filas_de() o mensaje de error
+    """
+    snapshot = None if filtro['o'] or filtro['t'] else obtener_snapshot()
+    if snapshot:
+        return snapshot.tablas(filtro['p'], filtro['n'])
+    formato, binds = query_tablas(filtro, paginada=False)
+    return oracle_conn.iterar_sentencia('listar_tablas', binds, **formato)
 
 
-def describir_tabla(nombre_tabla: str) -> str:
+def parsear_filtro_tablas(entrada: str, todos_los_esquemas: bool = False):
     """
-    Describe la estructura completa de una tabla.
+    Interpreta la entrada de ListarTablas.
     Args:
-        nombre_tabla: Nombre de la tabla a describir
+        entrada: "PATRON%", "ESQUEMA.PATRON%" o un token de continuación
+        todos_los_esquemas: Listar all_tables de todos los esquemas no del sistema
     Returns:
-        Estructura detallada de la tabla
+        Filtro {'p': patrón, 'o': esquema, 't': todos, 'n': desplazamiento}
+        o mensaje de error
     """
-    nombre_tabla = nombre_tabla.strip().upper()
+    entrada = entrada.strip()
+    if entrada.startswith(PREFIJO_CONTINUACION):
+        try:
+            token = entrada[len(PREFIJO_CONTINUACION):]
+            filtro = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+        except Exception:
+            filtro = None
+        if not _es_filtro_tablas(filtro):
+            # Tokens truncados o inventados por el modelo
+            return f"❌ Token de continuación no válido: {entrada}"
+        return filtro
+
+    owner, patron = None, entrada.upper()
+    if '.' in patron:
+        owner, patron = patron.split('.', 1)
+    return {'p': patron or '%', 'o': owner, 't': todos_los_esquemas, 'n': 0}
+
+
+def _es_filtro_tablas(filtro) -> bool:
+    """Comprueba que un token decodificado tiene la forma de parsear_filtro_tablas."""
+    return (isinstance(filtro, dict) and filtro.keys() == {'p', 'o', 't', 'n'}
+            and isinstance(filtro['p'], str)
+            and (filtro['o'] is None or isinstance(filtro['o'], str))
+            and isinstance(filtro['t'], bool)
+            and type(filtro['n']) is int and filtro['n'] >= 0)
+
+
+def query_tablas(filtro, paginada: bool = True):
+    """
+    Construye las variantes de la sentencia 'listar_tablas' para un filtro
+    de parsear_filtro_tablas. Sin paginar se piden todas las tablas desde
+    el desplazamiento 'n' del filtro.
+    Returns:
+        (formato, binds) para ejecutar_sentencia / iterar_sentencia
+    """
+    binds = {'patron': filtro['p']}
+    filtro_owner = ""
+    if filtro['o']:
+        filtro_owner = "AND owner = :owner"
+        binds['owner'] = filtro['o']
+    elif filtro['t']:
+        filtro_owner = f"AND owner NOT IN ({', '.join(repr(o) for o in ESQUEMAS_SISTEMA)})"
+
+    cualificada = bool(filtro['o'] or filtro['t'])
+    paginacion = ""
+    if paginada:
+        paginacion = "OFFSET :inicio ROWS FETCH NEXT :limite ROWS ONLY"
+        # Se pide una fila de más para saber si existe página siguiente
+        binds['inicio'] = filtro['n']
+        binds['limite'] = _tamano_pagina() + 1
+    elif filtro['n']:
+        paginacion = "OFFSET :inicio ROWS"
+        binds['inicio'] = filtro['n']
+
+    formato = dict(
+        columna_tabla="owner || '.' || table_name" if cualificada else "table_name",
+        total=",\n        COUNT(*) OVER () as total" if paginada else "",
+        vista="all_tables" if cualificada else "user_tables",
+        filtro_owner=filtro_owner,
+        orden="owner, table_name" if cualificada else "table_name",
+        paginacion=paginacion
+    )
+    return formato, binds
+
+
+def paginar_tablas(filtro):
+    """
+    Obtiene una página de tablas; solo viajan las filas que se muestran.
+    Returns:
+        Resultado con 'total' y 'siguiente' (token o None), o mensaje de error
+    """
+    limite = _tamano_pagina()
+
+    snapshot = None if filtro['o'] or filtro['t'] else obtener_snapshot()
+    if snapshot:
+        resultado = snapshot.tablas(filtro['p'], filtro['n'], limite + 1)
+    else:
+        formato, binds = query_tablas(filtro)
+        resultado = oracle_conn.ejecutar_sentencia('listar_tablas', binds, **formato)
+        if isinstance(resultado, str):
+            return resultado
+        filas = resultado['rows']
+        resultado = _resultado(resultado['columns'][:4], [row[:4] for row in filas])
+        resultado['total'] = filas[0][4] if filas else 0
+
+    resultado['siguiente'] = None
+    if resultado['count'] > limite:
+        resultado['rows'] = resultado['rows'][:limite]
+        resultado['count'] = limite
+        resultado['siguiente'] = token_continuacion(dict(filtro, n=filtro['n'] + limite))
+    return resultado
+
+
+def token_continuacion(filtro) -> str:
+    """Codifica un filtro de parsear_filtro_tablas como entrada "continuar:..."."""
+    return PREFIJO_CONTINUACION + base64.urlsafe_b64encode(json.dumps(filtro).encode()).decode()
+
+
+def _tamano_pagina() -> int:
+    """Filas por página de ListarTablas ('tamano_pagina' en ORACLE_CONFIG)."""
+    return (oracle_conn.config or {}).get('tamano_pagina', 100)
+
+
+def lineas_tablas(filas, formato: str = 'texto'):
+    """Genera las líneas de la tabla de ListarTablas a partir de cualquier iterable de filas."""
+    if formato in FORMATOS_MAQUINA:
+        return lineas_tabla(['TABLE_NAME', 'TABLESPACE_NAME', 'NUM_ROWS', 'TIPO'], filas, formato)
 
-    # Query para obtener columnas
-    query = """
-        SELECT
-            column_name,
-            data_type,
-            data_length,
-            data_precision,
-            data_scale,
-            nullable,
-            data_default
-        FROM user_tab_columns
-        WHERE table_name = :tabla
-        ORDER BY column_id
+    visibles = (
+        (table_name, tablespace or 'N/A', num_rows if num_rows else 'N/A', tipo)
+        for table_name, tablespace, num_rows, tipo in filas
+    )
+    return lineas_tabla(['Tabla', 'Tablespace', 'Filas', 'Tipo'], visibles, formato,
+                        anchos=[30, 20, 10, None], ancho_relleno=80)
+
+
+@instrumentar
+def describir_tabla(nombre_tabla: str, formato: str = None, presupuesto: int = None) -> str:
+    """
+    Describe la estructura completa de una o varias tablas.
+    Args:
+        nombre_tabla: Nombre de la tabla, lista separada por comas
+            (ej: "CLIENTES, PEDIDOS") o patrón LIKE (ej: "CLI%")
+        formato: texto, markdown, json o csv (por defecto formato_salida())
+        presupuesto: Tokens máximos de la respuesta (None = sin límite). Si
+            no cabe, se devuelve el número de columnas por tabla
+    Returns:
+        Estructura detallada de cada tabla
     """
+    tablas, patrones = _parsear_tablas(nombre_tabla)
+    if not tablas and not patrones:
+        return "❌ Indica el nombre de la tabla a describir"
 
-    resultado = oracle_conn.ejecutar_query(query, {'tabla': nombre_tabla})
+    # Una sola query para todas las tablas pedidas, agrupada después por tabla
+    filtro, binds = _filtro_tablas(tablas, patrones)
+
+    snapshot = obtener_snapshot()
+    resultado = snapshot.columnas(tablas, patrones) if snapshot else None
+    if resultado is None:
+        resultado = oracle_conn.ejecutar_sentencia('describir_tabla', binds, filtro=filtro)
 
     if isinstance(resultado, str):
         return resultado
 
-    if resultado['count'] == 0:
-        return f"❌ Tabla '{nombre_tabla}' no encontrada"
-
-    # Formatear salida
-    output = f"🔍 Estructura de {nombre_tabla}:\n\n"
-    output += f"{'Columna':<30} {'Tipo':<20} {'Nullable':<10} {'Default'}\n"
-    output += "=" * 80 + "\n"
+    formato = formato_salida(formato)
+    if formato in FORMATOS_MAQUINA:
+        columnas = ['TABLE_NAME', 'COLUMN_NAME', 'DATA_TYPE', 'DATA_LENGTH',
+                    'DATA_PRECISION', 'DATA_SCALE', 'NULLABLE', 'DATA_DEFAULT']
+        return renderizar_tabla(columnas, resultado['rows'], formato)
 
+    columnas_por_tabla = {}
     for row in resultado['rows']:
-        col_name, data_type, length, precision, scale, nullable, default = row
+        columnas_por_tabla.setdefault(row[0], []).append(row[1:])
 
-        # Formatear tipo de dato
-        if data_type in ['NUMBER']:
-            if precision:
-                tipo = f"{data_type}({precision},{scale or 0})"
-            else:
-                tipo = data_type
-        elif data_type in ['VARCHAR2', 'CHAR']:
-            tipo = f"{data_type}({length})"
+    # Tablas pedidas por nombre en su orden, después las encontradas por patrón
+    orden = tablas + sorted(t for t in columnas_por_tabla if t not in tablas)
+    if not orden:
+        return f"❌ Ninguna tabla coincide con '{', '.join(patrones)}'"
+
+    bloques = []
+    for tabla in orden:
+        if tabla in columnas_por_tabla:
+            bloques.append(_formatear_estructura(tabla, columnas_por_tabla[tabla], formato))
+        else:
+            bloques.append(f"❌ Tabla '{tabla}' no encontrada\n")
+
+    output = "\n".join(bloques)
+    if excede_presupuesto(output, presupuesto) and len(columnas_por_tabla) > 1:
+        return _resumir_estructuras(orden, columnas_por_tabla, presupuesto)
+    return recortar_observacion(output, presupuesto)
+
+
+def _resumir_estructuras(orden, columnas_por_tabla, presupuesto: int) -> str:
+    """Resumen de DescribirTabla: tablas por prefijo y columnas de cada tabla."""
+    encontradas = [t for t in orden if t in columnas_por_tabla]
+    total_columnas = sum(len(columnas_por_tabla[t]) for t in encontradas)
+    output = [f"🔍 {len(encontradas)} tablas con {total_columnas} columnas. La estructura completa "
+              f"excede ~{presupuesto} tokens; resumen:\n\n"]
+    if len(encontradas) > TOP_RESUMEN:
+        output.extend(lineas_ranking("Por prefijo", agrupar_por_prefijo(encontradas), "tablas"))
+    output.extend(lineas_tabla(['Tabla', 'Columnas'],
+                               ((t, len(columnas_por_tabla[t])) for t in encontradas),
+                               anchos=[30, None], ancho_relleno=40))
+    sugerencia = f"Para ver el detalle usa DescribirTabla con una tabla o una lista corta (ej: {encontradas[0]})"
+    return recortar_observacion("".join(output) + f"\n➡️  {sugerencia}\n", presupuesto, sugerencia)
+
+
+def _parsear_tablas(entrada: str):
+    """
+    Separa una entrada "T1, T2, PREF%" en nombres exactos y patrones LIKE.
+    Returns:
+        (tablas, patrones) en mayúsculas y sin duplicados
+    """
+    tablas, patrones = [], []
+    for nombre in entrada.split(','):
+        nombre = nombre.strip().upper()
+        if not nombre:
+            continue
+        destino = patrones if '%' in nombre else tablas
+        if nombre not in destino:
+            destino.append(nombre)
+    return tablas, patrones
+
+
+def _filtro_tablas(tablas, patrones, columna: str = 'table_name'):
+    """
+    Construye la condición WHERE para una lista de tablas y patrones LIKE.
+    Los nombres exactos se enlazan como binds en listas IN de como máximo
+    TAMANO_LOTE_SNAPSHOT elementos, todo dentro de una única sentencia.
+    Cada lista se rellena hasta la siguiente potencia de 2 repitiendo el
+    último nombre, para que el número de textos SQL distintos (y de hard
+    parses) sea logarítmico y no uno por cada longitud de lista.
+    Returns:
+        (condicion_sql, binds)
+    """
+    condiciones, binds = [], {}
+    for lote in _lotes(tablas, TAMANO_LOTE_SNAPSHOT):
+        lote = lote + lote[-1:] * ((1 << (len(lote) - 1).bit_length()) - len(lote))
+        inicio = len(binds)
+        nombres = {f"t{inicio + i}": nombre for i, nombre in enumerate(lote)}
+        binds.update(nombres)
+        condiciones.append(f"{columna} IN ({', '.join(':' + b for b in nombres)})")
+    for i, patron in enumerate(patrones):
+        binds[f"p{i}"] = patron
+        condiciones.append(f"{columna} LIKE :p{i}")
+    return "(" + " OR ".join(condiciones) + ")", binds
+
+
+def _formatear_estructura(nombre_tabla: str, filas, formato: str = 'texto') -> str:
+    """Formatea las columnas de una tabla con el layout de DescribirTabla."""
+    titulo = f"🔍 Estructura de {nombre_tabla}:\n\n"
+    tabla = renderizar_tabla(['Columna', 'Tipo', 'Nullable', 'Default'],
+                             map(_columna_visible, filas), formato,
+                             anchos=[30, 20, 10, None], ancho_relleno=80)
+    return titulo + tabla
+
+
+def _columna_visible(row):
+    """Convierte una fila de user_tab_columns en (columna, tipo, nullable, default) legibles."""
+    col_name, data_type, length, precision, scale, nullable, default = row
+
+    # Formatear tipo de dato
+    if data_type in ['NUMBER']:
+        if precision:
+            tipo = f"{data_type}({precision},{scale or 0})"
         else:
             tipo = data_type
+    elif data_type in ['VARCHAR2', 'CHAR']:
+        tipo = f"{data_type}({length})"
+    else:
+        tipo = data_type
 
-        nullable_str = 'SÍ' if nullable == 'Y' else 'NO'
-        default_str = str(default)[:20] if default else '-'
-
-        output += f"{col_name:<30} {tipo:<20} {nullable_str:<10} {default_str}\n"
+    nullable_str = 'SÍ' if nullable == 'Y' else 'NO'
+    default_str = str(default)[:20] if default else '-'
 
-    return output
+    return col_name, tipo, nullable_str, default_str
 
 
-def obtener_relaciones(entrada: str = "") -> str:
+@instrumentar
+def obtener_relaciones(entrada: str = "", formato: str = None, presupuesto: int = None) -> str:
     """
     Obtiene las relaciones (Foreign Keys) de las tablas.
     Args:
         entrada: Nombre de tabla opcional (vacío = todas las relaciones)
+        formato: texto, markdown, json o csv (por defecto formato_salida())
+        presupuesto: Tokens máximos de la respuesta (None = sin límite). Si
+            no cabe, se devuelven las tablas con más FKs salientes y entrantes
     Returns:
         Lista de Foreign Keys
     """
-    if entrada.strip():
+    snapshot = obtener_snapshot()
+    if snapshot:
+        resultado = snapshot.relaciones(entrada.strip().upper())
+    elif entrada.strip():
         tabla = entrada.strip().upper()
-        query = """
-            SELECT
-                a.constraint_name,
-                a.table_name,
-                a.column_name,
-                c_pk.table_name as tabla_referenciada,
-                b.column_name as columna_referenciada
-            FROM user_cons_columns a
-            JOIN user_constraints c ON a.constraint_name = c.constraint_name
-            JOIN user_constraints c_pk ON c.r_constraint_name = c_pk.constraint_name
-            JOIN user_cons_columns b ON c_pk.constraint_name = b.constraint_name
-            WHERE c.constraint_type = 'R'
-            AND a.table_name = :tabla
-            ORDER BY a.table_name, a.constraint_name
-        """
-        resultado = oracle_conn.ejecutar_query(query, {'tabla': tabla})
+        resultado = oracle_conn.ejecutar_sentencia(
+            'relaciones', {'tabla': tabla}, filtro="AND a.table_name = :tabla")
     else:
-        query = """
-            SELECT
-                a.constraint_name,
-                a.table_name,
-                a.column_name,
-                c_pk.table_name as tabla_referenciada,
-                b.column_name as columna_referenciada
-            FROM user_cons_columns a
-            JOIN user_constraints c ON a.constraint_name = c.constraint_name
-            JOIN user_constraints c_pk ON c.r_constraint_name = c_pk.constraint_name
-            JOIN user_cons_columns b ON c_pk.constraint_name = b.constraint_name
-            WHERE c.constraint_type = 'R'
-            ORDER BY a.table_name, a.constraint_name
-        """
-        resultado = oracle_conn.ejecutar_query(query)
+        resultado = oracle_conn.ejecutar_sentencia('relaciones', filtro="")
 
     if isinstance(resultado, str):
         return resultado
 
+    formato = formato_salida(formato)
+    if formato in FORMATOS_MAQUINA:
+        return "".join(lineas_relaciones(resultado['rows'], formato))
+
     if resultado['count'] == 0:
         return "ℹ️  No se encontraron relaciones (Foreign Keys)"
 
     # Formatear salida
     output = f"🔗 Encontradas {resultado['count']} relaciones:\n\n"
+    output += "".join(lineas_relaciones(resultado['rows'], formato))
+    if excede_presupuesto(output, presupuesto):
+        return _resumir_relaciones(resultado['rows'], presupuesto)
+    return output
 
-    for row in resultado['rows']:
-        fk_name, tabla, columna, tabla_ref, col_ref = row
-        output += f"  {tabla}.{columna} → {tabla_ref}.{col_ref}\n"
-        output += f"  (FK: {fk_name})\n\n"
 
-    return output
+def _resumir_relaciones(filas, presupuesto: int) -> str:
+    """Resumen de ObtenerRelaciones: tablas con más FKs en cada sentido."""
+    salientes, entrantes = Counter(), Counter()
+    for _, tabla, _, tabla_ref, _ in filas:
+        salientes[tabla] += 1
+        entrantes[tabla_ref] += 1
+    output = [f"🔗 {sum(salientes.values())} relaciones entre {len(salientes.keys() | entrantes.keys())} tablas. "
+              f"El listado completo excede ~{presupuesto} tokens; resumen:\n\n"]
+    output.extend(lineas_ranking("Tablas que más referencian", salientes, "FKs"))
+    output.extend(lineas_ranking("Tablas más referenciadas", entrantes, "FKs"))
+    ejemplo = entrantes.most_common(1)[0][0]
+    sugerencia = f"Para ver el detalle usa ObtenerRelaciones con una tabla (ej: {ejemplo})"
+    return recortar_observacion("".join(output) + f"➡️  {sugerencia}\n", presupuesto, sugerencia)
+
+
+def lineas_relaciones(filas, formato: str = 'texto'):
+    """Genera las líneas de ObtenerRelaciones a partir de cualquier iterable de filas."""
+    if formato != 'texto':
+        columnas = ['CONSTRAINT_NAME', 'TABLE_NAME', 'COLUMN_NAME',
+                    'TABLA_REFERENCIADA', 'COLUMNA_REFERENCIADA']
+        yield from lineas_tabla(columnas, filas, formato)
+        return
+
+    for row in filas:
+        fk_name, tabla, columna, tabla_ref, col_ref = row
+        yield f"  {tabla}.{columna} → {tabla_ref}.{col_ref}\n"
+        yield f"  (FK: {fk_name})\n\n"
 
 
-def obtener_indices(nombre_tabla: str) -> str:
+@instrumentar
+def obtener_indices(nombre_tabla: str, formato: str = None, presupuesto: int = None) -> str:
     """
     Lista los índices de una tabla.
     Args:
         nombre_tabla: Nombre de la tabla
+        formato: texto, markdown, json o csv (por defecto formato_salida())
+        presupuesto: Tokens máximos de la respuesta (None = sin límite)
     Returns:
         Lista de índices con sus columnas
     """
     nombre_tabla = nombre_tabla.strip().upper()
 
-    query = """
-        SELECT
-            i.index_name,
-            i.index_type,
-            i.uniqueness,
-            LISTAGG(ic.column_name, ', ') WITHIN GROUP (ORDER BY ic.column_position) as columnas
-        FROM user_indexes i
-        LEFT JOIN user_ind_columns ic ON i.index_name = ic.index_name
-        WHERE i.table_name = :tabla
-        GROUP BY i.index_name, i.index_type, i.uniqueness
-        ORDER BY i.index_name
-    """
-
-    resultado = oracle_conn.ejecutar_query(query, {'tabla': nombre_tabla})
+    snapshot = obtener_snapshot()
+    resultado = snapshot.indices(nombre_tabla) if snapshot else None
+    if resultado is None:
+        resultado = oracle_conn.ejecutar_sentencia('indices', {'tabla': nombre_tabla})
 
     if isinstance(resultado, str):
         return resultado
 
+    formato = formato_salida(formato)
+    if formato != 'texto':
+        columnas = ['INDEX_NAME', 'INDEX_TYPE', 'UNIQUENESS', 'COLUMNAS']
+        tabla = renderizar_tabla(columnas, resultado['rows'], formato)
+        return tabla if formato in FORMATOS_MAQUINA else f"📇 Índices de {nombre_tabla}:\n\n{tabla}"
+
     if resultado['count'] == 0:
         return f"ℹ️  No se encontraron índices para {nombre_tabla}"
 
     # Formatear salida
-    output = f"📇 Índices de {nombre_tabla}:\n\n"
+    output = [f"📇 Índices de {nombre_tabla}:\n\n"]
 
     for row in resultado['rows']:
         idx_name, idx_type, uniqueness, columnas = row
         unique_str = '✓ UNIQUE' if uniqueness == 'UNIQUE' else '  Normal'
-        output += f"  {unique_str} - {idx_name} ({idx_type})\n"
-        output += f"    Columnas: {columnas}\n\n"
+        output.append(f"  {unique_str} - {idx_name} ({idx_type})\n")
+        output.append(f"    Columnas: {columnas}\n\n")
 
-    return output
+    return recortar_observacion("".join(output), presupuesto)
+
+
+# Tipos con APPROX_COUNT_DISTINCT, MIN y MAX. De los LOB solo se cuentan los
+# nulos; LONG y los tipos de objeto no se perfilan
+TIPOS_ESCALARES = frozenset({
+    'NUMBER', 'FLOAT', 'BINARY_FLOAT', 'BINARY_DOUBLE', 'VARCHAR2', 'NVARCHAR2',
+    'CHAR', 'NCHAR', 'DATE', 'TIMESTAMP', 'INTERVAL', 'RAW', 'ROWID', 'UROWID'
+})
+TIPOS_LOB = frozenset({'CLOB', 'NCLOB', 'BLOB', 'BFILE'})
+
+# Oracle admite 1000 expresiones por SELECT: COUNT(*) y 4 por columna
+COLUMNAS_POR_PERFIL = 249
+
+# call_timeout superado (Thin, Thick) o llamada cancelada en el servidor
+CODIGOS_TIMEOUT = ('DPY-4024', 'DPI-1067', 'ORA-01013')
+
+
+def _tipo_base(data_type: str) -> str:
+    """Tipo sin precisión ni sufijos (TIMESTAMP(6) WITH TIME ZONE -> TIMESTAMP)."""
+    return re.split(r'[\s(]', data_type, maxsplit=1)[0]
+
+
+def porcentaje_muestra(num_rows, limite: int):
+    """
+    Porcentaje de bloques que hay que muestrear para leer unas `limite`
+    filas según las estadísticas, o None si basta con leer la tabla (o no
+    tiene estadísticas, y entonces solo se leen las primeras `limite`).
+    Se muestrea el doble porque el número de filas por bloque varía; el
+    ROWNUM de sql_perfil corta la lectura al llegar a `limite`.
+    """
+    if not num_rows or num_rows <= limite:
+        return None
+    return min(99.999999, max(0.000001, 200 * limite / num_rows))
+
+
+def sql_perfil(tabla: str, columnas, muestra=None) -> str:
+    """
+    Sentencia de perfilado de una tabla: COUNT(*) y, por columna, COUNT,
+    APPROX_COUNT_DISTINCT, MIN y MAX (solo COUNT en los LOB), sobre como
+    mucho :limite filas de una muestra de bloques del `muestra` por ciento.
+    SAMPLE BLOCK lee solo esa fracción de bloques, no la tabla entera.
+    Args:
+        columnas: [(column_name, tipo_base, ...)] tal como vienen del diccionario
+    """
+    expresiones = ["COUNT(*)"]
+    for nombre, tipo, *_ in columnas:
+        expresiones.append(f'COUNT("{nombre}")')
+        if tipo in TIPOS_ESCALARES:
+            expresiones += [f'APPROX_COUNT_DISTINCT("{nombre}")', f'MIN("{nombre}")', f'MAX("{nombre}")']
+    origen = f'"{tabla}"' + (f" SAMPLE BLOCK ({muestra:.6f})" if muestra else "")
+    lista = ", ".join(f'"{nombre}"' for nombre, *_ in columnas)
+    return (f"SELECT {', '.join(expresiones)}\n"
+            f"FROM (SELECT {lista} FROM {origen} WHERE ROWNUM <= :limite)")
+
+
+def _valor_perfil(valor):
+    """Mínimo o máximo presentable (los RAW en hexadecimal)."""
+    return valor.hex().upper() if isinstance(valor, bytes) else valor
+
+
+@instrumentar
+def perfilar_columnas(entrada: str, formato: str = None, presupuesto: int = None) -> str:
+    """
+    Perfil aproximado de los datos de una tabla sin recorrerla entera: por
+    columna, porcentaje de nulos, valores distintos aproximados y mínimo y
+    máximo, en una sola sentencia (sql_perfil) sobre una muestra de
+    bloques de unas 'filas_perfil' filas (100000) y con 'timeout_perfil'
+    segundos (30) como máximo. Los distintos se cuentan en la muestra.
+    Args:
+        entrada: Nombre de la tabla, opcionalmente con filas=N para cambiar
+            el tope de filas leídas (ej: "CLIENTES filas=20000")
+        formato: texto, markdown, json o csv (por defecto formato_salida())
+        presupuesto: Tokens máximos de la respuesta (None = sin límite)
+    Returns:
+        Perfil de cada columna
+    """
+    palabras = entrada.replace(',', ' ').split()
+    opciones = dict(palabra.lower().split('=', 1) for palabra in palabras if '=' in palabra)
+    nombres = [palabra.upper() for palabra in palabras if '=' not in palabra]
+    if len(nombres) != 1 or '%' in nombres[0]:
+        return "❌ Indica una sola tabla a perfilar (ej: CLIENTES o CLIENTES filas=20000)"
+    tabla = nombres[0]
+
+    config = oracle_conn.config or {}
+    try:
+        limite = max(1, int(opciones.get('filas', config.get('filas_perfil', 100000))))
+    except ValueError:
+        return "❌ filas=N debe ser un número entero"
+    timeout = config.get('timeout_perfil', 30)
+
+    estadisticas = oracle_conn.ejecutar_sentencia('estadisticas_tabla', {'tabla': tabla})
+    if isinstance(estadisticas, str):
+        return estadisticas
+    if not estadisticas['rows']:
+        return f"❌ Tabla '{tabla}' no encontrada (solo se perfilan tablas del usuario)"
+    num_rows = estadisticas['rows'][0][0]
+
+    snapshot = obtener_snapshot()
+    resultado = snapshot.columnas([tabla]) if snapshot else None
+    if resultado is None:
+        filtro, binds = _filtro_tablas([tabla], [])
+        resultado = oracle_conn.ejecutar_sentencia('describir_tabla', binds, filtro=filtro)
+    if isinstance(resultado, str):
+        return resultado
+
+    columnas, omitidas = [], []
+    for _, columna, data_type, *_ in resultado['rows']:
+        tipo = _tipo_base(data_type)
+        if tipo in TIPOS_ESCALARES or tipo in TIPOS_LOB:
+            columnas.append((columna, tipo, data_type))
+        else:
+            omitidas.append(columna)
+    if not columnas:
+        return f"ℹ️  Ninguna columna de {tabla} admite perfilado ({', '.join(omitidas)})"
+
+    # Una sentencia por tabla; solo las tablas de más de COLUMNAS_POR_PERFIL
+    # columnas necesitan varias
+    muestra = porcentaje_muestra(num_rows, limite)
+    filas, leidas = [], 0
+    for lote in _lotes(columnas, COLUMNAS_POR_PERFIL):
+        perfil = oracle_conn.ejecutar_query(sql_perfil(tabla, lote, muestra), {'limite': limite},
+                                            nombre='perfilar_columnas', timeout=timeout)
+        if isinstance(perfil, str):
+            if any(codigo in perfil for codigo in CODIGOS_TIMEOUT):
+                return (f"⏱️  El perfil de {tabla} superó {timeout} s y se canceló. Lee menos filas "
+                        f"(ej: {tabla} filas={max(1, limite // 10)}) o sube 'timeout_perfil'")
+            return perfil
+        valores = iter(perfil['rows'][0])
+        leidas = next(valores)
+        for columna, tipo, data_type in lote:
+            nulos = leidas - next(valores)
+            distintos = minimo = maximo = None
+            if tipo in TIPOS_ESCALARES:
+                distintos, minimo, maximo = next(valores), next(valores), next(valores)
+            porcentaje = round(100 * nulos / leidas, 2) if leidas else None
+            filas.append((columna, data_type, nulos, porcentaje, distintos,
+                          _valor_perfil(minimo), _valor_perfil(maximo)))
+
+    formato = formato_salida(formato)
+    if formato in FORMATOS_MAQUINA:
+        return renderizar_tabla(['COLUMN_NAME', 'DATA_TYPE', 'NULOS', 'PORCENTAJE_NULOS',
+                                 'DISTINTOS_APROX', 'MINIMO', 'MAXIMO'], filas, formato)
+
+    if muestra:
+        origen = f"muestra de bloques del {muestra:.4g}% (~{num_rows} filas según las estadísticas)"
+    elif leidas >= limite:
+        origen = f"primeras {limite} filas (sin estadísticas recientes)"
+    else:
+        origen = "tabla completa"
+    output = f"🔬 Perfil de {tabla}: {leidas} filas leídas, {origen}:\n\n"
+    visibles = (
+        (columna, data_type[:27], '-' if porcentaje is None else porcentaje,
+         '-' if distintos is None else f"≈{distintos}",
+         '-' if minimo is None else str(minimo)[:20], '-' if maximo is None else str(maximo)[:20])
+        for columna, data_type, _, porcentaje, distintos, minimo, maximo in filas
+    )
+    output += renderizar_tabla(['Columna', 'Tipo', 'Nulos %', 'Distintos', 'Mínimo', 'Máximo'], visibles, formato,
+                               anchos=[30, 28, 9, 11, 22, None], ancho_relleno=120)
+    if omitidas:
+        output += f"\nℹ️  Sin perfilar (LONG o tipos de objeto): {', '.join(omitidas)}\n"
+    return recortar_observacion(output, presupuesto)
+
+
+def preparar_consulta(sql: str, max_filas: int):
+    """
+    Texto y binds de ConsultaSQL: quita el ';' final y limita las filas en
+    el servidor con FETCH FIRST (pidiendo una más para saber si hay más).
+    Si la query ya trae FETCH u OFFSET se envuelve en una subconsulta; si
+    no, se añade al final, porque envolverla fallaría con columnas de
+    nombre repetido (ORA-00918).
+    Returns:
+        (query, binds) o mensaje de error
+    """
+    query = sql.strip().rstrip(';').strip()
+    if not query:
+        return "❌ Indica la consulta SELECT a ejecutar"
+    error = validar_solo_lectura(query)
+    if error:
+        return error
+    palabras = {token.group('palabra').upper() for token in TOKENS_SQL.finditer(query) if token.group('palabra')}
+    if palabras & {'FETCH', 'OFFSET'}:
+        query = f"SELECT * FROM (\n{query}\n)"
+    return f"{query}\nFETCH FIRST :max_filas ROWS ONLY", {'max_filas': max_filas + 1}
+
+
+def mensaje_error_consulta(error, timeout) -> str:
+    """Mensaje de una consulta fallida, explicando timeouts y cancelaciones."""
+    texto = str(error)
+    if 'ORA-01013' in texto:
+        return "⛔ Consulta cancelada"
+    if any(codigo in texto for codigo in CODIGOS_TIMEOUT):
+        return (f"⏱️  La consulta superó {timeout} s y se canceló. Acótala con WHERE "
+                f"o sube 'timeout_consulta'")
+    return texto if texto.startswith(("❌", "🚫")) else f"❌ Error en query: {texto}"
+
+
+def lineas_consulta(sql: str, formato: str = 'texto', max_filas: int = None, timeout: float = None):
+    """
+    Ejecuta una SELECT libre de solo lectura y genera sus líneas según
+    llegan los lotes (iterar_query), sin materializar el resultado. Como
+    mucho 'filas_consulta' filas (100) y 'timeout_consulta' segundos (30)
+    por round trip; en texto y markdown termina con una línea de resumen.
+    La sesión se libera al agotar o cerrar el generador.
+    """
+    config = oracle_conn.config or {}
+    max_filas = max_filas or config.get('filas_consulta', 100)
+    timeout = config.get('timeout_consulta', 30) if timeout is None else timeout
+
+    preparada = preparar_consulta(sql, max_filas)
+    if isinstance(preparada, str):
+        yield preparada + "\n"
+        return
+    query, binds = preparada
+    resultado = oracle_conn.iterar_query(query, binds, arraysize=min(max_filas + 1, config.get('arraysize', 1000)),
+                                         nombre='consulta_sql', timeout=timeout)
+    if isinstance(resultado, str):
+        yield mensaje_error_consulta(resultado, timeout) + "\n"
+        return
+
+    lotes = resultado['lotes']
+    columnas = resultado['columns']
+    contador = {'filas': 0, 'hay_mas': False}
+
+    def filas(primero):
+        for lote in chain([primero], lotes):
+            for fila in lote:
+                if contador['filas'] == max_filas:
+                    contador['hay_mas'] = True
+                    return
+                contador['filas'] += 1
+                yield fila
+
+    try:
+        # El primer lote abre el generador (y con él la sesión) y da los anchos
+        primero = next(lotes, [])
+        opciones = {}
+        if formato == 'texto':
+            anchos = [min(30, max([len(str(c))] + [len(str(f[i])) for f in primero])) for i, c in enumerate(columnas)]
+            opciones = {'anchos': anchos[:-1] + [None]}
+        yield from lineas_tabla(columnas, filas(primero), formato, **opciones)
+    except Exception as e:
+        yield f"\n{mensaje_error_consulta(e, timeout)}\n"
+        return
+    finally:
+        lotes.close()
+
+    if formato not in FORMATOS_MAQUINA:
+        if contador['hay_mas']:
+            yield (f"\n⚠️  Mostradas las primeras {max_filas} filas; hay más. "
+                   f"Acota la consulta o sube 'filas_consulta'\n")
+        else:
+            yield f"\n✅ {contador['filas']} filas\n"
+
+
+@instrumentar
+def consulta_sql(entrada: str, formato: str = None, presupuesto: int = None) -> str:
+    """
+    Ejecuta una consulta SELECT libre con los límites de lineas_consulta:
+    solo lectura, FETCH FIRST 'filas_consulta' filas y call_timeout de
+    'timeout_consulta' segundos.
+    Args:
+        entrada: La consulta (SELECT o WITH, una sola sentencia)
+        formato: texto, markdown, json o csv (por defecto formato_salida())
+        presupuesto: Tokens máximos de la respuesta (None = sin límite)
+    Returns:
+        Filas de la consulta o mensaje de error
+    """
+    formato = formato_salida(formato)
+    output = "".join(lineas_consulta(entrada, formato))
+    if formato in FORMATOS_MAQUINA:
+        return output
+    return recortar_observacion(output, presupuesto, "Acota la consulta con WHERE o pide menos columnas")
+
+
+# Código de vistas y de objetos PL/SQL. user_views.text es LONG: no admite
+# WHERE ni ORDER BY, pero se lee entero con la fila como cualquier columna
+registrar_sentencia('codigo_vistas', """
+    SELECT view_name, text
+    FROM user_views
+    WHERE {filtro}
+    ORDER BY view_name
+""", arraysize=100)
+
+registrar_sentencia('codigo_fuente', """
+    SELECT name, type, line, text
+    FROM user_source
+    WHERE {filtro}
+    ORDER BY name, type, line
+""", arraysize=1000)
+
+COLUMNAS_CODIGO = ['NAME', 'TYPE', 'LINE', 'TEXT']
+
+
+def _lineas_vistas(filas):
+    """Filas (NAME, TYPE, LINE, TEXT) del texto de las vistas, una por línea como user_source."""
+    for view_name, texto in filas:
+        for numero, linea in enumerate((texto or "").splitlines(keepends=True), 1):
+            yield view_name, 'VIEW', numero, linea
+
+
+def _lineas_fuente(filas, formato: str):
+    """Texto y markdown de ObtenerCodigo: cabecera por objeto y su código tal cual."""
+    objeto = None
+    for nombre, tipo, _, texto in filas:
+        if (nombre, tipo) != objeto:
+            if objeto is not None:
+                yield "```\n\n" if formato == 'markdown' else "\n"
+            objeto = (nombre, tipo)
+            yield f"📜 {tipo} {nombre}:\n" + ("```sql\n" if formato == 'markdown' else "")
+        texto = texto or ""
+        yield texto if texto.endswith("\n") else texto + "\n"
+    if objeto is not None and formato == 'markdown':
+        yield "```\n"
+
+
+def lineas_codigo(entrada: str, formato: str = 'texto'):
+    """
+    Genera el código de las vistas (user_views.text) y de los objetos PL/SQL
+    (user_source) cuyo nombre coincide con la entrada. El texto de las vistas
+    llega en la misma fila que su nombre y user_source se lee por lotes de
+    1000 líneas (iterar_sentencia), de modo que un paquete de miles de líneas
+    no se materializa. La sesión se libera al agotar o cerrar el generador.
+    """
+    nombres, patrones = _parsear_tablas(entrada)
+    if not nombres and not patrones:
+        yield "❌ Indica la vista u objeto PL/SQL (ej: V_CLIENTES, PKG_%)\n"
+        return
+
+    filtro, binds = _filtro_tablas(nombres, patrones, 'view_name')
+    vistas = oracle_conn.ejecutar_sentencia('codigo_vistas', binds, filtro=filtro)
+    if isinstance(vistas, str):
+        yield vistas + "\n"
+        return
+    filtro, binds = _filtro_tablas(nombres, patrones, 'name')
+    fuente = oracle_conn.iterar_sentencia('codigo_fuente', binds, filtro=filtro)
+    if isinstance(fuente, str):
+        yield fuente + "\n"
+        return
+
+    lotes = fuente['lotes']
+    try:
+        # El primer lote abre el generador y con él la sesión que cierra el finally
+        filas = chain(_lineas_vistas(vistas['rows']), chain.from_iterable(chain([next(lotes, [])], lotes)))
+        if formato in FORMATOS_MAQUINA:
+            yield from lineas_tabla(COLUMNAS_CODIGO, filas, formato)
+            return
+        vacio = True
+        for linea in _lineas_fuente(filas, formato):
+            vacio = False
+            yield linea
+        if vacio:
+            yield f"ℹ️  No se encontraron vistas ni código PL/SQL para '{entrada.strip()}'\n"
+    finally:
+        lotes.close()
+
+
+@instrumentar
+def obtener_codigo(entrada: str, formato: str = None, presupuesto: int = None) -> str:
+    """
+    Devuelve el texto de vistas y el código fuente de procedimientos,
+    funciones, paquetes, triggers y tipos (ver lineas_codigo).
+    Args:
+        entrada: Nombres o patrones LIKE separados por comas (ej: "V_CLIENTES, PKG_%")
+        formato: texto, markdown, json o csv (por defecto formato_salida())
+        presupuesto: Tokens máximos de la respuesta (None = sin límite)
+    Returns:
+        Código de los objetos o mensaje de error
+    """
+    formato = formato_salida(formato)
+    output = "".join(lineas_codigo(entrada, formato))
+    if formato in FORMATOS_MAQUINA:
+        return output
+    return recortar_observacion(output, presupuesto, "Pide un objeto concreto en lugar de un patrón")
 
 
-def generar_diagrama_er(entrada: str = "") -> str:
+@instrumentar
+def generar_diagrama_er(entrada: str = "", presupuesto: int = None) -> str:
     """
     Genera un diagrama ER en formato Mermaid.
     Args:
-        entrada: Lista de tablas separadas por comas (opcional, vacío = todas)
+        entrada: Lista de tablas separadas por comas (opcional, vacío = todas).
+            Con tablas, incluye las relacionadas a 1 salto; "saltos=N" amplía
+            el vecindario (ej: "CLIENTES, PEDIDOS saltos=2"). Cada tabla
+            lleva sus columnas con tipo y marcas PK/FK/UK salvo con
+            "columnas=no"
+        presupuesto: Tokens máximos de la respuesta (None = sin límite). Si
+            ni siquiera las relaciones caben, se devuelven las tablas con más
+            relaciones; las columnas solo se piden si previsiblemente caben
     Returns:
         Código Mermaid con el diagrama ER
     """
-    # Obtener relaciones
-    query_fk = """
-        SELECT
-            a.table_name,
-            a.column_name,
-            c_pk.table_name as tabla_referenciada,
-            b.column_name as columna_referenciada
-        FROM user_cons_columns a
-        JOIN user_constraints c ON a.constraint_name = c.constraint_name
-        JOIN user_constraints c_pk ON c.r_constraint_name = c_pk.constraint_name
-        JOIN user_cons_columns b ON c_pk.constraint_name = b.constraint_name
-        WHERE c.constraint_type = 'R'
-        ORDER BY a.table_name
-    """
-
-    resultado = oracle_conn.ejecutar_query(query_fk)
+    saltos = 1
+    coincidencia = re.search(r'saltos\s*=\s*(\d+)', entrada, re.IGNORECASE)
+    if coincidencia:
+        saltos = int(coincidencia.group(1))
+        entrada = entrada[:coincidencia.start()] + entrada[coincidencia.end():]
+    columnas = True
+    coincidencia = re.search(r'columnas\s*=\s*(s[ií]|no)\b', entrada, re.IGNORECASE)
+    if coincidencia:
+        columnas = coincidencia.group(1).lower() != 'no'
+        entrada = entrada[:coincidencia.start()] + entrada[coincidencia.end():]
+    tablas = [t.strip().upper() for t in entrada.split(',') if t.strip()]
 
-    if isinstance(resultado, str):
-        return resultado
+    # Obtener relaciones
+    grafo = obtener_grafo_fk()
 
-    if resultado['count'] == 0:
-        return "ℹ️  No se encontraron relaciones para generar diagrama"
+    if isinstance(grafo, str):
+        return grafo
 
-    # Generar código Mermaid
-    output = "```mermaid\nerDiagram\n"
+    if tablas:
+        aristas = grafo.aristas(grafo.vecindario(tablas, saltos))
+    else:
+        aristas = grafo.aristas()
 
-    # Mapear relaciones
-    relaciones_procesadas = set()
+    if not aristas:
+        if tablas:
+            return f"ℹ️  No se encontraron relaciones para {', '.join(tablas)}"
+        return "ℹ️  No se encontraron relaciones para generar diagrama"
 
-    for row in resultado['rows']:
-        tabla, columna, tabla_ref, col_ref = row
+    # Primero las relaciones, que ya están en memoria: si no caben, el
+    # resumen no necesita las columnas
+    alrededor = f" ({saltos} salto(s) alrededor de {', '.join(tablas)})" if tablas else ""
+    relaciones = _mermaid_diagrama(aristas, {}) + alrededor
+    if excede_presupuesto(relaciones, presupuesto):
+        return _resumir_diagrama(aristas, tablas, saltos, presupuesto)
+    if not columnas:
+        return relaciones
+
+    sin_columnas = relaciones + f"\nℹ️  Sin columnas para no exceder ~{presupuesto} tokens; pide menos tablas para verlas"
+    en_diagrama = {tabla for arista in aristas for tabla in arista}
+    minimo = len(relaciones) + sum(len(tabla) + CARACTERES_ENTIDAD_MINIMA for tabla in en_diagrama)
+    if presupuesto is not None and minimo > presupuesto * CARACTERES_POR_TOKEN:
+        return sin_columnas
+
+    # Con tablas se filtra por su vecindario; sin ellas, todo el esquema en
+    # la misma sentencia y se descartan las tablas sin relaciones
+    entidades = _entidades_diagrama(en_diagrama if tablas else None)
+    if isinstance(entidades, str):
+        return entidades
+    entidades = {tabla: bloque for tabla, bloque in entidades.items() if tabla in en_diagrama}
+    output = _mermaid_diagrama(aristas, entidades) + alrededor
+    return sin_columnas if excede_presupuesto(output, presupuesto) else output
+
+
+# Caracteres que Mermaid no admite en tipos y nombres de atributo (espacios
+# de "TIMESTAMP(6) WITH TIME ZONE", $ y # de Oracle)
+NO_MERMAID = re.compile(r'[^\w()\-]+')
+
+# Caracteres que ocupa como mínimo una entidad además de su nombre (llaves y
+# unas pocas columnas); sirve para no pedir columnas que no van a caber
+CARACTERES_ENTIDAD_MINIMA = 80
+
+
+def _entidades_diagrama(tablas=None):
+    """
+    Bloques de entidad Mermaid {tabla: [líneas]} con tipo, nombre y marcas
+    PK/FK/UK de cada columna, del snapshot o de una única consulta
+    (diagrama_columnas) para todas las tablas. Sin tablas, las de todo el
+    esquema.
+    """
+    snapshot = obtener_snapshot()
+    if snapshot:
+        resultado = snapshot.columnas_diagrama(tablas)
+    else:
+        if tablas:
+            filtro, binds = _filtro_tablas(sorted(tablas), (), 'col.table_name')
+        else:
+            filtro, binds = "1 = 1", None
+        resultado = oracle_conn.ejecutar_sentencia('diagrama_columnas', binds, filtro=filtro)
+    if isinstance(resultado, str):
+        return resultado
 
-        relacion_key = f"{tabla}-{tabla_ref}"
-        if relacion_key not in relaciones_procesadas:
-            output += f"    {tabla} ||--o{{ {tabla_ref} : \"referencia\"\n"
-            relaciones_procesadas.add(relacion_key)
+    entidades = {}
+    for tabla, columna, data_type, es_pk, es_fk, es_uk in resultado['rows']:
+        marcas = ", ".join(marca for marca, activa in (('PK', es_pk), ('FK', es_fk), ('UK', es_uk)) if activa)
+        entidades.setdefault(tabla, []).append(
+            f"        {NO_MERMAID.sub('_', data_type or 'DESCONOCIDO')} {NO_MERMAID.sub('_', columna)}"
+            f"{' ' + marcas if marcas else ''}\n"
+        )
+    return entidades
+
+
+def _mermaid_diagrama(aristas, entidades) -> str:
+    """Código Mermaid de GenerarDiagramaER: bloques de entidad (si hay) y relaciones."""
+    lineas = ["```mermaid\nerDiagram\n"]
+    for tabla in sorted(entidades):
+        lineas.append(f"    {tabla} {{\n")
+        lineas.extend(entidades[tabla])
+        lineas.append("    }\n")
+    lineas.extend(f"    {tabla} ||--o{{ {tabla_ref} : \"referencia\"\n" for tabla, tabla_ref in aristas)
+    lineas.append("```\n\n")
+    lineas.append(f"📈 Diagrama generado con {len(aristas)} relaciones")
+    if entidades:
+        lineas.append(f" y {sum(map(len, entidades.values()))} columnas de {len(entidades)} tablas")
+    return "".join(lineas)
+
+
+def _resumir_diagrama(aristas, tablas, saltos: int, presupuesto: int) -> str:
+    """Resumen de GenerarDiagramaER: tablas con más relaciones del (sub)grafo."""
+    grado = Counter()
+    for tabla, tabla_ref in aristas:
+        grado[tabla] += 1
+        grado[tabla_ref] += 1
+    output = [f"📈 El diagrama tiene {len(aristas)} relaciones entre {len(grado)} tablas y excede "
+              f"~{presupuesto} tokens; resumen:\n\n"]
+    output.extend(lineas_ranking("Tablas con más relaciones", grado, "FKs"))
+    if tablas and saltos > 1:
+        sugerencia = f"Reduce el vecindario: {', '.join(tablas)} saltos={saltos - 1}"
+    else:
+        sugerencia = f"Para un diagrama acotado usa GenerarDiagramaER con una tabla (ej: {grado.most_common(1)[0][0]})"
+    return recortar_observacion("".join(output) + f"➡️  {sugerencia}\n", presupuesto, sugerencia)
 
-    output += "```\n\n"
-    output += f"📈 Diagrama generado con {len(relaciones_procesadas)} relaciones"
 
-    return output
+CRITERIOS_IMPORTANCIA = {
+    'pagerank': 0,
+    'entrantes': 1,
+    'salientes': 2,
+}
 
 
-def consultar_metadata(tipo_consulta: str) -> str:
+@instrumentar
+def tablas_importantes(entrada: str = "", formato: str = None, presupuesto: int = None) -> str:
+    """
+    Ranking de las tablas más importantes según el grafo de FKs: PageRank,
+    número de tablas que la referencian y número de tablas a las que
+    referencia. Se calcula una vez por versión del snapshot (o del grafo).
+    Args:
+        entrada: Opcional, en cualquier orden: cuántas tablas (por defecto
+            10), criterio (pagerank, entrantes o salientes) y patrón con %
+            (ej: "5", "20 entrantes", "CLI% 5")
+        formato: texto, markdown, json o csv (por defecto formato_salida())
+        presupuesto: Tokens máximos de la respuesta (None = sin límite)
+    Returns:
+        Tabla con las N tablas de mayor puntuación
+    """
+    limite, criterio, patron = 10, 'pagerank', None
+    for palabra in entrada.replace(',', ' ').split():
+        if palabra.isdigit():
+            limite = max(1, int(palabra))
+        elif palabra.lower() in CRITERIOS_IMPORTANCIA:
+            criterio = palabra.lower()
+        else:
+            patron = palabra.upper()
+
+    grafo = obtener_grafo_fk()
+    if isinstance(grafo, str):
+        return grafo
+
+    importancia = grafo.importancia()
+    candidatas = importancia.items()
+    if patron:
+        expresion = _regex_like(patron)
+        candidatas = [(t, v) for t, v in candidatas if expresion.fullmatch(t)]
+    indice = CRITERIOS_IMPORTANCIA[criterio]
+    # Desempate por el resto de puntuaciones y por nombre, para un orden estable
+    top = heapq.nsmallest(limite, candidatas, key=lambda par: (
+        -par[1][indice], -par[1][0], -par[1][1], par[0]))
+    filas = [(tabla, round(rango, 6), entrantes, salientes) for tabla, (rango, entrantes, salientes) in top]
+
+    formato = formato_salida(formato)
+    if formato in FORMATOS_MAQUINA:
+        return renderizar_tabla(['TABLE_NAME', 'PAGERANK', 'REFERENCIADA_POR', 'REFERENCIA_A'], filas, formato)
+
+    if not filas:
+        if patron:
+            return f"ℹ️  No hay tablas con relaciones que cumplan {patron}"
+        return "ℹ️  No se encontraron relaciones entre tablas"
+
+    output = (f"🏆 Top {len(filas)} tablas por {criterio} "
+              f"({len(importancia)} tablas con relaciones, {grafo.num_aristas} FKs):\n\n")
+    visibles = ((tabla, f"{rango:.4f}", entrantes, salientes) for tabla, rango, entrantes, salientes in filas)
+    output += renderizar_tabla(['Tabla', 'PageRank', 'Referenciada por', 'Referencia a'], visibles, formato,
+                               anchos=[40, 10, 18, None], ancho_relleno=85)
+    return recortar_observacion(output, presupuesto)
+
+
+@instrumentar
+def consultar_metadata(tipo_consulta: str, formato: str = None, presupuesto: int = None) -> str:
     """
     Consulta metadata específica del diccionario de Oracle.
     Args:
-        tipo_consulta: Tipo de metadata (vistas, secuencias, triggers, etc.)
+        tipo_consulta: Tipo de metadata (vistas, secuencias, triggers, etc.),
+            opcionalmente seguido de un patrón LIKE sobre el nombre
+            (ej: "procedimientos PKG_%")
+        formato: texto, markdown, json o csv (por defecto formato_salida())
+        presupuesto: Tokens máximos de la respuesta (None = sin límite). Si
+            no cabe, se devuelve el número de objetos por prefijo
     Returns:
         Información de metadata solicitada
     """
-    tipo = tipo_consulta.strip().lower()
-
-    queries = {
-        'vistas': "SELECT view_name, text_length FROM user_views ORDER BY view_name",
-        'secuencias': "SELECT sequence_name, min_value, max_value, increment_by, last_number FROM user_sequences ORDER BY sequence_name",
-        'triggers': "SELECT trigger_name, trigger_type, triggering_event, table_name, status FROM user_triggers ORDER BY trigger_name",
-        'procedimientos': "SELECT object_name, object_type, status FROM user_objects WHERE object_type IN ('PROCEDURE', 'FUNCTION', 'PACKAGE') ORDER BY object_name"
-    }
+    tipo, _, patron = tipo_consulta.strip().partition(' ')
+    tipo, patron = tipo.lower(), patron.strip().upper()
 
-    if tipo not in queries:
-        return f"❌ Tipo '{tipo}' no reconocido. Opciones: {', '.join(queries.keys())}"
+    if tipo not in QUERIES_METADATA:
+        return f"❌ Tipo '{tipo}' no reconocido. Opciones: {', '.join(QUERIES_METADATA.keys())}"
 
-    resultado = oracle_conn.ejecutar_query(queries[tipo])
+    resultado = oracle_conn.ejecutar_sentencia(f'metadata_{tipo}')
 
     if isinstance(resultado, str):
         return resultado
 
+    if patron:
+        coincide = _regex_like(patron).fullmatch
+        resultado = _resultado(resultado['columns'], [row for row in resultado['rows'] if coincide(row[0])])
+
+    formato = formato_salida(formato)
+    if formato in FORMATOS_MAQUINA:
+        return "".join(lineas_metadata(resultado['columns'], resultado['rows'], formato))
+
     if resultado['count'] == 0:
         return f"ℹ️  No se encontraron {tipo}"
 
@@ -458,14 +3265,384 @@ def consultar_metadata(tipo_consulta: str) -> str:
     output = f"📋 {tipo.upper()} encontrados: {resultado['count']}\n\n"
 
     # Crear tabla
-    headers = resultado['columns']
-    output += " | ".join(f"{h:<25}" for h in headers) + "\n"
-    output += "-" * (25 * len(headers) + (len(headers) - 1) * 3) + "\n"
+    output += "".join(lineas_metadata(resultado['columns'], resultado['rows'], formato))
+    if excede_presupuesto(output, presupuesto):
+        return _resumir_metadata(tipo, patron, resultado['rows'], output, presupuesto)
+    return output
 
-    for row in resultado['rows']:
-        output += " | ".join(f"{str(v or 'N/A'):<25}" for v in row) + "\n"
 
-    return output
+def _resumir_metadata(tipo: str, patron: str, filas, completa: str, presupuesto: int) -> str:
+    """
+    Resumen de ConsultarMetadata: objetos por prefijo del nombre. Si los
+    nombres no comparten prefijos, recorta el listado completo.
+    """
+    prefijos = agrupar_por_prefijo((row[0] for row in filas), patron_literal(patron))
+    if prefijos.most_common(1)[0][1] == 1:
+        return recortar_observacion(completa, presupuesto,
+                                    f"Acota el listado con un patrón (ej: {tipo} {filas[0][0]}%)")
+    output = [f"📋 {len(filas)} {tipo}. El listado completo excede ~{presupuesto} tokens; resumen:\n\n"]
+    output.extend(lineas_ranking("Por prefijo", prefijos, tipo))
+    sugerencia = (f"Para ver el detalle usa ConsultarMetadata con un patrón "
+                  f"(ej: {tipo} {prefijos.most_common(1)[0][0]}%)")
+    return recortar_observacion("".join(output) + f"➡️  {sugerencia}\n", presupuesto, sugerencia)
+
+
+@lru_cache(maxsize=256)
+def _regex_like(patron: str):
+    """Expresión regular equivalente a un patrón LIKE de Oracle."""
+    return re.compile(".*".join(".".join(map(re.escape, parte.split('_'))) for parte in patron.split('%')))
+
+
+def lineas_metadata(headers, filas, formato: str = 'texto'):
+    """Genera las líneas de la tabla de ConsultarMetadata a partir de cualquier iterable de filas."""
+    if formato != 'texto':
+        return lineas_tabla(headers, filas, formato)
+
+    visibles = (tuple(v or 'N/A' for v in row) for row in filas)
+    return lineas_tabla(headers, visibles, formato, anchos=[25] * len(headers), separador=" | ",
+                        relleno="-", ancho_relleno=25 * len(headers) + (len(headers) - 1) * 3)
+
+
+# Palabras que no aportan a una búsqueda por nombre
+PALABRAS_VACIAS = frozenset({
+    'CON', 'QUE', 'LAS', 'LOS', 'DEL', 'PARA', 'POR', 'UNA', 'UNO', 'SUS',
+    'TABLA', 'TABLAS', 'COLUMNA', 'COLUMNAS', 'CAMPO', 'CAMPOS',
+    'RELACIONADA', 'RELACIONADAS', 'RELACIONADO', 'RELACIONADOS'
+})
+
+
+@instrumentar
+def buscar_objetos(entrada: str, formato: str = None, presupuesto: int = None) -> str:
+    """
+    Busca tablas y columnas por nombre o comentario aproximado, usando el
+    índice de trigramas del snapshot.
+    Args:
+        entrada: Uno o varios términos (ej: "usuarios, clientes"); cada
+            objeto se puntúa con el término que mejor coincide
+        formato: texto, markdown, json o csv (por defecto formato_salida())
+        presupuesto: Tokens máximos de la respuesta (None = sin límite)
+    Returns:
+        Coincidencias ordenadas por similitud
+    """
+    terminos = [t for t in normalizar_texto(entrada).split() if len(t) >= 3 and t not in PALABRAS_VACIAS]
+    if not terminos:
+        return "❌ Indica uno o varios términos a buscar (ej: clientes, usuarios)"
+
+    snapshot = obtener_snapshot()
+    if not snapshot:
+        return "ℹ️  BuscarObjetos usa el snapshot local del esquema ('usar_snapshot': True en UTILS/config_oracle.py)"
+
+    config = oracle_conn.config or {}
+    limite = config.get('limite_busqueda', 20)
+    mejores = {}
+    for termino in terminos:
+        for tabla, columna, comentario, similitud in snapshot.buscar(termino, limite):
+            clave = (tabla, columna)
+            if clave not in mejores or similitud > mejores[clave][3]:
+                mejores[clave] = (tabla, columna, comentario, similitud)
+    filas = sorted(mejores.values(), key=lambda f: (-f[3], f[1] is not None, f[0], f[1] or ''))[:limite]
+
+    formato = formato_salida(formato)
+    if formato in FORMATOS_MAQUINA:
+        return renderizar_tabla(['TABLE_NAME', 'COLUMN_NAME', 'COMENTARIO', 'SIMILITUD'], filas, formato)
+
+    if not filas:
+        return f"ℹ️  No se encontraron tablas ni columnas parecidas a {', '.join(terminos)}"
+
+    visibles = (
+        ('TABLA' if columna is None else 'COLUMNA', tabla if columna is None else f"{tabla}.{columna}",
+         f"{similitud:.2f}", (comentario or '-')[:60])
+        for tabla, columna, comentario, similitud in filas
+    )
+    output = f"🔎 Coincidencias para {', '.join(terminos)} ({len(filas)}):\n\n"
+    output += renderizar_tabla(['Tipo', 'Objeto', 'Similitud', 'Comentario'], visibles, formato,
+                               anchos=[8, 50, 10, None], ancho_relleno=100)
+    return recortar_observacion(output, presupuesto)
+
+
+def filas_de(resultado):
+    """Itera las filas de un resultado, materializado (ejecutar_query) o por lotes (iterar_query)."""
+    if 'lotes' in resultado:
+        return chain.from_iterable(resultado['lotes'])
+    return iter(resultado['rows'])
+
+
+# ============================================================================
+# EXPORTACIÓN DEL DICCIONARIO (ARROW / PARQUET)
+# ============================================================================
+
+# Sentencias de exportación: una por fichero Parquet. Se omiten las columnas
+# LONG (data_default, search_condition), que la ruta Arrow no admite
+registrar_sentencia('export_tablas', """
+    SELECT
+        table_name, tablespace_name, num_rows, blocks, avg_row_len,
+        last_analyzed, temporary, partitioned, iot_type
+    FROM user_tables
+""", arraysize=10000)
+
+registrar_sentencia('export_columnas', """
+    SELECT
+        table_name, column_id, column_name, data_type, data_length,
+        data_precision, data_scale, nullable, char_length,
+        num_distinct, num_nulls, last_analyzed
+    FROM user_tab_columns
+""", arraysize=10000)
+
+registrar_sentencia('export_constraints', """
+    SELECT
+        c.constraint_name, c.constraint_type, c.table_name, cc.column_name,
+        cc.position, c.r_constraint_name, r.table_name as tabla_referenciada,
+        c.delete_rule, c.status
+    FROM user_constraints c
+    LEFT JOIN user_cons_columns cc ON c.constraint_name = cc.constraint_name
+    LEFT JOIN user_constraints r ON c.r_constraint_name = r.constraint_name
+""", arraysize=10000)
+
+registrar_sentencia('export_indices', """
+    SELECT
+        i.index_name, i.table_name, i.index_type, i.uniqueness,
+        ic.column_name, ic.column_position, ic.descend, i.status
+    FROM user_indexes i
+    LEFT JOIN user_ind_columns ic ON i.index_name = ic.index_name
+""", arraysize=10000)
+
+registrar_sentencia('export_comentarios', """
+    SELECT table_name, CAST(NULL AS VARCHAR2(128)) as column_name, table_type as tipo, comments
+    FROM user_tab_comments
+    WHERE comments IS NOT NULL
+    UNION ALL
+    SELECT table_name, column_name, 'COLUMN', comments
+    FROM user_col_comments
+    WHERE comments IS NOT NULL
+""", arraysize=10000)
+
+EXPORTACIONES = ('tablas', 'columnas', 'constraints', 'indices', 'comentarios')
+
+
+@instrumentar
+def exportar_diccionario(directorio: str = "") -> str:
+    """
+    Exporta tablas, columnas, constraints, índices y comentarios del esquema
+    a ficheros Parquet (uno por vista), sin pasar por filas de Python.
+    Args:
+        directorio: Carpeta de destino (por defecto OUTPUT/diccionario_oracle)
+    Returns:
+        Resumen de los ficheros generados o mensaje de error
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet as pq
+    except ImportError:
+        return "❌ Módulo 'pyarrow' no encontrado. Instálalo con: pip install pyarrow"
+
+    directorio = directorio.strip() or os.path.join(PROJECT_ROOT, 'OUTPUT', 'diccionario_oracle')
+    os.makedirs(directorio, exist_ok=True)
+
+    output = [f"📦 Diccionario exportado a {directorio}:\n\n"]
+    for nombre in EXPORTACIONES:
+        sentencia = SENTENCIAS[f'export_{nombre}']
+        inicio = time.perf_counter()
+        df = oracle_conn.ejecutar_df(sentencia.texto(), arraysize=sentencia.arraysize,
+                                     nombre=sentencia.nombre)
+        if isinstance(df, str):
+            return df
+        tabla = pyarrow.table(df)
+        ruta = os.path.join(directorio, f"{nombre}.parquet")
+        pq.write_table(tabla, ruta)
+        output.append(f"  {nombre + '.parquet':<25} {tabla.num_rows:>10,} filas  "
+                      f"{time.perf_counter() - inicio:6.2f}s\n")
+
+    return "".join(output)
+
+
+# ============================================================================
+# RASTREO DE ESQUEMAS (ALL_*)
+# ============================================================================
+
+# Esquemas con tablas, de mayor a menor: repartir primero los grandes
+# equilibra la carga entre los hilos
+registrar_sentencia('rastreo_esquemas', """
+    SELECT owner, COUNT(*) as num_tablas
+    FROM all_tables
+    WHERE owner NOT IN ({excluidos})
+    GROUP BY owner
+    ORDER BY num_tablas DESC, owner
+""", arraysize=500)
+
+registrar_sentencia('rastreo_tablas', """
+    SELECT table_name, tablespace_name, num_rows, temporary, last_analyzed
+    FROM all_tables
+    WHERE owner = :owner
+    ORDER BY table_name
+""", arraysize=1000)
+
+registrar_sentencia('rastreo_columnas', """
+    SELECT table_name, column_id, column_name, data_type, data_length,
+           data_precision, data_scale, nullable
+    FROM all_tab_columns
+    WHERE owner = :owner
+    ORDER BY table_name, column_id
+""", arraysize=5000)
+
+registrar_sentencia('rastreo_constraints', """
+    SELECT c.constraint_name, c.constraint_type, c.table_name, cc.column_name,
+           cc.position, c.r_owner, c.r_constraint_name
+    FROM all_constraints c
+    JOIN all_cons_columns cc
+      ON cc.owner = c.owner AND cc.constraint_name = c.constraint_name
+    WHERE c.owner = :owner
+      AND c.constraint_type IN ('P', 'U', 'R')
+    ORDER BY c.table_name, c.constraint_name, cc.position
+""", arraysize=5000)
+
+registrar_sentencia('rastreo_indices', """
+    SELECT i.index_name, i.table_name, i.index_type, i.uniqueness,
+           ic.column_name, ic.column_position
+    FROM all_indexes i
+    JOIN all_ind_columns ic
+      ON ic.index_owner = i.owner AND ic.index_name = i.index_name
+    WHERE i.owner = :owner
+    ORDER BY i.table_name, i.index_name, ic.column_position
+""", arraysize=5000)
+
+VISTAS_RASTREO = ('tablas', 'columnas', 'constraints', 'indices')
+
+
+@instrumentar
+def rastrear_esquemas(esquemas=None, concurrencia: int = None, progreso=None):
+    """
+    Recorre tablas, columnas, constraints e índices de varios esquemas en
+    paralelo, con una tarea por esquema sobre un pool de hilos.
+
+    Cada consulta adquiere su propia sesión, así que la concurrencia real
+    la da el pool de conexiones ('usar_pool') y no pasa de su máximo; con
+    conexión única el rastreo es secuencial. Si se reduce, la pedida
+    queda en 'concurrencia_pedida' para avisar.
+    Args:
+        esquemas: Lista de esquemas (por defecto todos los no del sistema
+            con tablas accesibles, de mayor a menor)
+        concurrencia: Esquemas simultáneos (por defecto
+            'concurrencia_rastreo' o el máximo del pool)
+        progreso: Función opcional progreso(owner, datos, hechos, total)
+            llamada desde el hilo principal al terminar cada esquema
+    Returns:
+        {'esquemas': {owner: {vista: resultado, 'segundos': s}},
+         'errores': {owner: mensaje}, 'segundos': total, 'concurrencia': n,
+         'concurrencia_pedida': m}
+        o mensaje de error
+    """
+    inicio = time.perf_counter()
+    if not esquemas:
+        excluidos = ", ".join(repr(o) for o in ESQUEMAS_SISTEMA)
+        resultado = oracle_conn.ejecutar_sentencia('rastreo_esquemas', excluidos=excluidos)
+        if isinstance(resultado, str):
+            return resultado
+        esquemas = [owner for owner, _ in resultado['rows']]
+
+    config = oracle_conn.config or {}
+    pedida = concurrencia or config.get('concurrencia_rastreo')
+    if oracle_conn.pool is None:
+        concurrencia = 1
+    else:
+        concurrencia = max(1, min(pedida or oracle_conn.pool.max, oracle_conn.pool.max))
+
+    def rastrear(owner):
+        inicio_esquema = time.perf_counter()
+        datos = {}
+        with medir_en_hilo() as medicion:
+            for vista in VISTAS_RASTREO:
+                resultado = oracle_conn.ejecutar_sentencia(f'rastreo_{vista}', {'owner': owner})
+                if isinstance(resultado, str):
+                    return owner, resultado, medicion
+                datos[vista] = resultado
+        datos['segundos'] = time.perf_counter() - inicio_esquema
+        return owner, datos, medicion
+
+    rastreo = {'esquemas': {}, 'errores': {}, 'concurrencia': concurrencia,
+               'concurrencia_pedida': pedida or concurrencia}
+    with ThreadPoolExecutor(max_workers=concurrencia, thread_name_prefix='rastreo') as hilos:
+        tareas = [hilos.submit(rastrear, owner.upper()) for owner in esquemas]
+        for hechos, tarea in enumerate(as_completed(tareas), 1):
+            owner, datos, medicion = tarea.result()
+            # El coste de cada hilo se suma a rastrear_esquemas desde este hilo
+            sumar_a_herramientas(medicion)
+            if isinstance(datos, str):
+                rastreo['errores'][owner] = datos
+            else:
+                rastreo['esquemas'][owner] = datos
+            if progreso:
+                progreso(owner, datos, hechos, len(tareas))
+
+    rastreo['segundos'] = time.perf_counter() - inicio
+    return rastreo
+
+
+def lineas_rastreo(rastreo, formato: str = 'texto'):
+    """Genera la tabla resumen de rastrear_esquemas: filas por vista y tiempo por esquema."""
+    filas = (
+        (owner, *(datos[vista]['count'] for vista in VISTAS_RASTREO), round(datos['segundos'], 1))
+        for owner, datos in sorted(rastreo['esquemas'].items())
+    )
+    if formato in FORMATOS_MAQUINA:
+        return lineas_tabla(['OWNER', 'TABLAS', 'COLUMNAS', 'CONSTRAINTS', 'INDICES', 'SEGUNDOS'], filas, formato)
+    return lineas_tabla(['Esquema', 'Tablas', 'Columnas', 'Constraints', 'Índices', 'Segundos'], filas,
+                        formato, anchos=[30, 10, 10, 12, 10, None], ancho_relleno=85)
+
+
+# ============================================================================
+# EJECUCIÓN DIRECTA DE HERRAMIENTAS (LOTES Y DEMONIO)
+# ============================================================================
+
+# Herramientas que se pueden invocar por nombre y devuelven su resultado como
+# texto en el formato pedido (modo lote de oracle_functions.py y demonio)
+HERRAMIENTAS_DIRECTAS = {
+    'listar_tablas': listar_tablas,
+    'describir_tabla': describir_tabla,
+    'obtener_relaciones': obtener_relaciones,
+    'obtener_indices': obtener_indices,
+    'generar_diagrama_er': lambda entrada, formato: generar_diagrama_er(entrada),
+    'consultar_metadata': consultar_metadata,
+    'buscar_objetos': buscar_objetos,
+    'tablas_importantes': tablas_importantes,
+    'estado_conexion': estado_conexion,
+    'perfilar_columnas': perfilar_columnas,
+    'consulta_sql': consulta_sql,
+    'obtener_codigo': obtener_codigo,
+}
+
+
+def ejecutar_herramienta(comando: str, argumento: str = "", formato: str = None) -> dict:
+    """
+    Ejecuta una herramienta de HERRAMIENTAS_DIRECTAS por nombre.
+    Returns:
+        {'comando', 'argumento', 'ok', 'segundos'} más 'datos' (la salida
+        JSON ya decodificada, con formato json) o 'salida' (el texto)
+    """
+    inicio = time.perf_counter()
+    formato = formato_salida(formato)
+    funcion = HERRAMIENTAS_DIRECTAS.get(comando)
+    if funcion is None:
+        salida = f"❌ Comando no soportado: {comando}. Opciones: {', '.join(HERRAMIENTAS_DIRECTAS)}"
+    else:
+        try:
+            salida = funcion(argumento, formato)
+        except Exception as e:
+            salida = f"❌ Error: {e}"
+
+    registro = {
+        'comando': comando,
+        'argumento': argumento,
+        'ok': not es_error(salida),
+        'segundos': round(time.perf_counter() - inicio, 3),
+    }
+    if formato == 'json' and registro['ok']:
+        try:
+            registro['datos'] = json.loads(salida)
+            return registro
+        except ValueError:
+            pass
+    registro['salida'] = salida
+    return registro
 
 
 # ============================================================================
@@ -478,6 +3655,11 @@ def crear_agente():
     Returns:
         AgentExecutor configurado y listo para usar
     """
+    from langchain_community.llms import Ollama
+    from langchain_core.tools import Tool
+    from langchain_core.prompts import PromptTemplate
+    from langchain_classic.agents import AgentExecutor, create_react_agent
+    from langchain_classic.memory import ConversationBufferMemory
 
     # 1. Inicializar el modelo local de Ollama
     print("🔧 Inicializando modelo Ollama...")
@@ -486,44 +3668,81 @@ def crear_agente():
         temperature=0.3,  # Baja temperatura para respuestas más precisas
     )
 
-    # 2. Definir las herramientas disponibles (SOLO LECTURA)
+    # 2. Definir las herramientas disponibles (SOLO LECTURA). Cada observación
+    # se limita a presupuesto_tokens(); por encima se devuelve un resumen
+    # con la entrada para profundizar, así el prompt no crece con el esquema
+    presupuesto = presupuesto_tokens()
     herramientas = [
         Tool(
             name="ConectarOracle",
             func=conectar_oracle,
             description="Conecta a la base de datos Oracle. Usar al inicio de la sesión."
         ),
+        Tool(
+            name="EstadoConexion",
+            func=estado_conexion,
+            description="Comprueba al instante si la conexión a Oracle responde y la recupera si se cayó. Usar si una herramienta devuelve un error de conexión. Entrada: vacía."
+        ),
         Tool(
             name="ListarTablas",
-            func=listar_tablas,
-            description="Lista todas las tablas del usuario con información básica (nombre, filas, tipo)."
+            func=partial(listar_tablas, presupuesto=presupuesto),
+            description="Lista las tablas del usuario con información básica (nombre, filas, tipo), paginadas. Entrada: patrón opcional (ej: CLI%, ESQUEMA.CLI%) o el token continuar:... de la página anterior. Si hay demasiadas, devuelve un resumen por prefijo para acotar el patrón."
         ),
         Tool(
             name="DescribirTabla",
-            func=describir_tabla,
-            description="Describe la estructura de una tabla específica. Entrada: nombre de la tabla."
+            func=partial(describir_tabla, presupuesto=presupuesto),
+            description="Describe la estructura de una o varias tablas. Entrada: nombre de la tabla, varias separadas por comas o patrón con % (ej: CLI%)."
         ),
         Tool(
             name="ObtenerRelaciones",
-            func=obtener_relaciones,
-            description="Obtiene las Foreign Keys y relaciones entre tablas. Entrada: nombre de tabla (opcional)."
+            func=partial(obtener_relaciones, presupuesto=presupuesto),
+            description="Obtiene las Foreign Keys y relaciones entre tablas. Entrada: nombre de tabla (opcional). Sin tabla, en esquemas grandes devuelve un resumen."
+        ),
+        Tool(
+            name="PerfilarColumnas",
+            func=partial(perfilar_columnas, presupuesto=presupuesto),
+            description="Perfil aproximado de los datos reales de una tabla a partir de una muestra (porcentaje de nulos, valores distintos aproximados, mínimo y máximo por columna). Tarda segundos aunque la tabla sea enorme. Entrada: nombre de una tabla, opcionalmente con filas=N (ej: CLIENTES filas=20000)."
+        ),
+        Tool(
+            name="ConsultaSQL",
+            func=partial(consulta_sql, presupuesto=presupuesto),
+            description="Ejecuta una consulta SELECT de solo lectura sobre los datos y devuelve como mucho las primeras filas (con límite de tiempo). Usar solo cuando las demás herramientas no bastan. Entrada: la consulta SQL (una sola sentencia SELECT o WITH)."
         ),
         Tool(
             name="ObtenerIndices",
-            func=obtener_indices,
+            func=partial(obtener_indices, presupuesto=presupuesto),
             description="Lista los índices de una tabla. Entrada: nombre de la tabla."
         ),
         Tool(
             name="GenerarDiagramaER",
-            func=generar_diagrama_er,
-            description="Genera un diagrama ER en formato Mermaid. Entrada: lista de tablas (opcional)."
+            func=partial(generar_diagrama_er, presupuesto=presupuesto),
+            description="Genera un diagrama ER en formato Mermaid con las columnas de cada tabla (tipo y PK/FK/UK). Entrada: lista de tablas separadas por comas (opcional, incluye las relacionadas a 1 salto; añade saltos=N para ampliar y columnas=no para dibujar solo las relaciones)."
+        ),
+        Tool(
+            name="TablasImportantes",
+            func=partial(tablas_importantes, presupuesto=presupuesto),
+            description="Devuelve al instante las tablas más importantes según las relaciones (PageRank sobre las FKs, veces referenciada y tablas a las que referencia). Entrada: opcional, número de tablas (ej: 5), criterio (pagerank, entrantes, salientes) y patrón (ej: CLI%)."
+        ),
+        Tool(
+            name="BuscarObjetos",
+            func=partial(buscar_objetos, presupuesto=presupuesto),
+            description="Busca tablas y columnas por nombre o comentario aproximado, ordenadas por similitud. Entrada: uno o varios términos (ej: usuarios, clientes)."
+        ),
+        Tool(
+            name="ObtenerCodigo",
+            func=partial(obtener_codigo, presupuesto=presupuesto),
+            description="Devuelve la definición SQL de vistas y el código fuente de procedimientos, funciones, paquetes y triggers. Entrada: nombres o patrones separados por comas (ej: V_CLIENTES, PKG_FACTURAS%)."
         ),
         Tool(
             name="ConsultarMetadata",
-            func=consultar_metadata,
-            description="Consulta metadata del diccionario Oracle. Entrada: tipo (vistas, secuencias, triggers, procedimientos)."
+            func=partial(consultar_metadata, presupuesto=presupuesto),
+            description="Consulta metadata del diccionario Oracle. Entrada: tipo (vistas, secuencias, triggers, procedimientos) y opcionalmente un patrón (ej: procedimientos PKG_%)."
         )
     ]
+    if not (oracle_conn.config or {}).get('usar_snapshot'):
+        # Sin snapshot BuscarObjetos solo devolvería el aviso de activarlo:
+        # no se ofrece al modelo para que no gaste un paso en ella
+        herramientas = [h for h in herramientas if h.name != "BuscarObjetos"]
 
     # 3. Crear el prompt template (simplificado para mejor rendimiento)
     template = """Eres un analista experto de bases de datos Oracle. Solo puedes LEER datos, NUNCA modificar.
@@ -598,9 +3817,13 @@ def main():
     print("  🔗 Analizar relaciones (Foreign Keys)")
     print("  📇 Ver índices y constraints")
     print("  📈 Generar diagramas ER (Mermaid)")
+    print("  🔎 Buscar tablas y columnas por nombre o comentario")
+    print("  🏆 Identificar las tablas más importantes por sus relaciones")
+    print("  🔬 Perfilar los datos de las columnas con una muestra")
+    print("  📜 Ver la definición de vistas y el código PL/SQL")
     print("  📋 Consultar metadata del diccionario")
     print("\n⚠️  MODO SOLO LECTURA - No se pueden modificar datos")
-    print("\nEscribe 'salir' o 'exit' para terminar\n")
+    print("\nEscribe 'salir' o 'exit' para terminar (Ctrl+C interrumpe la respuesta en curso)\n")
     print("=" * 70 + "\n")
 
     # Verificar configuración
@@ -653,7 +3876,14 @@ ORACLE_CONFIG = {
 
             # Ejecutar el agente
             print("\n🤖 Agente:")
-            respuesta = agente.invoke({"input": pregunta})
+            try:
+                respuesta = agente.invoke({"input": pregunta})
+            except KeyboardInterrupt:
+                # Ctrl+C durante la respuesta: cancela las consultas en curso
+                # (también las de otros hilos) y vuelve a preguntar
+                canceladas = oracle_conn.cancelar()
+                print(f"\n\n⛔ Respuesta interrumpida ({canceladas} consultas canceladas)\n")
+                continue
 
             # Mostrar la respuesta final
             print("\n" + "=" * 70)
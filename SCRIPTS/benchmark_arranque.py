@@ -0,0 +1,186 @@
+"""
+Benchmark del tiempo de arranque de los scripts de entrada.
+Importa cada script (sin ejecutar su main) en un proceso nuevo con
+`python -X importtime` y suma el tiempo acumulado de los imports de primer
+nivel. Los scripts directos (sin LLM) no deben cargar LangChain: si alguno
+lo hace, el benchmark lo marca como error.
+Uso:
+    py SCRIPTS/benchmark_arranque.py [opciones]
+Ejemplos:
+    py SCRIPTS/benchmark_arranque.py
+    py SCRIPTS/benchmark_arranque.py --scripts oracle_directo,oracle_cliente --modulos 10
+    py SCRIPTS/benchmark_arranque.py --json OUTPUT/arranque_base.json
+    py SCRIPTS/benchmark_arranque.py --referencia OUTPUT/arranque_base.json
+Termina con código 1 si un script directo importa LangChain o si, con
+--referencia, algún script arranca más lento que la tolerancia.
+"""
+
+import sys
+import os
+import argparse
+import json
+import statistics
+import subprocess
+import time
+
+# Configurar UTF-8 para Windows
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Scripts de entrada: nombre -> directo (no debe cargar LangChain)
+SCRIPTS = {
+    'oracle_cliente': True,
+    'oracle_directo': True,
+    'oracle_functions': True,
+    'oracle_daemon': True,
+    'benchmark_oracle_tools': True,
+    'configurar_oracle': True,
+    'ejemplo_oracle': False,
+    'ejemplo_estimacion': False,
+}
+
+# Paquetes que solo debe cargar crear_agente()
+PAQUETES_LLM = ('langchain', 'langchain_core', 'langchain_community', 'langchain_classic')
+
+# Carga el script como módulo con otro nombre para que no entre en su main()
+CARGADOR = (
+    "import importlib.util, sys\n"
+    "spec = importlib.util.spec_from_file_location('__arranque__', sys.argv[1])\n"
+    "spec.loader.exec_module(importlib.util.module_from_spec(spec))\n"
+)
+
+
+def medir_script(ruta: str):
+    """
+    Arranca un proceso que importa el script y devuelve su tiempo de pared
+    (ms), el tiempo de imports de primer nivel (ms) y {módulo: µs acumulados}
+    de los imports de primer nivel.
+    """
+    inicio = time.perf_counter()
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CARGADOR, ruta],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, encoding='utf-8', errors='replace'
+    )
+    pared = (time.perf_counter() - inicio) * 1000
+    if proceso.returncode != 0:
+        ultima = (proceso.stderr.strip().splitlines() or ["sin salida"])[-1]
+        raise RuntimeError(ultima)
+
+    modulos = {}
+    importados = set()
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith('import time:'):
+            continue
+        _, acumulado, nombre = linea[len('import time:'):].split('|')
+        if not acumulado.strip().isdigit():
+            continue  # cabecera "self [us] | cumulative | imported package"
+        importados.add(nombre.strip().split('.')[0])
+        # El primer nivel lleva un único espacio tras la barra; cada nivel
+        # de anidamiento añade dos
+        if not nombre.startswith('  '):
+            modulos[nombre.strip()] = int(acumulado)
+    return pared, sum(modulos.values()) / 1000, modulos, importados
+
+
+def medir(nombre: str, repeticiones: int, num_modulos: int):
+    """Mide un script `repeticiones` veces (medianas) y resume sus imports."""
+    ruta = os.path.join(PROJECT_ROOT, 'SCRIPTS', f"{nombre}.py")
+    paredes, imports = [], []
+    for _ in range(repeticiones):
+        pared, total, modulos, importados = medir_script(ruta)
+        paredes.append(pared)
+        imports.append(total)
+    pesados = sorted(modulos.items(), key=lambda m: -m[1])[:num_modulos]
+    return {
+        'ms': round(statistics.median(paredes), 1),
+        'imports_ms': round(statistics.median(imports), 1),
+        'modulos': len(importados),
+        'llm': sorted(set(PAQUETES_LLM) & importados),
+        'mas_pesados': {modulo: round(us / 1000, 1) for modulo, us in pesados},
+    }
+
+
+def imprimir_resultados(resultados):
+    """Tabla de tiempos de arranque y módulos más pesados de cada script."""
+    print(f"\n{'Script':<26}{'ms':>10}{'Imports ms':>12}{'Paquetes':>10}  LangChain")
+    print("-" * 70)
+    for nombre, m in resultados.items():
+        llm = "sí" if m['llm'] else "no"
+        print(f"{nombre:<26}{m['ms']:>10}{m['imports_ms']:>12}{m['modulos']:>10}  {llm}")
+
+    print("\n🐢 Imports de primer nivel más lentos (ms acumulados):")
+    for nombre, m in resultados.items():
+        pesados = ", ".join(f"{modulo} {ms}" for modulo, ms in m['mas_pesados'].items())
+        print(f"   {nombre}: {pesados}")
+
+
+def comparar(actual, referencia, tolerancia: float) -> list:
+    """
+    Regresiones frente a una ejecución guardada: tiempo de imports por
+    encima de la tolerancia (se ignoran diferencias de menos de 20 ms, el
+    ruido habitual al lanzar un proceso).
+    """
+    regresiones = []
+    for nombre, m in actual.items():
+        base = referencia.get(nombre)
+        if not base:
+            continue
+        if m['imports_ms'] > base['imports_ms'] * (1 + tolerancia) and m['imports_ms'] - base['imports_ms'] >= 20:
+            regresiones.append(f"{nombre}: {base['imports_ms']} ms -> {m['imports_ms']} ms")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del arranque de los scripts Oracle")
+    parser.add_argument('--scripts', default=",".join(SCRIPTS),
+                        help="Scripts de SCRIPTS/ a medir, separados por comas")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--modulos', type=int, default=5,
+                        help="Imports de primer nivel más lentos a mostrar por script")
+    parser.add_argument('--json', help="Guardar los resultados en este fichero")
+    parser.add_argument('--referencia', help="Comparar con un resultado guardado con --json")
+    parser.add_argument('--tolerancia', type=float, default=0.25,
+                        help="Empeoramiento de tiempo admitido frente a la referencia")
+    opciones = parser.parse_args()
+
+    print("=" * 70)
+    print("⏱️  BENCHMARK DE ARRANQUE DE SCRIPTS (python -X importtime)")
+    print("=" * 70)
+
+    actual = {}
+    errores = []
+    for nombre in (s.strip() for s in opciones.scripts.split(',') if s.strip()):
+        try:
+            actual[nombre] = medir(nombre, opciones.repeticiones, opciones.modulos)
+        except (RuntimeError, OSError) as e:
+            # Normalmente una dependencia opcional sin instalar (ej: PyPDF2)
+            print(f"⚠️  {nombre}: no se pudo importar ({e})")
+            continue
+        if SCRIPTS.get(nombre) and actual[nombre]['llm']:
+            errores.append(f"{nombre}: script directo que importa {', '.join(actual[nombre]['llm'])}")
+    imprimir_resultados(actual)
+
+    if opciones.json:
+        with open(opciones.json, 'w', encoding='utf-8') as f:
+            json.dump(actual, f, indent=2)
+        print(f"\n💾 Resultados guardados en {opciones.json}")
+
+    if opciones.referencia:
+        with open(opciones.referencia, encoding='utf-8') as f:
+            regresiones = comparar(actual, json.load(f), opciones.tolerancia)
+        if regresiones:
+            errores += [f"regresión · {regresion}" for regresion in regresiones]
+        else:
+            print("\n✅ Sin regresiones frente a la referencia")
+
+    if errores:
+        print("\n❌ Problemas de arranque:")
+        for error in errores:
+            print(f"   {error}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Benchmark de las herramientas de agente_oracle.py sin base de datos Oracle.
+Genera esquemas sintéticos sobre el diccionario simulado de
+UTILS/oracle_sqlite.py y mide cada herramienta: tiempo, round trips, filas
+leídas del diccionario, pico de memoria y tamaño de la salida.
+Uso:
+    py SCRIPTS/benchmark_oracle_tools.py [opciones]
+Ejemplos:
+    py SCRIPTS/benchmark_oracle_tools.py
+    py SCRIPTS/benchmark_oracle_tools.py --tamanos 10,1000,50000 --snapshot
+    py SCRIPTS/benchmark_oracle_tools.py --json OUTPUT/bench_base.json
+    py SCRIPTS/benchmark_oracle_tools.py --referencia OUTPUT/bench_base.json
+Con --referencia compara con un resultado guardado con --json y termina con
+código 1 si alguna herramienta empeora más de la tolerancia en tiempo o
+aumenta sus round trips.
+"""
+
+import sys
+import os
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+from functools import partial
+from inspect import signature
+
+# Configurar UTF-8 para Windows
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+import AGENTS.agente_oracle as agente
+from UTILS.oracle_sqlite import generar_esquema, conectar_sqlite, diccionario_vigente
+
+DIRECTORIO_BENCH = os.path.join(PROJECT_ROOT, '.cache', 'oracle', 'bench')
+
+
+def preparar_esquema(num_tablas: int, otros_esquemas: int, semilla: int, regenerar: bool) -> str:
+    """
+    Genera (o reutiliza, al ser determinista) el diccionario de un tamaño.
+    Un fichero de una versión anterior del generador se vuelve a generar.
+    """
+    os.makedirs(DIRECTORIO_BENCH, exist_ok=True)
+    ruta = os.path.join(DIRECTORIO_BENCH, f"esquema_{num_tablas}_{otros_esquemas}_{semilla}.sqlite")
+    if regenerar or not diccionario_vigente(ruta):
+        inicio = time.perf_counter()
+        generar_esquema(ruta, num_tablas, otros_esquemas=otros_esquemas, semilla=semilla)
+        print(f"   Esquema de {num_tablas} tablas generado en {time.perf_counter() - inicio:.1f}s")
+    return ruta
+
+
+def herramientas(conexion, snapshot: bool, presupuesto):
+    """
+    Casos a medir: (nombre, función sin argumentos). Las entradas se eligen
+    del propio esquema (una tabla con FKs y su prefijo).
+    """
+    tabla = conexion.db.execute(
+        "SELECT table_name FROM user_constraints WHERE constraint_type = 'R' ORDER BY table_name LIMIT 1"
+    ).fetchone()[0]
+    prefijo = "_".join(tabla.split("_")[:2]) + "%"
+
+    def con_presupuesto(funcion):
+        if presupuesto and 'presupuesto' in signature(funcion).parameters:
+            return partial(funcion, presupuesto=presupuesto)
+        return funcion
+
+    casos = [
+        ('listar_tablas', agente.listar_tablas, ""),
+        ('listar_tablas patrón', agente.listar_tablas, prefijo),
+        ('describir_tabla', agente.describir_tabla, tabla),
+        ('describir_tabla patrón', agente.describir_tabla, prefijo),
+        ('obtener_relaciones', agente.obtener_relaciones, ""),
+        ('obtener_relaciones tabla', agente.obtener_relaciones, tabla),
+        ('obtener_indices', agente.obtener_indices, tabla),
+        ('generar_diagrama_er', agente.generar_diagrama_er, ""),
+        ('generar_diagrama_er tabla', agente.generar_diagrama_er, tabla),
+        ('generar_diagrama_er relaciones', agente.generar_diagrama_er, "columnas=no"),
+        ('tablas_importantes', agente.tablas_importantes, "10"),
+    ]
+    casos += [(f'consultar_metadata {tipo}', agente.consultar_metadata, tipo)
+              for tipo in agente.QUERIES_METADATA]
+    if snapshot:
+        casos.append(('buscar_objetos', agente.buscar_objetos, "clientes, usuarios"))
+    casos = [(nombre, partial(con_presupuesto(funcion), entrada)) for nombre, funcion, entrada in casos]
+    casos.append(('rastrear_esquemas', agente.rastrear_esquemas))
+    return casos
+
+
+def medir(funcion, conexion, repeticiones: int):
+    """
+    Ejecuta una herramienta `repeticiones` veces para el tiempo (mediana) y
+    una vez más bajo tracemalloc para el pico de memoria.
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        conexion.reiniciar_contadores()
+        inicio = time.perf_counter()
+        salida = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    contadores = conexion.contadores()
+
+    tracemalloc.start()
+    try:
+        funcion()
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'ms': round(statistics.median(tiempos) * 1000, 2),
+        'ida_y_vuelta': contadores['ida_y_vuelta'],
+        'filas': contadores['filas'],
+        'pico_kb': round(pico / 1024, 1),
+        'salida': len(salida) if isinstance(salida, str) else len(json.dumps(salida, default=str)),
+    }
+
+
+def ejecutar_tamano(num_tablas: int, opciones):
+    """Mide todas las herramientas sobre un esquema de num_tablas tablas."""
+    ruta = preparar_esquema(num_tablas, opciones.esquemas, opciones.semilla, opciones.regenerar)
+    snapshot_dir = os.path.join(DIRECTORIO_BENCH, 'snapshot')
+    # Sin --cache, cada repetición va al diccionario (la caché de resultados
+    # serviría todas menos la primera)
+    conectar_sqlite(agente.oracle_conn, ruta, usar_snapshot=opciones.snapshot, snapshot_dir=snapshot_dir,
+                    cache_consultas=256 if opciones.cache else 0)
+    agente.cache_consultas.invalidar()
+    conexion = agente.oracle_conn.connection
+    agente._snapshot = None
+    agente._grafo_fk = None
+
+    resultados = {}
+    if opciones.snapshot:
+        ruta_snapshot = agente.ruta_snapshot(agente.oracle_conn.config)
+        if os.path.exists(ruta_snapshot):
+            os.remove(ruta_snapshot)
+        resultados['refrescar_snapshot (completo)'] = medir(
+            lambda: agente.obtener_snapshot(forzar_refresco=True).ruta, conexion, 1)
+
+    for nombre, funcion in herramientas(conexion, opciones.snapshot, opciones.presupuesto):
+        resultados[nombre] = medir(funcion, conexion, opciones.repeticiones)
+
+    conexion.close()
+    agente.oracle_conn.connection = None
+    return resultados
+
+
+def imprimir_resultados(num_tablas: int, resultados):
+    """Tabla de resultados de un tamaño de esquema."""
+    print(f"\n📊 Esquema de {num_tablas} tablas:\n")
+    filas = (
+        (nombre, m['ms'], m['ida_y_vuelta'], m['filas'], m['pico_kb'], m['salida'])
+        for nombre, m in resultados.items()
+    )
+    print("".join(agente.lineas_tabla(
+        ['Herramienta', 'ms', 'Round trips', 'Filas', 'Pico KB', 'Salida'], filas,
+        anchos=[36, 10, 12, 10, 12, None], ancho_relleno=94)))
+
+
+def comparar(actual, referencia, tolerancia: float) -> list:
+    """
+    Regresiones frente a una ejecución guardada: más round trips, o tiempo
+    por encima de la tolerancia (se ignoran diferencias de menos de 1 ms).
+    """
+    regresiones = []
+    for tamano, resultados in actual.items():
+        for nombre, m in resultados.items():
+            base = referencia.get(tamano, {}).get(nombre)
+            if not base:
+                continue
+            if m['ida_y_vuelta'] > base['ida_y_vuelta']:
+                regresiones.append(f"{tamano} tablas · {nombre}: round trips "
+                                   f"{base['ida_y_vuelta']} -> {m['ida_y_vuelta']}")
+            if m['ms'] > base['ms'] * (1 + tolerancia) and m['ms'] - base['ms'] >= 1:
+                regresiones.append(f"{tamano} tablas · {nombre}: {base['ms']} ms -> {m['ms']} ms")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las herramientas del agente Oracle")
+    parser.add_argument('--tamanos', default="10,1000,10000",
+                        help="Tablas por esquema, separadas por comas (10 a 50000)")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--esquemas', type=int, default=2,
+                        help="Esquemas adicionales visibles en all_* (para rastrear_esquemas)")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--snapshot', action='store_true', help="Activar el snapshot local")
+    parser.add_argument('--cache', action='store_true',
+                        help="Activar la caché de resultados (mide las llamadas repetidas)")
+    parser.add_argument('--presupuesto', type=int, default=None,
+                        help="Presupuesto de tokens como en el agente")
+    parser.add_argument('--regenerar', action='store_true', help="Regenerar los esquemas en caché")
+    parser.add_argument('--json', help="Guardar los resultados en este fichero")
+    parser.add_argument('--referencia', help="Comparar con un resultado guardado con --json")
+    parser.add_argument('--tolerancia', type=float, default=0.25,
+                        help="Empeoramiento de tiempo admitido frente a la referencia")
+    opciones = parser.parse_args()
+
+    print("=" * 70)
+    print("⏱️  BENCHMARK DE HERRAMIENTAS ORACLE (diccionario simulado)")
+    print("=" * 70)
+
+    actual = {}
+    for num_tablas in (int(t) for t in opciones.tamanos.split(',')):
+        actual[str(num_tablas)] = ejecutar_tamano(num_tablas, opciones)
+        imprimir_resultados(num_tablas, actual[str(num_tablas)])
+
+    if opciones.json:
+        with open(opciones.json, 'w', encoding='utf-8') as f:
+            json.dump(actual, f, indent=2)
+        print(f"💾 Resultados guardados en {opciones.json}")
+
+    if opciones.referencia:
+        with open(opciones.referencia, encoding='utf-8') as f:
+            regresiones = comparar(actual, json.load(f), opciones.tolerancia)
+        if regresiones:
+            print("\n❌ Regresiones frente a la referencia:")
+            for regresion in regresiones:
+                print(f"   {regresion}")
+            sys.exit(1)
+        print("\n✅ Sin regresiones frente a la referencia")
+
+
+if __name__ == "__main__":
+    main()
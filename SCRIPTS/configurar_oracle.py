@@ -55,7 +55,23 @@ ORACLE_CONFIG = {{
     'port': {config['port']},
     'service_name': '{config['service_name']}',
     'user': '{config['user']}',
-    'password': '{config['password']}'
+    'password': '{config['password']}',
+
+    # Pool de sesiones (oracledb.create_pool). Con 'drcp': True usa el
+    # pool del servidor (Database Resident Connection Pooling). Desactivado,
+    # se usa una única conexión.
+    'usar_pool': False,
+    'pool_min': 1,
+    'pool_max': 4,
+    'pool_increment': 1,
+    'drcp': False,
+
+    # Snapshot local del esquema (SQLite en .cache/oracle). Las herramientas
+    # responden desde disco mientras tenga menos de snapshot_ttl segundos y
+    # se refresca de forma incremental según LAST_DDL_TIME. Desactivado,
+    # cada herramienta consulta el diccionario de Oracle.
+    'usar_snapshot': False,
+    'snapshot_ttl': 900
 }}
 
 # Información de la conexión:
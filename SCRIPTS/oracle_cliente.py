@@ -0,0 +1,73 @@
+"""
+Cliente ligero del demonio de metadata Oracle (SCRIPTS/oracle_daemon.py).
+Solo usa la biblioteca estándar: no importa oracledb ni LangChain, así que
+una consulta de metadata tarda lo que tarda el demonio en responder.
+Uso:
+    py SCRIPTS/oracle_cliente.py [comando] [argumento_opcional] [opciones]
+Ejemplos:
+    py SCRIPTS/oracle_cliente.py describir_tabla CLIENTES
+    py SCRIPTS/oracle_cliente.py tablas_importantes 5 --formato json
+    py SCRIPTS/oracle_cliente.py estado
+    py SCRIPTS/oracle_cliente.py metricas prometheus
+    py SCRIPTS/oracle_cliente.py detener
+
+Opciones:
+    --formato texto|markdown|json|csv   Formato de salida de las herramientas
+    --socket RUTA|host:puerto           Dirección del demonio (por defecto la
+                                        de oracle_daemon.py o $ORACLE_DAEMON)
+"""
+
+import sys
+import os
+import json
+
+# Configurar UTF-8 para Windows
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from UTILS.oracle_protocolo import ClienteDaemon, parsear_direccion
+
+
+def extraer_opcion(args, nombre):
+    """Quita "--nombre valor" de args y devuelve el valor (None si no está)."""
+    if nombre not in args:
+        return None
+    posicion = args.index(nombre)
+    valor = args[posicion + 1] if posicion + 1 < len(args) else ''
+    del args[posicion:posicion + 2]
+    return valor
+
+
+def main():
+    args = sys.argv[1:]
+    formato = extraer_opcion(args, '--formato')
+    direccion = parsear_direccion(extraer_opcion(args, '--socket'))
+    if not args:
+        print("Uso: py SCRIPTS/oracle_cliente.py [comando] [argumento_opcional] [--formato F] [--socket RUTA]")
+        sys.exit(1)
+
+    comando = args[0].lower()
+    argumento = args[1] if len(args) > 1 else ""
+    opciones = {'formato': formato.lower()} if formato else {}
+
+    try:
+        with ClienteDaemon(direccion) as cliente:
+            respuesta = cliente.llamar(comando, argumento, **opciones)
+    except OSError as e:
+        print(f"❌ No se pudo contactar con el demonio en {direccion}: {e}", file=sys.stderr)
+        print("   Arráncalo con: py SCRIPTS/oracle_daemon.py", file=sys.stderr)
+        sys.exit(2)
+
+    if 'datos' in respuesta:
+        print(json.dumps(respuesta['datos'], indent=2, ensure_ascii=False))
+    else:
+        print(respuesta.get('salida', ''))
+    if not respuesta.get('ok'):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Demonio local de metadata Oracle (solo lectura).
+Mantiene en un proceso el pool de sesiones, el snapshot, la caché de
+resultados y el grafo de FKs, y atiende peticiones de herramientas por un
+socket Unix (protocolo de UTILS/oracle_protocolo.py). Con el demonio en
+marcha, SCRIPTS/oracle_cliente.py responde en milisegundos porque no
+importa oracledb ni vuelve a hacer login.
+Uso:
+    py SCRIPTS/oracle_daemon.py [opciones]
+Ejemplos:
+    py SCRIPTS/oracle_daemon.py
+    py SCRIPTS/oracle_daemon.py --socket /tmp/oracle.sock --concurrencia 8
+    py SCRIPTS/oracle_daemon.py --sqlite .cache/oracle/bench/esquema_1000_2_0.sqlite
+Además de las herramientas, el demonio entiende: ping, estado, metricas
+[json|prometheus], invalidar_cache, refrescar_snapshot y detener.
+"""
+
+import sys
+import os
+import argparse
+import hmac
+import signal
+import socket
+import socketserver
+import threading
+import time
+
+# Configurar UTF-8 para Windows
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from AGENTS.agente_oracle import (
+    conectar_oracle,
+    ejecutar_herramienta,
+    obtener_snapshot,
+    cache_consultas,
+    metricas,
+    FORMATOS_METRICAS,
+    oracle_conn
+)
+from UTILS.oracle_protocolo import (
+    parsear_direccion, familia, codificar, decodificar, ClienteDaemon, crear_token, ruta_token
+)
+
+
+class ManejadorPeticiones(socketserver.StreamRequestHandler):
+    """Atiende las peticiones (una por línea) de una conexión de cliente."""
+
+    def handle(self):
+        for linea in self.rfile:
+            if not linea.strip():
+                continue
+            try:
+                peticion = decodificar(linea)
+            except ValueError as e:
+                respuesta = {'ok': False, 'salida': f"❌ Petición no válida: {e}"}
+            else:
+                try:
+                    respuesta = self.server.atender(peticion)
+                except Exception as e:
+                    # Una petición rara no debe cerrar la conexión sin respuesta
+                    respuesta = {'ok': False, 'salida': f"❌ Error atendiendo la petición: {e}"}
+            self.wfile.write(codificar(respuesta))
+            self.wfile.flush()
+
+
+class ServidorMetadata:
+    """
+    Servidor de un hilo por conexión. Las herramientas comparten el estado
+    de agente_oracle (pool, snapshot, caché de resultados, grafo de FKs).
+    Solo se atienden peticiones con el token de crear_token: con TCP
+    cualquier proceso local puede conectarse y entre las herramientas está
+    ConsultaSQL.
+    """
+
+    def __init__(self, direccion):
+        self.direccion = direccion
+        self.inicio = time.time()
+        self.peticiones = 0
+        self.errores = 0
+        self._bloqueo = threading.Lock()
+
+        if familia(direccion) == socket.AF_INET:
+            base = socketserver.ThreadingTCPServer
+        else:
+            base = socketserver.ThreadingUnixStreamServer
+        clase = type('Servidor', (base,), {'daemon_threads': True, 'allow_reuse_address': True})
+        # El socket Unix nace ya con permisos solo para el usuario: un chmod
+        # tras el bind dejaría un momento los permisos de la umask
+        umask = os.umask(0o077)
+        try:
+            self.servidor = clase(direccion, ManejadorPeticiones)
+        finally:
+            os.umask(umask)
+        self.servidor.atender = self.atender
+        self.token = crear_token(direccion)
+
+    def atender(self, peticion: dict) -> dict:
+        """Ejecuta una petición y devuelve la respuesta."""
+        comando = str(peticion.get('comando', '')).lower()
+        argumento = str(peticion.get('argumento', ''))
+        formato = peticion.get('formato')
+        inicio = time.perf_counter()
+
+        if not hmac.compare_digest(str(peticion.get('token') or ''), self.token):
+            respuesta = {'ok': False, 'salida': f"🚫 Token no válido (se lee de {ruta_token(self.direccion)})"}
+        elif formato is not None and not isinstance(formato, str):
+            respuesta = {'ok': False, 'salida': "❌ Petición no válida: 'formato' debe ser texto"}
+        elif comando == 'ping':
+            respuesta = {'ok': True, 'salida': 'pong'}
+        elif comando == 'estado':
+            respuesta = {'ok': True, 'datos': self.estado()}
+        elif comando == 'metricas':
+            formato = argumento.lower() or 'json'
+            if not metricas.activas:
+                respuesta = {'ok': False, 'salida': "ℹ️  Métricas desactivadas: arranca el demonio con --metrics"}
+            elif formato not in FORMATOS_METRICAS:
+                respuesta = {'ok': False, 'salida': f"❌ Formato no soportado. Opciones: {', '.join(FORMATOS_METRICAS)}"}
+            else:
+                respuesta = {'ok': True, 'salida': metricas.exportar(formato)}
+        elif comando == 'invalidar_cache':
+            respuesta = {'ok': True, 'salida': f"✅ Caché vaciada ({cache_consultas.invalidar()} resultados descartados)"}
+        elif comando == 'refrescar_snapshot':
+            if not oracle_conn.config.get('usar_snapshot'):
+                respuesta = {'ok': False, 'salida': "ℹ️  El snapshot está desactivado ('usar_snapshot')"}
+            elif obtener_snapshot(forzar_refresco=True):
+                respuesta = {'ok': True, 'salida': "✅ Snapshot del esquema actualizado"}
+            else:
+                respuesta = {'ok': False, 'salida': "❌ No se pudo actualizar el snapshot"}
+        elif comando == 'detener':
+            threading.Thread(target=self.servidor.shutdown, daemon=True).start()
+            respuesta = {'ok': True, 'salida': "👋 Demonio detenido"}
+        else:
+            respuesta = ejecutar_herramienta(comando, argumento, formato)
+
+        respuesta.setdefault('segundos', round(time.perf_counter() - inicio, 3))
+        with self._bloqueo:
+            self.peticiones += 1
+            self.errores += not respuesta['ok']
+        return respuesta
+
+    def estado(self) -> dict:
+        """Datos de funcionamiento del demonio."""
+        config = oracle_conn.config or {}
+        estado = {
+            'pid': os.getpid(),
+            'direccion': self.direccion,
+            'segundos_activo': round(time.time() - self.inicio, 1),
+            'peticiones': self.peticiones,
+            'errores': self.errores,
+            'conexion': f"{config.get('host')}/{config.get('service_name')} ({config.get('user')})",
+            'cache_consultas': cache_consultas.estadisticas(),
+            'salud': oracle_conn.salud(),
+        }
+        if oracle_conn.pool is not None:
+            estado['pool'] = {'abiertas': oracle_conn.pool.opened, 'ocupadas': oracle_conn.pool.busy,
+                              'maximo': oracle_conn.pool.max}
+        return estado
+
+    def servir(self):
+        """Atiende peticiones hasta recibir 'detener', SIGTERM o Ctrl+C."""
+        if hasattr(signal, 'SIGTERM'):
+            signal.signal(signal.SIGTERM, lambda *_: threading.Thread(
+                target=self.servidor.shutdown, daemon=True).start())
+        try:
+            self.servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.servidor.server_close()
+            for ruta in (self.direccion, ruta_token(self.direccion)):
+                if isinstance(ruta, str) and os.path.exists(ruta):
+                    os.remove(ruta)
+
+
+def preparar_socket(direccion) -> bool:
+    """
+    Deja libre la ruta del socket Unix. Si otro demonio responde en ella
+    devuelve False; si es un socket huérfano de una ejecución anterior, lo
+    borra.
+    """
+    if not isinstance(direccion, str):
+        return True
+    os.makedirs(os.path.dirname(os.path.abspath(direccion)), exist_ok=True)
+    if not os.path.exists(direccion):
+        return True
+    try:
+        with ClienteDaemon(direccion, timeout=2) as cliente:
+            cliente.llamar('ping')
+        return False
+    except OSError:
+        os.remove(direccion)
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Demonio local de metadata Oracle")
+    parser.add_argument('--socket', help="Ruta del socket Unix o host:puerto "
+                                         "(por defecto .cache/oracle/daemon.sock o $ORACLE_DAEMON)")
+    parser.add_argument('--concurrencia', type=int, default=None,
+                        help="Sesiones máximas del pool (por defecto pool_max)")
+    parser.add_argument('--sqlite', help="Servir el diccionario simulado de UTILS/oracle_sqlite.py "
+                                         "en lugar de Oracle (pruebas)")
+    parser.add_argument('--metrics', action='store_true', help="Activar las métricas (comando 'metricas')")
+    opciones = parser.parse_args()
+
+    direccion = parsear_direccion(opciones.socket)
+    if not preparar_socket(direccion):
+        print(f"ℹ️  Ya hay un demonio escuchando en {direccion}")
+        sys.exit(1)
+
+    metricas.activas = opciones.metrics
+
+    if opciones.sqlite:
+        from UTILS.oracle_sqlite import conectar_sqlite
+        resultado = conectar_sqlite(oracle_conn, opciones.sqlite)
+    else:
+        # Un hilo por conexión de cliente: el pool evita serializarlos
+        config = oracle_conn.config or oracle_conn.cargar_configuracion()
+        if config:
+            config['usar_pool'] = True
+            if opciones.concurrencia:
+                config['pool_max'] = opciones.concurrencia
+        resultado = conectar_oracle("")
+    print(resultado)
+    if "❌" in resultado:
+        sys.exit(1)
+
+    servidor = ServidorMetadata(direccion)
+    print(f"🛰️  Demonio de metadata escuchando en {direccion} (pid {os.getpid()})")
+    servidor.servir()
+    print(oracle_conn.cerrar())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 """
 Uso directo de las herramientas de Oracle (SIN LLM - MUY RÁPIDO)
 Este script te permite usar todas las funcionalidades sin esperar al agente LLM.
+Uso:
+    py SCRIPTS/oracle_directo.py [--metrics json|prometheus]
+Con --metrics se miden las herramientas (opción 9 del menú) y las métricas se
+escriben en stderr al salir.
 """
 
 import sys
@@ -21,10 +25,15 @@ from AGENTS.agente_oracle import (
     obtener_indices,
     generar_diagrama_er,
     consultar_metadata,
+    lineas_consulta,
+    resumen_sentencias,
+    cache_consultas,
+    metricas,
+    FORMATOS_METRICAS,
     oracle_conn
 )
 
-def menu():
+def menu(formato_metricas=None):
     """Menú interactivo para usar las herramientas de Oracle."""
 
     print("=" * 70)
@@ -53,6 +62,11 @@ def menu():
         print("5. Generar diagrama ER")
         print("6. Consultar metadata (vistas, secuencias, etc.)")
         print("7. Listar tablas por esquema")
+        print("8. Estadísticas de sentencias (statement cache)")
+        if formato_metricas:
+            print("9. Métricas de herramientas y consultas")
+        print("10. Vaciar la caché de resultados")
+        print("11. Consulta SQL libre (SELECT, con límite de filas y tiempo)")
         print("0. Salir")
         print("=" * 70)
 
@@ -118,13 +132,43 @@ def menu():
             else:
                 print(resultado)
 
+        elif opcion == "8":
+            print("\n" + "-" * 70)
+            print(resumen_sentencias())
+
+        elif opcion == "9" and formato_metricas:
+            print("\n" + "-" * 70)
+            print(metricas.exportar(formato_metricas))
+
+        elif opcion == "10":
+            print(f"\n✅ Caché vaciada ({cache_consultas.invalidar()} resultados descartados)")
+
+        elif opcion == "11":
+            sql = input("\nConsulta SELECT (Ctrl+C la cancela): ").strip()
+            if sql:
+                print("\n" + "-" * 70)
+                try:
+                    for linea in lineas_consulta(sql):
+                        print(linea, end="")
+                except KeyboardInterrupt:
+                    print("\n⛔ Consulta cancelada")
+
         else:
             print("\n❌ Opción inválida")
 
 
 def main():
+    formato_metricas = None
+    if '--metrics' in sys.argv:
+        posicion = sys.argv.index('--metrics')
+        formato_metricas = (sys.argv[posicion + 1] if posicion + 1 < len(sys.argv) else 'json').lower()
+        if formato_metricas not in FORMATOS_METRICAS:
+            print(f"Formato de métricas no soportado. Opciones: {', '.join(FORMATOS_METRICAS)}")
+            sys.exit(1)
+        metricas.activas = True
+
     try:
-        menu()
+        menu(formato_metricas)
     except KeyboardInterrupt:
         print("\n\n⚠️  Interrumpido por el usuario")
         oracle_conn.cerrar()
@@ -134,6 +178,9 @@ def main():
         traceback.print_exc()
         oracle_conn.cerrar()
 
+    if formato_metricas:
+        print(metricas.exportar(formato_metricas), file=sys.stderr)
+
 
 if __name__ == "__main__":
     main()
@@ -5,15 +5,57 @@ Uso:
     py SCRIPTS/oracle_functions.py [comando] [argumento_opcional]
 Ejemplos:
     py SCRIPTS/oracle_functions.py listar_tablas
+    py SCRIPTS/oracle_functions.py listar_tablas "CLI%"
+    py SCRIPTS/oracle_functions.py listar_tablas_todos "VENTAS.PED%"
     py SCRIPTS/oracle_functions.py describir_tabla CLIENTES
+    py SCRIPTS/oracle_functions.py describir_tabla "CLIENTES,PEDIDOS"
+    py SCRIPTS/oracle_functions.py describir_tabla "CLI%"
     py SCRIPTS/oracle_functions.py obtener_relaciones
     py SCRIPTS/oracle_functions.py obtener_indices CLIENTES
     py SCRIPTS/oracle_functions.py generar_diagrama_er
     py SCRIPTS/oracle_functions.py consultar_metadata vistas
+    py SCRIPTS/oracle_functions.py refrescar_snapshot
+    py SCRIPTS/oracle_functions.py buscar_objetos "usuarios, clientes"
+    py SCRIPTS/oracle_functions.py tablas_importantes "5 entrantes"
+    py SCRIPTS/oracle_functions.py estado_conexion
+    py SCRIPTS/oracle_functions.py perfilar_columnas "CLIENTES filas=20000"
+    py SCRIPTS/oracle_functions.py consulta_sql "SELECT estado, COUNT(*) FROM pedidos GROUP BY estado"
+    py SCRIPTS/oracle_functions.py obtener_codigo "V_CLIENTES, PKG_FACTURAS%"
+    py SCRIPTS/oracle_functions.py exportar_diccionario OUTPUT/diccionario
+    py SCRIPTS/oracle_functions.py rastrear_esquemas --concurrencia 8
+    py SCRIPTS/oracle_functions.py rastrear_esquemas "VENTAS,COMPRAS" --salida OUTPUT/rastreo
+    py SCRIPTS/oracle_functions.py describir_tabla "CLI%" --formato json
+    py SCRIPTS/oracle_functions.py describir_tabla "CLI%" --metrics prometheus
+    py SCRIPTS/oracle_functions.py lote comandos.txt --concurrencia 4 > resultados.ndjson
+
+Modo lote: "lote [fichero]" lee un comando por línea (del fichero o, sin él
+o con "-", de stdin), con la misma sintaxis que la línea de comandos:
+    describir_tabla "CLIENTES,PEDIDOS"
+    tablas_importantes 5
+    # las líneas vacías y las que empiezan por # se ignoran
+Todos los comandos comparten una conexión (un pool si --concurrencia > 1) y
+cada resultado se escribe en stdout como una línea JSON (NDJSON) según
+termina, con su número de línea. El código de salida es 1 si alguno falla.
+
+Opciones:
+    --formato texto|markdown|json|csv   Formato de salida (json y csv solo
+                                        escriben datos; los mensajes van a stderr)
+    --concurrencia N                    rastrear_esquemas: esquemas en paralelo;
+                                        lote: comandos en paralelo (con N > 1
+                                        activa el pool con pool_max >= N)
+    --salida DIR                        rastrear_esquemas: un JSON por esquema
+    --metrics json|prometheus           Al terminar escribe en stderr las métricas
+                                        por herramienta y consulta (latencia,
+                                        tiempo de BD, filas, bytes, round trips)
+    --metrics-fichero RUTA              Escribe las métricas en RUTA en vez de stderr
 """
 
 import sys
 import os
+import json
+import shlex
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, PROJECT_ROOT)
@@ -26,70 +68,326 @@ from AGENTS.agente_oracle import (
     obtener_indices,
     generar_diagrama_er,
     consultar_metadata,
+    exportar_diccionario,
+    buscar_objetos,
+    tablas_importantes,
+    estado_conexion,
+    perfilar_columnas,
+    lineas_consulta,
+    lineas_codigo,
+    rastrear_esquemas,
+    lineas_rastreo,
+    obtener_snapshot,
+    filas_de,
+    lineas_tablas,
+    lineas_relaciones,
+    lineas_metadata,
+    parsear_filtro_tablas,
+    paginar_tablas,
+    query_tablas,
+    PREFIJO_CONTINUACION,
+    FORMATOS_SALIDA,
+    FORMATOS_MAQUINA,
+    FORMATOS_METRICAS,
+    metricas,
+    ejecutar_herramienta,
+    QUERIES_METADATA,
     oracle_conn
 )
 
+
+def imprimir_stream(resultado, titulo, formateador, formato='texto'):
+    """
+    Imprime un resultado de iterar_query según van llegando los lotes,
+    sin materializar todas las filas en memoria.
+    Returns:
+        Número de filas impresas
+    """
+    if isinstance(resultado, str):
+        print(resultado, file=sys.stderr if formato in FORMATOS_MAQUINA else sys.stdout)
+        return 0
+
+    total = 0
+
+    def contar(filas):
+        nonlocal total
+        for fila in filas:
+            total += 1
+            yield fila
+
+    if formato in FORMATOS_MAQUINA:
+        for linea in formateador(contar(filas_de(resultado)), formato):
+            print(linea, end="")
+        return total
+
+    print(titulo)
+    for linea in formateador(contar(filas_de(resultado)), formato):
+        print(linea, end="")
+    print(f"\nTotal: {total} filas")
+    return total
+
+
+def extraer_opcion(args, nombre):
+    """Quita "--nombre valor" de args y devuelve el valor (None si no está)."""
+    if nombre not in args:
+        return None
+    posicion = args.index(nombre)
+    valor = args[posicion + 1] if posicion + 1 < len(args) else ''
+    del args[posicion:posicion + 2]
+    return valor
+
+
+def guardar_rastreo(rastreo, directorio):
+    """Escribe un JSON por esquema con las filas de cada vista rastreada."""
+    os.makedirs(directorio, exist_ok=True)
+    for owner, datos in rastreo['esquemas'].items():
+        contenido = {
+            vista: {'columns': resultado['columns'], 'rows': resultado['rows']}
+            for vista, resultado in datos.items() if vista != 'segundos'
+        }
+        with open(os.path.join(directorio, f"{owner}.json"), 'w', encoding='utf-8') as f:
+            json.dump(contenido, f, ensure_ascii=False, default=str)
+
+
+def guardar_metricas(formato, fichero=None):
+    """Escribe las métricas en el fichero indicado o, si no hay, en stderr."""
+    contenido = metricas.exportar(formato)
+    if fichero:
+        with open(fichero, 'w', encoding='utf-8') as f:
+            f.write(contenido)
+        print(f"📈 Métricas guardadas en {fichero}", file=sys.stderr)
+    else:
+        print(contenido, file=sys.stderr)
+
+
+def leer_lote(origen):
+    """
+    Lee los comandos de un lote.
+    Returns:
+        Lista de (número de línea, comando, argumento)
+    """
+    if origen in ("", "-"):
+        lineas = sys.stdin.read().splitlines()
+    else:
+        with open(origen, encoding='utf-8') as f:
+            lineas = f.read().splitlines()
+
+    comandos = []
+    for numero, linea in enumerate(lineas, 1):
+        if not linea.strip() or linea.lstrip().startswith('#'):
+            continue
+        partes = shlex.split(linea)
+        comandos.append((numero, partes[0].lower(), " ".join(partes[1:])))
+    return comandos
+
+
+def ejecutar_linea(numero, comando, argumento, formato):
+    """Ejecuta un comando del lote y devuelve su registro NDJSON."""
+    return {'linea': numero, **ejecutar_herramienta(comando, argumento, formato)}
+
+
+def ejecutar_lote(comandos, formato, concurrencia):
+    """
+    Ejecuta los comandos del lote (en paralelo si concurrencia > 1) e
+    imprime cada resultado como una línea JSON en cuanto termina.
+    Returns:
+        Número de comandos fallidos
+    """
+    fallidos = 0
+    with ThreadPoolExecutor(max_workers=concurrencia) as ejecutor:
+        tareas = [ejecutor.submit(ejecutar_linea, numero, comando, argumento, formato)
+                  for numero, comando, argumento in comandos]
+        for tarea in as_completed(tareas):
+            registro = tarea.result()
+            fallidos += not registro['ok']
+            print(json.dumps(registro, ensure_ascii=False, default=str), flush=True)
+    return fallidos
+
+
 def main():
     if len(sys.argv) < 2:
         print("Uso: py SCRIPTS/oracle_functions.py [comando] [argumento_opcional]")
-        print("Comandos disponibles: listar_tablas, listar_tablas_todos, describir_tabla <tabla>, obtener_relaciones [tabla], obtener_indices <tabla>, generar_diagrama_er [tablas], consultar_metadata <tipo>")
+        print("Comandos disponibles: listar_tablas [patrón%], listar_tablas_todos [esquema.patrón%|continuar:...], describir_tabla <tabla[,tabla...]|patrón%>, obtener_relaciones [tabla], obtener_indices <tabla>, generar_diagrama_er [tablas], consultar_metadata <tipo> [patrón%], refrescar_snapshot, buscar_objetos <términos>, tablas_importantes [N] [pagerank|entrantes|salientes] [patrón%], estado_conexion, perfilar_columnas <tabla> [filas=N], consulta_sql <SELECT>, obtener_codigo <objeto[,objeto...]|patrón%>, exportar_diccionario [directorio], rastrear_esquemas [esquema,...], lote [fichero|-]")
+        sys.exit(1)
+
+    args = sys.argv[1:]
+    formato = extraer_opcion(args, '--formato')
+    # El modo lote devuelve JSON por defecto, embebido en cada línea NDJSON
+    formato = (formato or ('json' if args[0].lower() == 'lote' else 'texto')).lower()
+    if formato not in FORMATOS_SALIDA:
+        print(f"Formato no soportado. Opciones: {', '.join(FORMATOS_SALIDA)}")
         sys.exit(1)
+    concurrencia = extraer_opcion(args, '--concurrencia')
+    salida = extraer_opcion(args, '--salida')
+    formato_metricas = extraer_opcion(args, '--metrics')
+    fichero_metricas = extraer_opcion(args, '--metrics-fichero')
+    if fichero_metricas and not formato_metricas:
+        formato_metricas = 'prometheus' if fichero_metricas.endswith('.prom') else 'json'
+    if formato_metricas is not None:
+        formato_metricas = formato_metricas.lower() or 'json'
+        if formato_metricas not in FORMATOS_METRICAS:
+            print(f"Formato de métricas no soportado. Opciones: {', '.join(FORMATOS_METRICAS)}")
+            sys.exit(1)
+        metricas.activas = True
 
-    comando = sys.argv[1].lower()
-    argumento = sys.argv[2] if len(sys.argv) > 2 else ""
+    comando = args[0].lower()
+    argumento = args[1] if len(args) > 1 else ""
 
-    print("Conectando a Oracle...")
+    # Con salida para máquinas (o NDJSON del modo lote), los mensajes de
+    # estado van a stderr
+    estado = sys.stderr if formato in FORMATOS_MAQUINA or comando == "lote" else sys.stdout
+
+    if comando == "lote":
+        try:
+            comandos = leer_lote(argumento)
+        except (OSError, ValueError) as e:
+            print(f"❌ No se pudo leer el lote: {e}", file=estado)
+            sys.exit(1)
+        concurrencia = max(1, int(concurrencia)) if concurrencia else 1
+    if comando in ("lote", "rastrear_esquemas"):
+        config = oracle_conn.config or oracle_conn.cargar_configuracion()
+        paralelos = int(concurrencia or (config or {}).get('concurrencia_rastreo') or 1)
+        if config and paralelos > 1:
+            # Una sesión del pool por comando (o esquema) en paralelo
+            config['usar_pool'] = True
+            config['pool_max'] = max(config.get('pool_max', 4), paralelos)
+
+    print("Conectando a Oracle...", file=estado)
     resultado = conectar_oracle("")
-    print(resultado)
+    print(resultado, file=estado)
     if "❌" in resultado:
         sys.exit(1)
 
     if comando == "listar_tablas":
-        print(listar_tablas(argumento))
+        if obtener_snapshot() or argumento.startswith(PREFIJO_CONTINUACION):
+            print(listar_tablas(argumento, formato))
+        else:
+            # Listado completo con el filtro aplicado en el servidor, por lotes
+            variantes, binds = query_tablas(parsear_filtro_tablas(argumento), paginada=False)
+            resultado = oracle_conn.iterar_sentencia('listar_tablas', binds, **variantes)
+            imprimir_stream(resultado, "📊 Tablas:\n", lineas_tablas, formato)
     elif comando == "listar_tablas_todos":
-        # Consulta ALL_TABLES y agrupa por esquema
-        query = """
-            SELECT owner, table_name
-            FROM all_tables
-            WHERE owner NOT IN ('SYS', 'SYSTEM', 'MDSYS', 'XDB', 'CTXSYS')
-            ORDER BY owner, table_name
-        """
-        resultado = oracle_conn.ejecutar_query(query)
+        # Consulta ALL_TABLES de todos los esquemas, filtrada y paginada en el servidor
+        filtro = parsear_filtro_tablas(argumento, todos_los_esquemas=True)
+        resultado = filtro if isinstance(filtro, str) else paginar_tablas(filtro)
         if isinstance(resultado, dict):
-            print(f"\n📊 Tablas por esquema ({resultado['count']} tablas):")
-            print(f"{'Esquema':<20} {'Tabla'}")
-            print("-" * 70)
-            for row in resultado['rows'][:100]:  # Mostrar primeras 100
-                owner, table_name = row
-                print(f"{owner:<20} {table_name}")
-            if resultado['count'] > 100:
-                print(f"\n... y {resultado['count'] - 100} tablas más")
+            print(f"\n📊 Tablas por esquema ({resultado['total']} tablas):", file=estado)
+            print("".join(lineas_tablas(resultado['rows'], formato)))
+            if resultado['siguiente']:
+                print(f"➡️  Siguiente página: py SCRIPTS/oracle_functions.py listar_tablas_todos {resultado['siguiente']}",
+                      file=estado)
         else:
-            print(resultado)
+            print(resultado, file=estado)
     elif comando == "describir_tabla":
         if not argumento:
             print("Debes indicar el nombre de la tabla.")
         else:
-            print(describir_tabla(argumento))
+            print(describir_tabla(argumento, formato))
     elif comando == "obtener_relaciones":
-        print(obtener_relaciones(argumento))
+        if argumento or obtener_snapshot():
+            print(obtener_relaciones(argumento, formato))
+        else:
+            resultado = oracle_conn.iterar_sentencia('relaciones', filtro="")
+            imprimir_stream(resultado, "🔗 Relaciones:\n", lineas_relaciones, formato)
     elif comando == "obtener_indices":
         if not argumento:
             print("Debes indicar el nombre de la tabla.")
         else:
-            print(obtener_indices(argumento))
+            print(obtener_indices(argumento, formato))
     elif comando == "generar_diagrama_er":
         print(generar_diagrama_er(argumento))
     elif comando == "consultar_metadata":
         if not argumento:
             print("Debes indicar el tipo (vistas, secuencias, triggers, procedimientos).")
+        elif argumento.strip().lower() in QUERIES_METADATA:
+            tipo = argumento.strip().lower()
+            resultado = oracle_conn.iterar_sentencia(f'metadata_{tipo}')
+            if isinstance(resultado, dict):
+                imprimir_stream(resultado, f"📋 {tipo.upper()}:\n",
+                                lambda filas, fmt: lineas_metadata(resultado['columns'], filas, fmt), formato)
+            else:
+                print(resultado, file=estado)
+        else:
+            print(consultar_metadata(argumento, formato))
+    elif comando == "refrescar_snapshot":
+        if not oracle_conn.config.get('usar_snapshot'):
+            print("ℹ️  El snapshot está desactivado ('usar_snapshot' en UTILS/config_oracle.py).")
+        elif obtener_snapshot(forzar_refresco=True):
+            print("✅ Snapshot del esquema actualizado")
+        else:
+            print("❌ No se pudo actualizar el snapshot")
+    elif comando == "buscar_objetos":
+        if not argumento:
+            print("Debes indicar uno o varios términos a buscar.")
+        else:
+            print(buscar_objetos(argumento, formato))
+    elif comando == "tablas_importantes":
+        print(tablas_importantes(argumento, formato))
+    elif comando == "estado_conexion":
+        print(estado_conexion(argumento, formato))
+    elif comando == "consulta_sql":
+        if not argumento:
+            print("Debes indicar la consulta SELECT.")
+        else:
+            # Las filas se imprimen según llegan; Ctrl+C cancela la consulta
+            # en el servidor
+            try:
+                for linea in lineas_consulta(argumento, formato):
+                    print(linea, end="")
+            except KeyboardInterrupt:
+                print("\n⛔ Consulta cancelada", file=estado)
+    elif comando == "obtener_codigo":
+        if not argumento:
+            print("Debes indicar la vista u objeto PL/SQL.")
+        else:
+            # Un paquete de miles de líneas se imprime según llegan los lotes
+            for linea in lineas_codigo(argumento, formato):
+                print(linea, end="")
+    elif comando == "perfilar_columnas":
+        if not argumento:
+            print("Debes indicar el nombre de la tabla.")
         else:
-            print(consultar_metadata(argumento))
+            print(perfilar_columnas(argumento, formato))
+    elif comando == "exportar_diccionario":
+        print(exportar_diccionario(argumento))
+    elif comando == "rastrear_esquemas":
+        esquemas = [e.strip() for e in argumento.split(',') if e.strip()]
+
+        def progreso(owner, datos, hechos, total):
+            if isinstance(datos, str):
+                print(f"  [{hechos}/{total}] ❌ {owner}: {datos}", file=estado)
+            else:
+                print(f"  [{hechos}/{total}] ✅ {owner}: {datos['tablas']['count']} tablas, "
+                      f"{datos['columnas']['count']} columnas ({datos['segundos']:.1f}s)", file=estado)
+
+        rastreo = rastrear_esquemas(esquemas, int(concurrencia) if concurrencia else None, progreso)
+        if isinstance(rastreo, str):
+            print(rastreo, file=estado)
+        else:
+            if rastreo['concurrencia'] < rastreo['concurrencia_pedida']:
+                print(f"⚠️  Concurrencia reducida de {rastreo['concurrencia_pedida']} a "
+                      f"{rastreo['concurrencia']} (sesiones disponibles)", file=estado)
+            print(f"\n🕸️  {len(rastreo['esquemas'])} esquemas rastreados en {rastreo['segundos']:.1f}s "
+                  f"({rastreo['concurrencia']} en paralelo):\n", file=estado)
+            print("".join(lineas_rastreo(rastreo, formato)))
+            if salida:
+                guardar_rastreo(rastreo, salida)
+                print(f"💾 Resultados guardados en {salida}", file=estado)
+    elif comando == "lote":
+        inicio = time.perf_counter()
+        fallidos = ejecutar_lote(comandos, formato, concurrencia)
+        print(f"📦 {len(comandos)} comandos en {time.perf_counter() - inicio:.1f}s "
+              f"({concurrencia} en paralelo), {fallidos} con error", file=estado)
     else:
         print(f"Comando no reconocido: {comando}")
 
-    print("Cerrando conexión...")
-    print(oracle_conn.cerrar())
+    if formato_metricas:
+        guardar_metricas(formato_metricas, fichero_metricas)
+
+    print("Cerrando conexión...", file=estado)
+    print(oracle_conn.cerrar(), file=estado)
+    if comando == "lote" and fallidos:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
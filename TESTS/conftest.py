@@ -0,0 +1,46 @@
+"""
+Fixtures comunes: las pruebas corren sobre el diccionario simulado de
+UTILS/oracle_sqlite.py, sin Oracle.
+"""
+
+import os
+import shutil
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+import AGENTS.agente_oracle as agente
+from UTILS.oracle_sqlite import generar_esquema, conectar_sqlite
+
+
+@pytest.fixture(scope='session')
+def esquema(tmp_path_factory):
+    """Diccionario sintético de 300 tablas, generado una vez por sesión."""
+    return generar_esquema(str(tmp_path_factory.mktemp('esquema') / 'esquema.sqlite'), 300)
+
+
+@pytest.fixture
+def conectar(esquema, tmp_path):
+    """
+    Conecta oracle_conn a una copia del diccionario (las pruebas pueden
+    modificarla) con las claves de ORACLE_CONFIG indicadas. Devuelve la
+    ConexionSQLite, que cuenta ejecuciones, round trips y filas.
+    """
+    def conectar(**config):
+        copia = tmp_path / 'diccionario.sqlite'
+        if not copia.exists():
+            shutil.copy(esquema, copia)
+        config.setdefault('snapshot_dir', str(tmp_path / 'snapshot'))
+        conectar_sqlite(agente.oracle_conn, str(copia), **config)
+        agente._snapshot = None
+        agente._grafo_fk = None
+        return agente.oracle_conn.connection
+
+    yield conectar
+    agente.oracle_conn.cerrar()
+    agente.oracle_conn.config = None
+    agente._snapshot = None
+    agente._grafo_fk = None
@@ -0,0 +1,108 @@
+"""
+OracleConnection sobre el diccionario simulado: liberación de la sesión
+de iterar_query.
+"""
+
+import gc
+
+import AGENTS.agente_oracle as agente
+from UTILS.oracle_sqlite import CursorSQLite
+
+QUERY = "SELECT table_name FROM user_tables ORDER BY table_name"
+
+
+class PoolDePrueba:
+    """Pool de una sesión que anota cada release y drop."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.adquiridas = 0
+        self.liberadas = 0
+
+    def acquire(self):
+        self.adquiridas += 1
+        return self.connection
+
+    def release(self, connection):
+        self.liberadas += 1
+
+    def drop(self, connection):
+        self.liberadas += 1
+
+    def close(self, force=False):
+        self.connection.close()
+
+
+def _con_pool(conexion):
+    pool = PoolDePrueba(conexion)
+    agente.oracle_conn.pool = pool
+    agente.oracle_conn.connection = None
+    return pool
+
+
+def test_cerrar_lotes_sin_empezar_libera_la_sesion(conectar):
+    pool = _con_pool(conectar())
+    lotes = agente.oracle_conn.iterar_query(QUERY, arraysize=50)['lotes']
+    assert (pool.adquiridas, pool.liberadas) == (1, 0)
+    lotes.close()
+    assert pool.liberadas == 1
+    assert not agente.oracle_conn._en_curso
+    assert next(lotes, None) is None
+
+
+def test_descartar_lotes_sin_empezar_libera_la_sesion(conectar):
+    pool = _con_pool(conectar())
+    agente.oracle_conn.iterar_query(QUERY, arraysize=50)
+    gc.collect()
+    assert pool.liberadas == 1
+    assert not agente.oracle_conn._en_curso
+
+
+def test_lotes_agotados_liberan_la_sesion(conectar):
+    conexion = conectar()
+    pool = _con_pool(conexion)
+    lotes = agente.oracle_conn.iterar_query(QUERY, arraysize=50)['lotes']
+    assert sum(len(lote) for lote in lotes) == 300
+    assert pool.liberadas == 1
+
+
+def test_timeout_restaurado_al_cerrar_sin_empezar(conectar):
+    conexion = conectar()
+    lotes = agente.oracle_conn.iterar_query(QUERY, arraysize=50, timeout=5)['lotes']
+    lotes.close()
+    assert getattr(conexion, 'call_timeout', 0) == 0
+    assert not agente.oracle_conn._en_curso
+
+
+def test_lotes_sin_empezar_registran_la_consulta(conectar):
+    conectar()
+    agente.metricas.reiniciar()
+    agente.metricas.activas = True
+    try:
+        agente.oracle_conn.iterar_query(QUERY, arraysize=50, nombre='sin_empezar')['lotes'].close()
+        consulta = agente.metricas.a_dict()['consultas']['sin_empezar']
+    finally:
+        agente.metricas.activas = False
+        agente.metricas.reiniciar()
+    assert (consulta['llamadas'], consulta['filas']) == (1, 0)
+
+
+def test_timeout_solo_durante_cada_round_trip(conectar, monkeypatch):
+    conexion = conectar()
+    durante = []
+    for metodo in ('execute', 'fetchmany'):
+        original = getattr(CursorSQLite, metodo)
+
+        def anotar(cursor, *args, _original=original, **kwargs):
+            durante.append(getattr(cursor.conexion, 'call_timeout', 0))
+            return _original(cursor, *args, **kwargs)
+
+        monkeypatch.setattr(CursorSQLite, metodo, anotar)
+
+    lotes = agente.oracle_conn.iterar_query(QUERY, arraysize=50, timeout=5)['lotes']
+    # Entre lotes la conexión compartida no conserva el timeout de la consulta
+    assert getattr(conexion, 'call_timeout', 0) == 0
+    next(lotes)
+    assert getattr(conexion, 'call_timeout', 0) == 0
+    lotes.close()
+    assert durante == [5000, 5000]
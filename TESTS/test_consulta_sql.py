@@ -0,0 +1,48 @@
+"""ConsultaSQL sobre el diccionario simulado."""
+
+import pytest
+
+from AGENTS.agente_oracle import consulta_sql, preparar_consulta
+from UTILS.oracle_sqlite import traducir_sql
+
+
+@pytest.mark.parametrize('oracle, sqlite', [
+    ("SELECT x FROM t FETCH FIRST :n ROWS ONLY", "SELECT x FROM t LIMIT :n"),
+    ("SELECT x FROM t FETCH FIRST 5 ROWS ONLY", "SELECT x FROM t LIMIT 5"),
+    ("SELECT x FROM t FETCH NEXT 1 ROW ONLY", "SELECT x FROM t LIMIT 1"),
+    ("SELECT x FROM t OFFSET :o ROWS FETCH NEXT :n ROWS ONLY", "SELECT x FROM t LIMIT :n OFFSET :o"),
+    ("SELECT x FROM t OFFSET 2 ROWS FETCH NEXT 3 ROWS ONLY", "SELECT x FROM t LIMIT 3 OFFSET 2"),
+    ("SELECT x FROM t OFFSET 10 ROWS", "SELECT x FROM t LIMIT -1 OFFSET 10"),
+])
+def test_traduccion_de_paginacion(oracle, sqlite):
+    assert traducir_sql(oracle) == sqlite
+
+
+def _nombres(conexion, desde, cuantas):
+    return [fila[0] for fila in conexion.db.execute(
+        "SELECT table_name FROM user_tables ORDER BY table_name LIMIT ? OFFSET ?", (cuantas, desde))]
+
+
+def test_consulta_con_offset_y_fetch_propios(conectar):
+    conexion = conectar()
+    query = "SELECT table_name FROM user_tables ORDER BY table_name OFFSET 2 ROWS FETCH NEXT 3 ROWS ONLY"
+    assert preparar_consulta(query, 100)[0].startswith("SELECT * FROM (\n")
+    salida = consulta_sql(query, formato='csv')
+    assert salida.split() == ['TABLE_NAME'] + _nombres(conexion, 2, 3)
+
+
+def test_consulta_solo_con_offset(conectar):
+    conexion = conectar()
+    salida = consulta_sql("SELECT table_name FROM user_tables ORDER BY table_name OFFSET 295 ROWS", formato='csv')
+    assert salida.split() == ['TABLE_NAME'] + _nombres(conexion, 295, 5)
+
+
+def test_consulta_limitada_a_filas_consulta(conectar):
+    conectar(filas_consulta=10)
+    salida = consulta_sql("SELECT table_name FROM user_tables")
+    assert "⚠️  Mostradas las primeras 10 filas; hay más." in salida
+
+
+def test_consulta_de_modificacion_rechazada(conectar):
+    conectar()
+    assert consulta_sql("DELETE FROM user_tables").startswith("🚫")
@@ -0,0 +1,234 @@
+"""
+Herramientas sobre el diccionario simulado: paginación, resúmenes por
+presupuesto de tokens, caché de resultados y round trips de las cargas
+masivas.
+"""
+
+import json
+import math
+import re
+
+import pytest
+
+import AGENTS.agente_oracle as agente
+from AGENTS.agente_oracle import (
+    PREFIJO_CONTINUACION, cache_consultas, describir_tabla, estimar_tokens, generar_diagrama_er,
+    listar_tablas, obtener_codigo, paginar_tablas, parsear_filtro_tablas, token_continuacion,
+    consultar_metadata, obtener_relaciones
+)
+
+
+def _todas_las_tablas(conexion):
+    return [fila[0] for fila in conexion.db.execute("SELECT table_name FROM user_tables ORDER BY table_name")]
+
+
+def _tabla_con_fks(conexion):
+    return conexion.db.execute(
+        "SELECT table_name FROM user_constraints WHERE constraint_type = 'R' ORDER BY table_name"
+    ).fetchone()[0]
+
+
+# ----------------------------------------------------------------------------
+# Token de continuación
+# ----------------------------------------------------------------------------
+
+def test_token_de_continuacion_recorre_todas_las_paginas(conectar):
+    conexion = conectar(tamano_pagina=70)
+    nombres, entrada, paginas = [], "", 0
+    while entrada is not None:
+        pagina = paginar_tablas(parsear_filtro_tablas(entrada))
+        nombres += [fila[0] for fila in pagina['rows']]
+        entrada = pagina['siguiente']
+        paginas += 1
+    assert nombres == _todas_las_tablas(conexion)
+    assert paginas == math.ceil(len(nombres) / 70)
+
+
+def test_token_de_continuacion_en_la_salida(conectar):
+    conectar(tamano_pagina=50)
+    primera = listar_tablas("")
+    token = re.search(r"(continuar:\S+)", primera).group(1)
+    assert parsear_filtro_tablas(token) == {'p': '%', 'o': None, 't': False, 'n': 50}
+    assert "(mostrando 51-100)" in listar_tablas(token)
+
+
+@pytest.mark.parametrize('decodificado', [
+    "no-es-base64!", {}, [], ["%", None, False, 0], {'p': '%', 'o': None, 't': False},
+    {'p': '%', 'o': None, 't': False, 'n': -100}, {'p': '%', 'o': None, 't': False, 'n': '100'},
+    {'p': 5, 'o': None, 't': False, 'n': 0}, {'p': '%', 'o': None, 't': False, 'n': 0, 'x': 1},
+])
+def test_token_de_continuacion_no_valido(conectar, decodificado):
+    conectar()
+    entrada = (decodificado if isinstance(decodificado, str)
+               else token_continuacion(decodificado)[len(PREFIJO_CONTINUACION):])
+    assert listar_tablas(f"continuar:{entrada}").startswith("❌ Token de continuación no válido")
+
+
+def test_formatos_para_maquinas_no_se_paginan(conectar):
+    conexion = conectar(tamano_pagina=50)
+    tablas = _todas_las_tablas(conexion)
+    respuesta = agente.ejecutar_herramienta('listar_tablas', '', 'json')
+    assert [fila['TABLE_NAME'] for fila in respuesta['datos']] == tablas
+    csv = listar_tablas("", 'csv').splitlines()
+    assert [linea.split(',')[0] for linea in csv] == ['TABLE_NAME'] + tablas
+    token = token_continuacion({'p': '%', 'o': None, 't': False, 'n': 250})
+    assert [fila['TABLE_NAME'] for fila in json.loads(listar_tablas(token, 'json'))] == tablas[250:]
+
+
+# ----------------------------------------------------------------------------
+# Resúmenes por presupuesto de tokens
+# ----------------------------------------------------------------------------
+
+def test_resumenes_caben_en_el_presupuesto(conectar):
+    conectar()
+    casos = [
+        (listar_tablas, "", "📊 300 tablas"),
+        (describir_tabla, "%", "🔍 300 tablas"),
+        (obtener_relaciones, "", "🔗 "),
+        (consultar_metadata, "vistas", "📋 30 vistas"),
+    ]
+    for herramienta, entrada, cabecera in casos:
+        completa = herramienta(entrada)
+        resumen = herramienta(entrada, presupuesto=200)
+        assert estimar_tokens(completa) > 200
+        assert resumen.startswith(cabecera)
+        assert "resumen" in resumen
+        assert estimar_tokens(resumen) <= 200
+
+
+def test_sin_presupuesto_no_se_resume(conectar):
+    conectar()
+    assert "resumen" not in describir_tabla("%")
+
+
+# ----------------------------------------------------------------------------
+# Caché de resultados
+# ----------------------------------------------------------------------------
+
+def test_cache_responde_sin_ir_a_oracle(conectar):
+    conexion = conectar()
+    tabla = _todas_las_tablas(conexion)[0]
+    describir_tabla(tabla)
+    conexion.reiniciar_contadores()
+    assert describir_tabla(tabla) and conexion.ejecuciones == 0
+    assert cache_consultas.estadisticas()['aciertos'] >= 1
+
+
+def test_cache_caduca_con_el_ttl(conectar):
+    conexion = conectar(ttl_cache_consultas=0)
+    tabla = _todas_las_tablas(conexion)[0]
+    describir_tabla(tabla)
+    conexion.reiniciar_contadores()
+    describir_tabla(tabla)
+    assert conexion.ejecuciones == 1
+    assert cache_consultas.estadisticas()['caducadas'] >= 1
+
+
+def test_cache_desactivada(conectar):
+    conexion = conectar(cache_consultas=0)
+    tabla = _todas_las_tablas(conexion)[0]
+    describir_tabla(tabla)
+    conexion.reiniciar_contadores()
+    describir_tabla(tabla)
+    assert conexion.ejecuciones == 1
+
+
+def test_invalidar_por_sentencia(conectar):
+    conexion = conectar()
+    tabla = _todas_las_tablas(conexion)[0]
+    describir_tabla(tabla)
+    consultar_metadata("vistas")
+    assert cache_consultas.invalidar('describir_tabla') == 1
+    conexion.reiniciar_contadores()
+    consultar_metadata("vistas")
+    assert conexion.ejecuciones == 0
+    describir_tabla(tabla)
+    assert conexion.ejecuciones == 1
+    assert cache_consultas.invalidar() >= 2
+
+
+# ----------------------------------------------------------------------------
+# Round trips de las cargas masivas
+# ----------------------------------------------------------------------------
+
+def test_obtener_codigo_no_hace_un_round_trip_por_objeto(conectar):
+    conexion = conectar()
+    objetos, lineas = conexion.db.execute("SELECT COUNT(DISTINCT name || type), COUNT(*) FROM user_source").fetchone()
+    vista = conexion.db.execute("SELECT view_name FROM user_views ORDER BY view_name").fetchone()[0]
+    conexion.reiniciar_contadores()
+    salida = obtener_codigo("%", formato='json')
+    assert salida.count('"TYPE": "VIEW"') > 0 and salida.count('"TYPE": "PACKAGE BODY"') > 0
+    # Una sentencia para las vistas y otra para user_source, leída por lotes
+    assert conexion.ejecuciones == 2
+    assert conexion.ida_y_vuelta <= 2 + math.ceil(lineas / agente.SENTENCIAS['codigo_fuente'].arraysize)
+    assert objetos > conexion.ida_y_vuelta
+
+    conexion.reiniciar_contadores()
+    assert obtener_codigo(vista).startswith(f"📜 VIEW {vista}:\nSELECT")
+    assert conexion.ejecuciones == 2 and conexion.ida_y_vuelta == 2
+
+
+def test_diagrama_con_columnas_en_una_sentencia(conectar):
+    conexion = conectar()
+    tabla = _tabla_con_fks(conexion)
+    conexion.reiniciar_contadores()
+    diagrama = generar_diagrama_er(tabla)
+    # Grafo de FKs y columnas de todas las entidades: dos sentencias
+    assert conexion.ejecuciones == 2
+    assert f"    {tabla} {{\n        NUMBER ID PK\n" in diagrama
+    assert re.search(r"^        \S+ ID_\S+ FK$", diagrama, re.M)
+
+    conexion.reiniciar_contadores()
+    generar_diagrama_er("")
+    assert conexion.ejecuciones == 1   # el grafo se reutiliza
+
+
+def test_diagrama_resumido_no_pide_columnas(conectar):
+    conexion = conectar()
+    conexion.reiniciar_contadores()
+    resumen = generar_diagrama_er("", presupuesto=300)
+    assert resumen.startswith("📈 El diagrama tiene")
+    assert conexion.ejecuciones == 1
+    assert conexion.filas == conexion.db.execute(
+        "SELECT COUNT(*) FROM user_cons_columns a JOIN user_constraints c "
+        "ON a.constraint_name = c.constraint_name WHERE c.constraint_type = 'R'").fetchone()[0]
+
+
+# ----------------------------------------------------------------------------
+# Rastreo de esquemas
+# ----------------------------------------------------------------------------
+
+def test_rastreo_informa_de_la_concurrencia_reducida(conectar):
+    conectar()
+    rastreo = agente.rastrear_esquemas(concurrencia=8)
+    assert rastreo['esquemas'] and not rastreo['errores']
+    assert (rastreo['concurrencia'], rastreo['concurrencia_pedida']) == (1, 8)
+
+
+
+def test_rastreo_suma_el_coste_de_sus_hilos(conectar):
+    conectar()
+    agente.metricas.reiniciar()
+    agente.metricas.activas = True
+    try:
+        agente.rastrear_esquemas()
+        series = agente.metricas.a_dict()
+    finally:
+        agente.metricas.activas = False
+        agente.metricas.reiniciar()
+    herramienta = series['herramientas']['rastrear_esquemas']
+    consultas = [serie for nombre, serie in series['consultas'].items() if nombre.startswith('rastreo_')]
+    for clave in ('filas', 'bytes', 'ida_y_vuelta'):
+        assert herramienta[clave] == sum(serie[clave] for serie in consultas) > 0
+
+# ----------------------------------------------------------------------------
+# Herramientas del agente
+# ----------------------------------------------------------------------------
+
+@pytest.mark.parametrize('usar_snapshot', [False, True])
+def test_buscar_objetos_solo_con_snapshot(conectar, usar_snapshot):
+    for modulo in ('langchain_core', 'langchain_community', 'langchain_classic'):
+        pytest.importorskip(modulo)
+    conectar(usar_snapshot=usar_snapshot)
+    nombres = [herramienta.name for herramienta in agente.crear_agente().tools]
+    assert ('BuscarObjetos' in nombres) is usar_snapshot
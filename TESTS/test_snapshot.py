@@ -0,0 +1,60 @@
+"""Refresco incremental del snapshot por LAST_DDL_TIME y uso sin Oracle."""
+
+from AGENTS.agente_oracle import generar_diagrama_er, obtener_snapshot, oracle_conn
+
+
+def _snapshot_caliente(conectar):
+    conexion = conectar(usar_snapshot=True)
+    snapshot = obtener_snapshot()
+    assert snapshot is not None
+    return conexion, snapshot
+
+
+def test_snapshot_fresco_no_consulta_oracle(conectar):
+    conexion, _ = _snapshot_caliente(conectar)
+    conexion.reiniciar_contadores()
+    assert obtener_snapshot() is not None
+    assert conexion.ejecuciones == 0
+
+
+def test_refresco_relee_solo_las_tablas_modificadas(conectar):
+    conexion, snapshot = _snapshot_caliente(conectar)
+    tabla, eliminada = [fila[0] for fila in conexion.db.execute(
+        "SELECT table_name FROM user_tables ORDER BY table_name LIMIT 2")]
+    indice = conexion.db.execute(
+        "SELECT index_name FROM user_indexes WHERE table_name NOT IN (?, ?) ORDER BY index_name",
+        (tabla, eliminada)).fetchone()[0]
+    con_indice = conexion.db.execute(
+        "SELECT table_name FROM user_indexes WHERE index_name = ?", (indice,)).fetchone()[0]
+
+    conexion.db.executescript(f"""
+        UPDATE all_objects SET last_ddl_time = '20991231000000'
+        WHERE object_name = '{tabla}' AND object_type = 'TABLE';
+        INSERT INTO all_tab_columns (owner, table_name, column_id, column_name, data_type, nullable)
+        VALUES ('BENCH', '{tabla}', 999, 'NUEVA', 'DATE', 'Y');
+        DELETE FROM all_objects WHERE object_name = '{eliminada}';
+        UPDATE all_objects SET last_ddl_time = '20991231000000'
+        WHERE object_name = '{indice}' AND object_type = 'INDEX';
+    """)
+
+    resumen = snapshot.refrescar(oracle_conn)
+    total = conexion.db.execute("SELECT COUNT(*) FROM user_objects WHERE object_type = 'TABLE'").fetchone()[0]
+    releidas = len({tabla, con_indice})
+    assert resumen == (f"✅ Snapshot actualizado: {releidas} tablas releídas, 1 eliminadas, "
+                       f"{total - releidas} sin cambios")
+    columnas = [fila[1] for fila in snapshot.columnas([tabla])['rows']]
+    assert columnas[-1] == 'NUEVA'
+    assert snapshot.columnas([eliminada]) is None
+
+    # Sin más cambios, el siguiente refresco no relee nada
+    assert snapshot.refrescar(oracle_conn).startswith("✅ Snapshot actualizado: 0 tablas releídas")
+
+
+def test_diagrama_con_snapshot_sin_conexion(conectar):
+    conexion, _ = _snapshot_caliente(conectar)
+    tabla = conexion.db.execute(
+        "SELECT table_name FROM user_constraints WHERE constraint_type = 'R' ORDER BY table_name").fetchone()[0]
+    oracle_conn.cerrar()
+    conexion_cerrada = generar_diagrama_er(tabla)
+    assert "❌" not in conexion_cerrada
+    assert f"    {tabla} {{\n        NUMBER ID PK\n" in conexion_cerrada
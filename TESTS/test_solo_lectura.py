@@ -0,0 +1,67 @@
+"""Veredictos del lexer de validar_solo_lectura."""
+
+import pytest
+
+from AGENTS.agente_oracle import validar_solo_lectura
+
+
+@pytest.mark.parametrize('query', [
+    "SELECT * FROM clientes",
+    "  select id from clientes where id = 1",
+    "WITH t AS (SELECT 1 AS x FROM dual) SELECT x FROM t",
+    "SELECT * FROM clientes;",
+    # Las palabras prohibidas dentro de literales, comentarios o
+    # identificadores entre comillas no cuentan
+    "SELECT 'DELETE FROM clientes' AS texto FROM dual",
+    "SELECT 'it''s; DROP TABLE x' FROM dual",
+    "SELECT id -- DROP TABLE clientes\nFROM clientes",
+    "SELECT /* UPDATE clientes SET x = 1; */ id FROM clientes",
+    'SELECT "DELETE" FROM clientes',
+    "SELECT q'[DROP TABLE x; ']' FROM dual",
+    "SELECT q'{a'b; INSERT}' FROM dual",
+    "SELECT nq'!TRUNCATE!' FROM dual",
+])
+def test_consultas_permitidas(query):
+    assert validar_solo_lectura(query) is None
+
+
+@pytest.mark.parametrize('query, comando', [
+    ("DELETE FROM clientes", 'DELETE'),
+    ("insert into clientes values (1)", 'INSERT'),
+    ("UPDATE clientes SET nombre = 'x'", 'UPDATE'),
+    ("MERGE INTO clientes USING dual ON (1 = 1) WHEN MATCHED THEN UPDATE SET x = 1", 'MERGE'),
+    ("SELECT * FROM clientes FOR UPDATE", 'UPDATE'),
+    ("WITH t AS (SELECT 1 FROM dual) DELETE FROM t", 'DELETE'),
+    ("SELECT 1 FROM dual; DROP TABLE x", None),
+])
+def test_modificaciones_prohibidas(query, comando):
+    error = validar_solo_lectura(query)
+    assert error is not None and error.startswith("🚫")
+    if comando:
+        assert f"'{comando}'" in error
+
+
+@pytest.mark.parametrize('query', [
+    "SELECT 1 FROM dual; SELECT 2 FROM dual",
+    "SELECT 1 FROM dual;; SELECT 2 FROM dual",
+    "SELECT 'a;b' FROM dual; SELECT 2 FROM dual",
+])
+def test_una_sola_sentencia(query):
+    assert validar_solo_lectura(query) == "🚫 PROHIBIDO: Solo se permite una sentencia por consulta."
+
+
+@pytest.mark.parametrize('query', [
+    "",
+    "-- solo un comentario",
+    "EXPLAIN PLAN FOR SELECT * FROM clientes",
+    "BEGIN NULL; END;",
+    "EXEC dbms_stats.gather_table_stats('X', 'Y')",
+])
+def test_solo_select_o_with(query):
+    assert validar_solo_lectura(query) == "🚫 PROHIBIDO: Solo se permiten consultas SELECT. Solo lectura."
+
+
+def test_literal_sin_cerrar_no_oculta_comandos():
+    # Un literal sin cerrar se consume hasta el final: no hay más palabras
+    assert validar_solo_lectura("SELECT 'abc FROM dual") is None
+    assert validar_solo_lectura("DROP TABLE x --'") is not None
@@ -0,0 +1,157 @@
+"""
+Protocolo del demonio de metadata Oracle (SCRIPTS/oracle_daemon.py).
+
+Solo usa la biblioteca estándar para que el cliente arranque en
+milisegundos: no importa oracledb, LangChain ni agente_oracle.py.
+
+Cada mensaje es una línea JSON (UTF-8) terminada en salto de línea. Una
+conexión puede enviar varias peticiones seguidas; cada una recibe su
+respuesta en orden.
+
+Cada petición lleva el token que el demonio escribe al arrancar en un
+fichero legible solo por su usuario (ver ruta_token). Así, con TCP en
+localhost, otro usuario de la máquina no puede usar las herramientas.
+
+    Petición:  {"comando": "describir_tabla", "argumento": "CLIENTES", "formato": "json", "token": "..."}
+    Respuesta: {"ok": true, "segundos": 0.002, "datos": [...]}   (o "salida": "texto")
+
+Uso:
+    from UTILS.oracle_protocolo import ClienteDaemon
+
+    with ClienteDaemon() as cliente:
+        print(cliente.llamar("tablas_importantes", "5")['salida'])
+"""
+
+import json
+import os
+import secrets
+import socket
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Socket Unix por defecto; en plataformas sin AF_UNIX, TCP solo en localhost
+if hasattr(socket, 'AF_UNIX'):
+    DIRECCION_POR_DEFECTO = os.path.join(PROJECT_ROOT, '.cache', 'oracle', 'daemon.sock')
+else:
+    DIRECCION_POR_DEFECTO = "127.0.0.1:47600"
+
+
+def parsear_direccion(texto: str = None):
+    """
+    Dirección del demonio: "host:puerto" es TCP; cualquier otra cosa, la
+    ruta de un socket Unix.
+    Returns:
+        Ruta (str) o tupla (host, puerto)
+    """
+    texto = texto or os.environ.get('ORACLE_DAEMON') or DIRECCION_POR_DEFECTO
+    host, separador, puerto = texto.rpartition(':')
+    if separador and puerto.isdigit() and os.sep not in texto:
+        return host or "127.0.0.1", int(puerto)
+    return texto
+
+
+def familia(direccion) -> int:
+    """Familia de socket de una dirección de parsear_direccion."""
+    return socket.AF_INET if isinstance(direccion, tuple) else socket.AF_UNIX
+
+
+def ruta_token(direccion) -> str:
+    """Fichero con el token del demonio que escucha en `direccion`."""
+    if isinstance(direccion, tuple):
+        return os.path.join(PROJECT_ROOT, '.cache', 'oracle', f"daemon_{direccion[1]}.token")
+    return f"{direccion}.token"
+
+
+def crear_token(direccion) -> str:
+    """
+    Genera un token nuevo y lo guarda en ruta_token(direccion) con permisos
+    solo para el usuario (se borra el anterior para no heredar sus permisos).
+    """
+    token = secrets.token_hex(32)
+    ruta = ruta_token(direccion)
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    descriptor = os.open(ruta, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+        f.write(token)
+    return token
+
+
+def leer_token(direccion):
+    """Token del demonio, o None si no hay fichero (demonio parado o de otro usuario)."""
+    try:
+        with open(ruta_token(direccion), encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def codificar(mensaje: dict) -> bytes:
+    """Mensaje como línea JSON."""
+    return json.dumps(mensaje, ensure_ascii=False, default=str).encode('utf-8') + b"\n"
+
+
+def decodificar(linea: bytes) -> dict:
+    """Línea JSON recibida como diccionario (ValueError si no es un objeto)."""
+    mensaje = json.loads(linea.decode('utf-8'))
+    if not isinstance(mensaje, dict):
+        raise ValueError("se esperaba un objeto JSON")
+    return mensaje
+
+
+class ClienteDaemon:
+    """
+    Cliente del demonio: mantiene abierta una conexión y envía peticiones
+    por ella. Las excepciones de red (OSError) se propagan, para que el
+    llamador distinga "demonio parado" de un error de la herramienta.
+    """
+
+    def __init__(self, direccion=None, timeout: float = 300):
+        self.direccion = parsear_direccion(direccion) if not isinstance(direccion, tuple) else direccion
+        self.timeout = timeout
+        self.token = None
+        self._socket = None
+        self._fichero = None
+
+    def __enter__(self):
+        self.conectar()
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def conectar(self):
+        self._socket = socket.socket(familia(self.direccion), socket.SOCK_STREAM)
+        self._socket.settimeout(self.timeout)
+        try:
+            self._socket.connect(self.direccion)
+        except OSError:
+            self.cerrar()
+            raise
+        self._fichero = self._socket.makefile('rwb')
+        self.token = leer_token(self.direccion)
+
+    def llamar(self, comando: str, argumento: str = "", **opciones) -> dict:
+        """
+        Envía una petición y espera su respuesta.
+        Args:
+            comando: Herramienta (ej: describir_tabla) o comando del demonio
+                (ping, estado, metricas, invalidar_cache, refrescar_snapshot, detener)
+            opciones: Claves adicionales de la petición (ej: formato="json")
+        """
+        if self._fichero is None:
+            self.conectar()
+        self._fichero.write(codificar({'comando': comando, 'argumento': argumento, **opciones,
+                                       'token': self.token}))
+        self._fichero.flush()
+        linea = self._fichero.readline()
+        if not linea:
+            raise ConnectionError("El demonio cerró la conexión")
+        return decodificar(linea)
+
+    def cerrar(self):
+        for recurso in (self._fichero, self._socket):
+            if recurso is not None:
+                recurso.close()
+        self._fichero = self._socket = None
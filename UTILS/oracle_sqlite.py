@@ -0,0 +1,469 @@
+"""
+Diccionario de Oracle simulado sobre SQLite.
+
+Permite ejecutar y medir las herramientas de agente_oracle.py sin una base
+de datos Oracle: crea en un fichero SQLite las vistas all_* y user_* que
+consultan las herramientas, genera esquemas sintéticos de cualquier tamaño
+y ofrece una conexión con la misma interfaz que oracledb (cursor, execute,
+fetchmany, arraysize, prefetchrows) que cuenta round trips y filas.
+
+Uso:
+    from UTILS.oracle_sqlite import generar_esquema, conectar_sqlite
+    from AGENTS.agente_oracle import oracle_conn, listar_tablas
+
+    ruta = generar_esquema('/tmp/bench.sqlite', num_tablas=10000)
+    conectar_sqlite(oracle_conn, ruta)
+    print(listar_tablas("CLI%"))
+"""
+
+import os
+import random
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+
+# ============================================================================
+# ESTRUCTURA DEL DICCIONARIO
+# ============================================================================
+
+# Vistas all_* como tablas base. Solo las columnas que usan las herramientas.
+# last_ddl_time se guarda ya como texto 'YYYYMMDDHH24MISS'.
+ESQUEMA_DICCIONARIO = """
+    CREATE TABLE all_tables (
+        owner TEXT, table_name TEXT, tablespace_name TEXT, num_rows INTEGER,
+        blocks INTEGER, avg_row_len INTEGER, last_analyzed TEXT,
+        temporary TEXT, partitioned TEXT, iot_type TEXT
+    );
+    CREATE TABLE all_tab_columns (
+        owner TEXT, table_name TEXT, column_id INTEGER, column_name TEXT,
+        data_type TEXT, data_length INTEGER, data_precision INTEGER,
+        data_scale INTEGER, nullable TEXT, data_default TEXT, char_length INTEGER,
+        num_distinct INTEGER, num_nulls INTEGER, last_analyzed TEXT
+    );
+    CREATE TABLE all_constraints (
+        owner TEXT, constraint_name TEXT, constraint_type TEXT, table_name TEXT,
+        r_owner TEXT, r_constraint_name TEXT, delete_rule TEXT, status TEXT,
+        search_condition TEXT
+    );
+    CREATE TABLE all_cons_columns (
+        owner TEXT, constraint_name TEXT, table_name TEXT, column_name TEXT, position INTEGER
+    );
+    CREATE TABLE all_indexes (
+        owner TEXT, index_name TEXT, table_owner TEXT, table_name TEXT,
+        index_type TEXT, uniqueness TEXT, status TEXT
+    );
+    CREATE TABLE all_ind_columns (
+        index_owner TEXT, index_name TEXT, table_owner TEXT, table_name TEXT,
+        column_name TEXT, column_position INTEGER, descend TEXT
+    );
+    CREATE TABLE all_objects (
+        owner TEXT, object_name TEXT, object_type TEXT, last_ddl_time TEXT, status TEXT
+    );
+    CREATE TABLE all_views (owner TEXT, view_name TEXT, text_length INTEGER, text TEXT);
+    CREATE TABLE all_source (owner TEXT, name TEXT, type TEXT, line INTEGER, text TEXT);
+    CREATE TABLE all_sequences (
+        sequence_owner TEXT, sequence_name TEXT, min_value INTEGER, max_value INTEGER,
+        increment_by INTEGER, last_number INTEGER
+    );
+    CREATE TABLE all_triggers (
+        owner TEXT, trigger_name TEXT, trigger_type TEXT, triggering_event TEXT,
+        table_name TEXT, status TEXT
+    );
+    CREATE TABLE all_tab_comments (owner TEXT, table_name TEXT, table_type TEXT, comments TEXT);
+    CREATE TABLE all_col_comments (owner TEXT, table_name TEXT, column_name TEXT, comments TEXT);
+
+    CREATE INDEX ix_tables ON all_tables (owner, table_name);
+    CREATE INDEX ix_tab_columns ON all_tab_columns (owner, table_name, column_id);
+    CREATE INDEX ix_constraints ON all_constraints (owner, constraint_name);
+    CREATE INDEX ix_constraints_tabla ON all_constraints (owner, table_name);
+    CREATE INDEX ix_cons_columns ON all_cons_columns (owner, constraint_name);
+    CREATE INDEX ix_cons_columns_columna ON all_cons_columns (owner, table_name, column_name);
+    CREATE INDEX ix_indexes ON all_indexes (owner, table_name);
+    CREATE INDEX ix_ind_columns ON all_ind_columns (index_owner, index_name);
+    CREATE INDEX ix_objects ON all_objects (owner, object_type, object_name);
+    CREATE INDEX ix_col_comments ON all_col_comments (owner, table_name);
+    CREATE INDEX ix_source ON all_source (owner, name, type, line);
+"""
+
+# Se guarda en meta: los ficheros de una versión anterior no tienen todas
+# las vistas e índices que usan las herramientas y hay que regenerarlos
+VERSION_DICCIONARIO = '3'
+
+# Vista user_* -> (vista all_*, columna de owner)
+VISTAS_USUARIO = {
+    'user_tables': ('all_tables', 'owner'),
+    'user_tab_columns': ('all_tab_columns', 'owner'),
+    'user_constraints': ('all_constraints', 'owner'),
+    'user_cons_columns': ('all_cons_columns', 'owner'),
+    'user_indexes': ('all_indexes', 'owner'),
+    'user_ind_columns': ('all_ind_columns', 'index_owner'),
+    'user_objects': ('all_objects', 'owner'),
+    'user_views': ('all_views', 'owner'),
+    'user_source': ('all_source', 'owner'),
+    'user_sequences': ('all_sequences', 'sequence_owner'),
+    'user_triggers': ('all_triggers', 'owner'),
+    'user_tab_comments': ('all_tab_comments', 'owner'),
+    'user_col_comments': ('all_col_comments', 'owner'),
+}
+
+
+def crear_diccionario(ruta: str, usuario: str):
+    """
+    Crea un fichero SQLite vacío con las vistas all_* y las user_* del usuario.
+    Returns:
+        Conexión sqlite3 abierta sobre el fichero
+    """
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    db = sqlite3.connect(ruta)
+    db.executescript(ESQUEMA_DICCIONARIO)
+    for vista, (base, columna_owner) in VISTAS_USUARIO.items():
+        db.execute(f"CREATE VIEW {vista} AS SELECT * FROM {base} WHERE {columna_owner} = '{usuario}'")
+    db.execute("CREATE TABLE meta (clave TEXT PRIMARY KEY, valor TEXT)")
+    db.execute("INSERT INTO meta VALUES ('usuario', ?)", (usuario,))
+    db.execute("INSERT INTO meta VALUES ('version', ?)", (VERSION_DICCIONARIO,))
+    return db
+
+
+def diccionario_vigente(ruta: str) -> bool:
+    """Indica si el fichero existe y lo creó esta versión de crear_diccionario."""
+    if not os.path.exists(ruta):
+        return False
+    db = sqlite3.connect(ruta)
+    try:
+        version = db.execute("SELECT valor FROM meta WHERE clave = 'version'").fetchone()
+    except sqlite3.Error:
+        return False
+    finally:
+        db.close()
+    return version is not None and version[0] == VERSION_DICCIONARIO
+
+
+# ============================================================================
+# GENERADOR DE ESQUEMAS SINTÉTICOS
+# ============================================================================
+
+MODULOS = ('CLI', 'PED', 'FAC', 'ALM', 'RRHH', 'CONT', 'LOG', 'CRM', 'COM', 'SEG')
+ENTIDADES = (
+    'CLIENTES', 'PEDIDOS', 'LINEAS', 'FACTURAS', 'ARTICULOS', 'PROVEEDORES',
+    'EMPLEADOS', 'USUARIOS', 'PAGOS', 'COBROS', 'ALBARANES', 'STOCK',
+    'CUENTAS', 'ASIENTOS', 'TARIFAS', 'DIRECCIONES', 'CONTACTOS', 'HISTORICO'
+)
+TIPOS_COLUMNA = (
+    ('NUMBER', 22, 10, 0), ('NUMBER', 22, None, None), ('VARCHAR2', 100, None, None),
+    ('VARCHAR2', 4000, None, None), ('DATE', 7, None, None), ('CHAR', 1, None, None),
+    ('TIMESTAMP(6)', 11, None, 6), ('CLOB', 4000, None, None)
+)
+
+
+def generar_esquema(ruta: str, num_tablas: int, usuario: str = 'BENCH',
+                    otros_esquemas: int = 0, semilla: int = 0) -> str:
+    """
+    Genera un diccionario sintético con tablas, columnas, PKs, FKs, índices,
+    comentarios, vistas, secuencias, triggers y procedimientos (con su
+    código en user_source).
+
+    La forma se inspira en esquemas de ERP: nombres MODULO_ENTIDAD_N, entre
+    3 y 30 columnas por tabla, PK en ID, de 0 a 3 FKs hacia tablas
+    anteriores (con índice en la mitad de ellas) y comentarios en un 30%
+    de tablas y un 10% de columnas. Con la misma semilla el resultado es
+    idéntico. El código PL/SQL sale de un generador aparte, así que no
+    altera el resto del esquema generado con la misma semilla.
+    Args:
+        ruta: Fichero SQLite a crear (se sobrescribe)
+        num_tablas: Tablas del esquema del usuario (y de cada esquema extra)
+        usuario: Owner de las vistas user_*
+        otros_esquemas: Esquemas adicionales visibles solo en all_*
+        semilla: Semilla del generador aleatorio
+    Returns:
+        La ruta del fichero
+    """
+    aleatorio = random.Random(semilla)
+    aleatorio_codigo = random.Random(f"{semilla}-codigo")
+    db = crear_diccionario(ruta, usuario)
+    base = datetime(2024, 1, 1)
+
+    owners = [usuario] + [f"{usuario}_{i}" for i in range(1, otros_esquemas + 1)]
+    for owner in owners:
+        filas = {nombre: [] for nombre in (
+            'all_tables', 'all_tab_columns', 'all_constraints', 'all_cons_columns',
+            'all_indexes', 'all_ind_columns', 'all_objects', 'all_views',
+            'all_sequences', 'all_triggers', 'all_tab_comments', 'all_col_comments', 'all_source'
+        )}
+        tablas = []
+        for i in range(num_tablas):
+            tabla = f"{aleatorio.choice(MODULOS)}_{aleatorio.choice(ENTIDADES)}_{i}"
+            tablas.append(tabla)
+            num_rows = int(aleatorio.paretovariate(1.2) * 100)
+            ddl = (base + timedelta(minutes=aleatorio.randrange(500000))).strftime('%Y%m%d%H%M%S')
+            filas['all_tables'].append((owner, tabla, aleatorio.choice(('USERS', 'DATOS', 'INDICES')),
+                                        num_rows, num_rows // 50 + 1, 120, ddl,
+                                        'Y' if aleatorio.random() < 0.02 else 'N', 'NO', None))
+            filas['all_objects'].append((owner, tabla, 'TABLE', ddl, 'VALID'))
+            if aleatorio.random() < 0.3:
+                filas['all_tab_comments'].append((owner, tabla, 'TABLE', f"Tabla de {tabla.split('_')[1].lower()}"))
+
+            columnas = ['ID'] + [f"{aleatorio.choice(ENTIDADES)[:-1]}_{j}" for j in range(aleatorio.randint(2, 29))]
+            for posicion, columna in enumerate(columnas, 1):
+                tipo, longitud, precision, escala = TIPOS_COLUMNA[0] if posicion == 1 else aleatorio.choice(TIPOS_COLUMNA)
+                filas['all_tab_columns'].append((
+                    owner, tabla, posicion, columna, tipo, longitud, precision, escala,
+                    'N' if posicion == 1 else aleatorio.choice('YN'),
+                    "SYSDATE" if tipo == 'DATE' and aleatorio.random() < 0.2 else None,
+                    longitud if tipo in ('VARCHAR2', 'CHAR') else 0,
+                    aleatorio.randint(1, num_rows + 1), 0, ddl
+                ))
+                if aleatorio.random() < 0.1:
+                    filas['all_col_comments'].append((owner, tabla, columna, f"Campo {columna.lower()}"))
+
+            pk = f"PK_{tabla}"
+            filas['all_constraints'].append((owner, pk, 'P', tabla, None, None, None, 'ENABLED', None))
+            filas['all_cons_columns'].append((owner, pk, tabla, 'ID', 1))
+            filas['all_indexes'].append((owner, pk, owner, tabla, 'NORMAL', 'UNIQUE', 'VALID'))
+            filas['all_ind_columns'].append((owner, pk, owner, tabla, 'ID', 1, 'ASC'))
+            filas['all_objects'].append((owner, pk, 'INDEX', ddl, 'VALID'))
+
+            for k in range(aleatorio.randint(0, 3) if i else 0):
+                destino = tablas[aleatorio.randrange(i)]
+                fk = f"FK_{tabla}_{k}"
+                columna = f"ID_{destino}"[:128]
+                filas['all_tab_columns'].append((owner, tabla, len(columnas) + k + 1, columna,
+                                                 'NUMBER', 22, 10, 0, 'Y', None, 0, 0, 0, ddl))
+                filas['all_constraints'].append((owner, fk, 'R', tabla, owner, f"PK_{destino}",
+                                                 'NO ACTION', 'ENABLED', None))
+                filas['all_cons_columns'].append((owner, fk, tabla, columna, 1))
+                if aleatorio.random() < 0.5:
+                    indice = f"IX_{tabla}_{k}"
+                    filas['all_indexes'].append((owner, indice, owner, tabla, 'NORMAL', 'NONUNIQUE', 'VALID'))
+                    filas['all_ind_columns'].append((owner, indice, owner, tabla, columna, 1, 'ASC'))
+                    filas['all_objects'].append((owner, indice, 'INDEX', ddl, 'VALID'))
+
+        for i in range(max(1, num_tablas // 10)):
+            tabla = aleatorio.choice(tablas)
+            texto = _texto_vista(tabla, aleatorio.randint(50, 5000))
+            filas['all_views'].append((owner, f"V_{tabla}", len(texto), texto))
+            filas['all_sequences'].append((owner, f"SEQ_{tabla}", 1, 2 ** 63 - 1, 1, aleatorio.randint(1, 10 ** 6)))
+            filas['all_triggers'].append((owner, f"TRG_{tabla}", 'BEFORE EACH ROW', 'INSERT', tabla,
+                                          aleatorio.choice(('ENABLED', 'DISABLED'))))
+            tipo = aleatorio.choice(('PROCEDURE', 'FUNCTION', 'PACKAGE'))
+            filas['all_objects'].append((owner, f"{tipo[:3]}_{tabla}", tipo, None,
+                                         'VALID' if aleatorio.random() < 0.95 else 'INVALID'))
+            filas['all_source'].extend((owner, f"{tipo[:3]}_{tabla}", *linea)
+                                       for linea in _codigo_fuente(f"{tipo[:3]}_{tabla}", tipo, aleatorio_codigo))
+
+        for nombre, valores in filas.items():
+            if valores:
+                marcas = ", ".join("?" * len(valores[0]))
+                db.executemany(f"INSERT INTO {nombre} VALUES ({marcas})", valores)
+
+    db.commit()
+    db.close()
+    return ruta
+
+
+def _texto_vista(tabla: str, longitud: int) -> str:
+    """Texto de una vista sobre `tabla` de al menos `longitud` caracteres."""
+    lineas = ["SELECT t.*\n", f"  FROM {tabla} t\n", " WHERE t.ID IS NOT NULL"]
+    total = sum(map(len, lineas))
+    while total < longitud:
+        lineas.append(f"\n   AND t.ID <> {len(lineas)}")
+        total += len(lineas[-1])
+    return "".join(lineas)
+
+
+def _codigo_fuente(nombre: str, tipo: str, aleatorio):
+    """
+    Filas (type, line, text) de user_source de un objeto PL/SQL sintético.
+    Un PACKAGE lleva también su PACKAGE BODY. El número de pasos sigue una
+    Pareto, así que unos pocos paquetes tienen miles de líneas.
+    """
+    pasos = [f"    NULL; -- paso {n}\n" for n in range(1, min(int(aleatorio.paretovariate(1.5) * 10), 20000) + 1)]
+    if tipo == 'PACKAGE':
+        partes = (
+            ('PACKAGE', [f"PACKAGE {nombre} AS\n", "  PROCEDURE procesar;\n", f"END {nombre};\n"]),
+            ('PACKAGE BODY', [f"PACKAGE BODY {nombre} AS\n", "  PROCEDURE procesar IS\n", "  BEGIN\n",
+                              *pasos, "  END procesar;\n", f"END {nombre};\n"]),
+        )
+    elif tipo == 'FUNCTION':
+        partes = ((tipo, [f"FUNCTION {nombre} RETURN NUMBER IS\n", "BEGIN\n", *pasos,
+                          "  RETURN 0;\n", f"END {nombre};\n"]),)
+    else:
+        partes = ((tipo, [f"PROCEDURE {nombre} IS\n", "BEGIN\n", *pasos, f"END {nombre};\n"]),)
+    for tipo_parte, lineas in partes:
+        for numero, texto in enumerate(lineas, 1):
+            yield tipo_parte, numero, texto
+
+
+# ============================================================================
+# CONEXIÓN CON INTERFAZ DE ORACLEDB
+# ============================================================================
+
+# Reescrituras del dialecto Oracle que usan las herramientas (y las
+# consultas de ConsultaSQL) a SQLite. La paginación admite binds o literales
+REESCRITURAS_SQL = (
+    (re.compile(r"OFFSET\s+(:?\w+)\s+ROWS?\s+FETCH\s+(?:FIRST|NEXT)\s+(:?\w+)\s+ROWS?\s+ONLY", re.I),
+     r"LIMIT \2 OFFSET \1"),
+    (re.compile(r"OFFSET\s+(:?\w+)\s+ROWS?\b", re.I), r"LIMIT -1 OFFSET \1"),
+    (re.compile(r"FETCH\s+(?:FIRST|NEXT)\s+(:?\w+)\s+ROWS?\s+ONLY", re.I), r"LIMIT \1"),
+    (re.compile(r"LISTAGG\(([^,]+),\s*('[^']*')\)\s*WITHIN\s+GROUP\s*\(ORDER BY [^)]*\)", re.I),
+     r"GROUP_CONCAT(\1, \2)"),
+)
+
+
+@lru_cache(maxsize=1024)
+def traducir_sql(sql: str) -> str:
+    """Traduce una sentencia del dialecto de Oracle al de SQLite."""
+    for patron, reemplazo in REESCRITURAS_SQL:
+        sql = patron.sub(reemplazo, sql)
+    return sql
+
+
+def _greatest(*valores):
+    """GREATEST de Oracle: NULL si algún argumento es NULL."""
+    return None if None in valores else max(valores)
+
+
+class CursorSQLite:
+    """
+    Cursor con la interfaz de oracledb.Cursor sobre SQLite.
+
+    Simula el coste de red de oracledb: execute() es un round trip que
+    trae hasta prefetchrows filas y cada fetch posterior trae arraysize
+    filas por round trip.
+    """
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.arraysize = 100
+        self.prefetchrows = 2
+        self.description = None
+        self._filas = []
+        self._posicion = 0
+        self._recibidas = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        while True:
+            filas = self.fetchmany()
+            if not filas:
+                return
+            yield from filas
+
+    def execute(self, sql: str, params=None):
+        """Ejecuta la sentencia; SET TRANSACTION se ignora."""
+        self.conexion.ejecuciones += 1
+        self.conexion.contar_ida_y_vuelta("execute")
+        self.description, self._filas, self._posicion = None, [], 0
+        if sql.strip().upper().startswith("SET TRANSACTION"):
+            return
+        with self.conexion.bloqueo:
+            cursor = self.conexion.db.execute(traducir_sql(sql), params or {})
+            if cursor.description:
+                self.description = [(d[0].upper(),) + tuple(d[1:]) for d in cursor.description]
+                self._filas = cursor.fetchall()
+        self._recibidas = min(self.prefetchrows, len(self._filas))
+
+    def fetchmany(self, num_filas=None):
+        """Devuelve hasta num_filas (por defecto arraysize) filas."""
+        fin = min(self._posicion + (num_filas or self.arraysize), len(self._filas))
+        while self._recibidas < fin:
+            self.conexion.contar_ida_y_vuelta("fetch")
+            self._recibidas = min(self._recibidas + self.arraysize, len(self._filas))
+        filas = self._filas[self._posicion:fin]
+        self._posicion = fin
+        self.conexion.filas += len(filas)
+        return filas
+
+    def fetchall(self):
+        """Devuelve todas las filas pendientes."""
+        return self.fetchmany(len(self._filas) - self._posicion or 1)
+
+    def fetchone(self):
+        """Devuelve la siguiente fila o None."""
+        filas = self.fetchmany(1)
+        return filas[0] if filas else None
+
+    def close(self):
+        """Libera las filas del cursor."""
+        self._filas = []
+
+
+class ConexionSQLite:
+    """
+    Conexión con la interfaz de oracledb.Connection sobre el diccionario
+    simulado. Acumula ejecuciones, round trips y filas en sus atributos y,
+    como el modo Thin, avisa de cada round trip a round_trip_callback.
+    """
+
+    thin = True
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.db = sqlite3.connect(ruta, check_same_thread=False)
+        self.db.create_function("GREATEST", -1, _greatest, deterministic=True)
+        self.db.create_function("NVL", 2, lambda valor, defecto: defecto if valor is None else valor,
+                                deterministic=True)
+        self.db.create_function("TO_CHAR", 2, lambda valor, formato: valor, deterministic=True)
+        self.usuario = self.db.execute("SELECT valor FROM meta WHERE clave = 'usuario'").fetchone()[0]
+        self.bloqueo = threading.Lock()
+        self.round_trip_callback = None
+        self.reiniciar_contadores()
+
+    def reiniciar_contadores(self):
+        """Pone a cero ejecuciones, round trips y filas."""
+        self.ejecuciones = 0
+        self.ida_y_vuelta = 0
+        self.filas = 0
+
+    def contadores(self) -> dict:
+        """Ejecuciones, round trips y filas acumulados."""
+        return {'ejecuciones': self.ejecuciones, 'ida_y_vuelta': self.ida_y_vuelta, 'filas': self.filas}
+
+    def contar_ida_y_vuelta(self, nombre: str):
+        """Cuenta un round trip simulado."""
+        self.ida_y_vuelta += 1
+        if self.round_trip_callback is not None:
+            self.round_trip_callback(nombre)
+
+    def cursor(self):
+        return CursorSQLite(self)
+
+    def ping(self):
+        """El diccionario simulado es local y no se cae: no cuenta round trip."""
+
+    def cancel(self):
+        """Interrumpe la sentencia SQLite en curso, como connection.cancel()."""
+        self.db.interrupt()
+
+    def close(self):
+        self.db.close()
+
+
+def conectar_sqlite(conexion_oracle, ruta: str, **config) -> str:
+    """
+    Conecta una OracleConnection de agente_oracle al diccionario simulado.
+    Args:
+        conexion_oracle: Instancia de OracleConnection (ej: oracle_conn)
+        ruta: Fichero creado con generar_esquema
+        **config: Claves adicionales de ORACLE_CONFIG (ej: usar_snapshot=True)
+    Returns:
+        Mensaje de éxito
+    """
+    # Cierra la conexión anterior (y vacía la caché de resultados del agente)
+    conexion_oracle.cerrar()
+    conexion = ConexionSQLite(ruta)
+    conexion_oracle.pool = None
+    conexion_oracle.connection = conexion
+    conexion_oracle.config = {
+        'host': 'sqlite', 'port': 0, 'service_name': os.path.basename(ruta),
+        'user': conexion.usuario, 'password': '', **config
+    }
+    return f"✅ Conectado al diccionario simulado: {ruta} (usuario: {conexion.usuario})"